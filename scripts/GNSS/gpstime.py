@@ -47,14 +47,21 @@ as compared to some algorigthms found in the literature and on the web.
 # __version__ = git_version.id
 
 import time
+import calendar
 import datetime
 import math
 import numpy as np
 
+import leaptable
+
 secsInWeek = 604800
 secsInDay = 86400
 gpsEpoch = (1980, 1, 6, 0, 0, 0)  # (year, month, day, hh, mm, ss)
 
+# GPS epoch as numpy datetime64 and in seconds since the Unix epoch (1970-01-01)
+gpsEpoch64 = np.datetime64('1980-01-06T00:00:00', 'ns')
+gpsEpochUnix = 315964800
+
 
 def dayOfWeek(year, month, day):
     "returns day of week: 0=Sun, 1=Mon, .., 6=Sat"
@@ -109,7 +116,7 @@ def ymdhmsFromPyUTC(pyUTC):
     return datetime.datetime.utcfromtimestamp(pyUTC)
 
 
-def wtFromUTCpy(pyUTC, leapSecs=14):
+def wtFromUTCpy(pyUTC, leapSecs=None):
     """convenience function:
          allows to use python UTC times and
          returns only week and tow"""
@@ -118,7 +125,7 @@ def wtFromUTCpy(pyUTC, leapSecs=14):
     return wSowDSoD[0:2]
 
 
-def gpsFromUTC(year, month, day, hour, min, sec, leapSecs=14):
+def gpsFromUTC(year, month, day, hour, min, sec, leapSecs=None):
     """converts UTC to: gpsWeek, secsOfWeek, gpsDay, secsOfDay
 
     a good reference is:  http://www.oc.nps.navy.mil/~jclynch/timsys.html
@@ -131,11 +138,12 @@ def gpsFromUTC(year, month, day, hour, min, sec, leapSecs=14):
     The GPS week starts on Saturday midnight (Sunday morning), and runs
     for 604800 seconds.
 
-    Currently, GPS time is 14 seconds ahead of UTC (see above reference).
-    While GPS SVs transmit this difference and the date when another leap
-    second takes effect, the use of leap seconds cannot be predicted.  This
-    routine is precise until the next leap second is introduced and has to be
-    updated after that.
+    GPS time is ahead of UTC by the leap seconds introduced since the GPS
+    epoch (see above reference).  While GPS SVs transmit this difference and
+    the date when another leap second takes effect, the use of leap seconds
+    cannot be predicted.  When leapSecs is None, the offset in effect at the
+    given date is taken from the leap second table (see leaptable), which is
+    precise until a leap second is introduced that is not in its cache file.
 
     SOW = Seconds of Week
     SOD = Seconds of Day
@@ -162,6 +170,8 @@ def gpsFromUTC(year, month, day, hour, min, sec, leapSecs=14):
     #       corrected with time.timezone
     #       However, since we use the difference, this correction is unnecessary.
     # Warning:  trouble if daylight savings flag is set to -1 or 1 !!!
+    if leapSecs is None:
+        leapSecs = int(leaptable.leapSecondsFromUTC(calendar.timegm((year, month, day, hour, min, int(sec), 0, 0, 0))))
     t = t + leapSecs
     tdiff = t - t0
     gpsSOW = (tdiff % secsInWeek) + msec
@@ -172,7 +182,7 @@ def gpsFromUTC(year, month, day, hour, min, sec, leapSecs=14):
     return (gpsWeek, gpsSOW, gpsDay, gpsSOD)
 
 
-def UTCFromGps(gpsWeek, SOW, leapSecs=14):
+def UTCFromGps(gpsWeek, SOW, leapSecs=None):
     """converts gps week and seconds to UTC
 
     see comments of inverse function!
@@ -183,6 +193,8 @@ def UTCFromGps(gpsWeek, SOW, leapSecs=14):
     secFract = SOW % 1
     epochTuple = gpsEpoch + (-1, -1, 0)
     t0 = time.mktime(epochTuple) - time.timezone  # mktime is localtime, correct for UTC
+    if leapSecs is None:
+        leapSecs = int(leaptable.leapSecondsFromGPS(gpsWeek * secsInWeek + SOW))
     tdiff = (gpsWeek * secsInWeek) + SOW - leapSecs
     t = t0 + tdiff
     (year, month, day, hh, mm, ss, dayOfWeek, julianDay, daylightsaving) = time.gmtime(t)
@@ -202,18 +214,61 @@ def UTCFromString(year, month, day, dataString):
     return time
 
 
-def GpsSecondsFromPyUTC(pyUTC, leapSecs=14):
+def GpsSecondsFromPyUTC(pyUTC, leapSecs=None):
     """converts the python epoch to gps seconds
 
     pyEpoch = the python epoch from time.time()
     """
-    t = gpsFromUTC(*ymdhmsFromPyUTC(pyUTC))
+    t = gpsFromUTC(*(ymdhmsFromPyUTC(pyUTC).timetuple()[:6] + (leapSecs,)))
     return int(t[0] * 60 * 60 * 24 * 7 + t[1])
 
 
 def DOWFromWT(tow):
-    DAYOW = np.floor(tow / (60*60*24))
-    return int(DAYOW)
+    "returns day of week for a TOW or an array of TOWs: 0=Sun, 1=Mon, .., 6=Sat"
+    DAYOW = np.floor(np.asarray(tow, dtype=np.float64) / secsInDay).astype(int)
+    if DAYOW.ndim == 0:
+        return int(DAYOW)
+    return DAYOW
+
+
+def SODFromWT(tow):
+    "returns seconds of day for a TOW or an array of TOWs"
+    return np.fmod(np.asarray(tow, dtype=np.float64), secsInDay)
+
+
+def gpsSecondsFromWT(weeknr, tow):
+    "returns the seconds since the GPS epoch for (arrays of) week numbers and TOWs"
+    return np.asarray(weeknr, dtype=np.float64) * secsInWeek + np.asarray(tow, dtype=np.float64)
+
+
+def leapSecondsFromWT(weeknr, tow):
+    "returns the leap seconds (GPS - UTC) in effect at (arrays of) week numbers and TOWs"
+    return leaptable.leapSecondsFromGPS(gpsSecondsFromWT(weeknr, tow))
+
+
+def datetime64FromWT(weeknr, tow, leapSecs=None):
+    """converts (arrays of) week numbers and TOWs to numpy datetime64[ns] in a single pass
+
+    leapSecs = GPS - UTC offset (scalar or array), None to apply the leap seconds in effect
+               at each epoch, 0 to keep GPS time (as UTCFromWT does)
+    """
+    if leapSecs is None:
+        leapSecs = leapSecondsFromWT(weeknr, tow)
+    nsecs = (np.asarray(weeknr, dtype=np.int64) * secsInWeek - np.asarray(leapSecs, dtype=np.int64)) * 1000000000 \
+        + np.round(np.asarray(tow, dtype=np.float64) * 1e9).astype(np.int64)
+    return gpsEpoch64 + nsecs.astype('timedelta64[ns]')
+
+
+def UTCSecondsFromWT(weeknr, tow, leapSecs=None):
+    "converts (arrays of) week numbers and TOWs to UTC seconds since the Unix epoch (as time.time())"
+    if leapSecs is None:
+        leapSecs = leapSecondsFromWT(weeknr, tow)
+    return gpsEpochUnix + gpsSecondsFromWT(weeknr, tow) - leapSecs
+
+
+def datetimeFromWT(weeknr, tow, leapSecs=None):
+    "converts (arrays of) week numbers and TOWs to (an array of) datetime.datetime, see datetime64FromWT"
+    return datetime64FromWT(weeknr, tow, leapSecs).astype('datetime64[us]').astype(datetime.datetime)
 
 
 def UTCFromWT(weeknr, tow):
@@ -246,7 +301,7 @@ def testTimeStuff():
     (w, sow, d, sod) = gpsFromUTC(1999, 8, 21, 23, 59, 47)
     print "**** week: %s, sow: %s, day: %s, sod: %s" % (w, sow, d, sod)
     print "     and hopefully back:"
-    print "**** %s, %s, %s, %s, %s, %s\n" % UTCFromGps(w, sow, leapSecs=14)
+    print "**** %s, %s, %s, %s, %s, %s\n" % UTCFromGps(w, sow)
 
     print "Today is GPS week 1186, day 3, seems to run ok (2002, 10, 2, 12, 6, 13.56)"
     (w, sow, d, sod) = gpsFromUTC(2002, 10, 2, 12, 6, 13.56)
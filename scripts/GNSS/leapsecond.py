@@ -54,6 +54,8 @@ import math
 import sys
 import signal
 
+import leaptable
+
 # Set a socket timeout for slow servers
 import socket
 socket.setdefaulttimeout(30)
@@ -212,16 +214,12 @@ def make_leapsecond_include(infile):
     "Get the current leap second count and century from the local cache usable as C preprocessor #define"
     # Underscore prefixes avoids warning W0612 from pylint,
     # which doesn't count substitution through locals() as use.
-    leapjumps = fetch_leapsecs(infile)
     now = int(time.time())
     _century = time.strftime("%Y", time.gmtime(now))[:2] + "00"
     _week = gps_week(now)
     _rollovers = gps_rollovers(now)
     _isodate = isotime(now - now % SECS_PER_WEEK)
-    _leapsecs = -1
-    for leapjump in leapjumps:
-        if leapjump < time.time():
-            _leapsecs += 1
+    _leapsecs = int(leaptable.leapSecondsFromUTC(now, infile))
     return """\
 /*
  * Constants used for GPS time detection and rollover correction.
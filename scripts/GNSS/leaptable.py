@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""
+Leap second table shared by gpstime, gnsstime and leapsecond
+
+The table is compiled once per process from the local leap second cache file (leapseconds.cache,
+refreshed with 'leapsecond.py -f leapseconds.cache'), so no network access is needed. The cache
+lists the Unix times of the inserted leap seconds. Lookups use np.searchsorted, so the offset
+between GPS time and UTC is found for arrays of millions of epochs at once.
+"""
+
+import os
+import numpy as np
+
+# the leap second cache distributed with this module
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leapseconds.cache')
+
+# GPS epoch (1980-01-06) in seconds since the Unix epoch, GPS time was equal to UTC at that moment
+GPS_EPOCH_UNIX = 315964800
+SECS_IN_DAY = 86400
+
+# compiled tables per cache file
+_tables = {}
+
+
+def loadTable(cacheFile=CACHE_FILE):
+    """
+    loadTable compiles the leap second table from a cache file (only read the first time)
+
+    Returns:
+        table: dict with for each leap second since the GPS epoch
+            'utc': Unix time (UTC) from which it applies (midnight after the inserted second)
+            'gps': the same moment in seconds since the GPS epoch
+            'offset': GPS - UTC from then on
+    """
+    if cacheFile not in _tables:
+        insertions = []
+        with open(cacheFile, 'r') as fCache:
+            for line in fCache:
+                fields = line.split('#')[0].split()
+                if fields:
+                    insertions.append(float(fields[0]))
+
+        # the cache gives the inserted second as 23:59:59 or 23:59:60, both round up to the next midnight
+        midnights = np.unique((np.array(insertions, dtype=np.int64) + 1) // SECS_IN_DAY * SECS_IN_DAY)
+        midnights = midnights[midnights > GPS_EPOCH_UNIX]
+        offsets = np.arange(1, len(midnights) + 1)
+
+        _tables[cacheFile] = {'utc': midnights, 'gps': midnights - GPS_EPOCH_UNIX + offsets, 'offset': offsets}
+
+    return _tables[cacheFile]
+
+
+def leapSecondsFromGPS(gpsSeconds, cacheFile=CACHE_FILE):
+    """
+    leapSecondsFromGPS returns GPS - UTC for (an array of) seconds since the GPS epoch
+    """
+    return np.searchsorted(loadTable(cacheFile)['gps'], gpsSeconds, side='right')
+
+
+def leapSecondsFromUTC(unixSeconds, cacheFile=CACHE_FILE):
+    """
+    leapSecondsFromUTC returns GPS - UTC for (an array of) UTC times in seconds since the Unix epoch
+    """
+    return np.searchsorted(loadTable(cacheFile)['utc'], unixSeconds, side='right')
@@ -7,13 +7,25 @@ Classes:
         lla2ecef
         ecef2lla
     WGS84 - constant parameters for GPS class
+
+The methods ending on Array transform N x 3 arrays of coordinates in a single
+vectorized operation (eg a full day of positions or satellite orbits).
 """
 # Import required packages
 from math import sqrt, sin, cos, tan, atan, atan2
+import numpy as np
 from numpy import array, dot
 import GNSS.geo as geo
 
 
+def stackCoordinates(*coordinates):
+    """
+    stackCoordinates combines arrays of the same shape into one array with the coordinates on the last axis
+    (np.stack(coordinates, axis=-1), which requires numpy 1.10)
+    """
+    return np.concatenate([np.asarray(coordinate)[..., np.newaxis] for coordinate in coordinates], axis=-1)
+
+
 class WGS84:
     """
     General parameters defined by the WGS84 system
@@ -158,6 +170,122 @@ class WGS84:
         ned = self.ecef2ned(ecef, origin)
         return self.ned2pae(ned)
 
+    # rotation matrices ECEF to NED per origin, see rotationECEF2NED
+    _rotations = {}
+    MAX_ROTATIONS = 256
+
+    def lla2ecefArray(self, lla):
+        """
+        Convert arrays of lat, lon, alt to Earth-centered, Earth-fixed coordinates.
+        Input: lla - N x 3 array of (lat, lon, alt) in (decimal degrees, decimal degrees, m)
+        Output: ecef - N x 3 array of (x, y, z) in (m, m, m)
+        """
+        lla = np.asarray(lla, dtype=np.float64)
+        lat = np.radians(lla[..., 0])
+        lon = np.radians(lla[..., 1])
+        alt = lla[..., 2]
+        # Calculate length of the normal to the ellipsoid
+        N = self.a / np.sqrt(1 - (self.e * np.sin(lat))**2)
+        cosLat = np.cos(lat)
+        return stackCoordinates((N + alt) * cosLat * np.cos(lon),
+                                (N + alt) * cosLat * np.sin(lon),
+                                (N * (1 - self.e**2) + alt) * np.sin(lat))
+
+    def ecef2llaArray(self, ecef):
+        """
+        Convert arrays of Earth-centered, Earth-fixed coordinates to lat, lon, alt.
+        Closed-form solution (no iterations) from:
+            Vermeille, H., An analytical method to transform geocentric into
+                geodetic coordinates, J. Geodesy, 85, 2011
+        Input: ecef - N x 3 array of (x, y, z) in (m, m, m), outside the centre of the earth
+        Output: lla - N x 3 array of (lat, lon, alt) in (decimal degrees, decimal degrees, m)
+        """
+        ecef = np.asarray(ecef, dtype=np.float64)
+        x = ecef[..., 0]
+        y = ecef[..., 1]
+        z = ecef[..., 2]
+        e2 = self.e**2
+        e4 = e2**2
+        rho = np.hypot(x, y)
+
+        p = (rho / self.a)**2
+        q = (1 - e2) * (z / self.a)**2
+        r = (p + q - e4) / 6.
+        s = e4 * p * q / (4. * r**3)
+        t = (1 + s + np.sqrt(s * (2 + s)))**(1. / 3)
+        u = r * (1 + t + 1. / t)
+        v = np.sqrt(u**2 + e4 * q)
+        w = e2 * (u + v - q) / (2. * v)
+        k = np.sqrt(u + v + w**2) - w
+        D = k * rho / (k + e2)
+        Dz = np.hypot(D, z)
+
+        lat = 2. * np.arctan2(z, D + Dz)
+        lon = np.arctan2(y, x)
+        alt = (k + e2 - 1.) / k * Dz
+        return stackCoordinates(np.degrees(lat), np.degrees(lon), alt)
+
+    def rotationECEF2NED(self, origin):
+        """
+        Returns the rotation matrix from ECEF to the local tangent plane (NED) at the
+        origin in ecef coordinates. The matrices are cached per origin.
+        Input: origin - (x0, y0, z0) in (m, m, m)
+        Output: Re2t - 3 x 3 rotation matrix
+        """
+        key = tuple(float(c) for c in origin)
+        if key not in self._rotations:
+            if len(self._rotations) >= self.MAX_ROTATIONS:
+                self._rotations.clear()
+            lat, lon = np.radians(self.ecef2llaArray(key)[:2])
+            self._rotations[key] = array([[-sin(lat)*cos(lon), -sin(lat)*sin(lon), cos(lat)],
+                                          [-sin(lon), cos(lon), 0],
+                                          [-cos(lat)*cos(lon), -cos(lat)*sin(lon), -sin(lat)]])
+        return self._rotations[key]
+
+    def ecef2nedArray(self, ecef, origin):
+        """
+        Converts arrays of ecef coordinates into the local tangent plane at origin.
+        Input: ecef - N x 3 array of (x, y, z) in (m, m, m)
+            origin - (x0, y0, z0) in (m, m, m)
+        Output: ned - N x 3 array of (north, east, down) in (m, m, m)
+        """
+        Re2t = self.rotationECEF2NED(origin)
+        return dot(np.asarray(ecef, dtype=np.float64) - np.asarray(origin, dtype=np.float64), Re2t.T)
+
+    def ned2ecefArray(self, ned, origin):
+        """
+        Converts arrays of ned local tangent plane coordinates into ecef coordinates
+        using origin as the ecef point of tangency.
+        Input: ned - N x 3 array of (north, east, down) in (m, m, m)
+            origin - (x0, y0, z0) in (m, m, m)
+        Output: ecef - N x 3 array of (x, y, z) in (m, m, m)
+        """
+        Re2t = self.rotationECEF2NED(origin)
+        return dot(np.asarray(ned, dtype=np.float64), Re2t) + np.asarray(origin, dtype=np.float64)
+
+    def ned2paeArray(self, ned):
+        """
+        Converts arrays of local north, east, down coordinates into range, azimuth,
+        and elevation angles
+        Input: ned - N x 3 array of (north, east, down) in (m, m, m)
+        Output: pae - N x 3 array of (p, alpha, epsilon) in (m, degrees, degrees)
+        """
+        ned = np.asarray(ned, dtype=np.float64)
+        horizontal = np.hypot(ned[..., 0], ned[..., 1])
+        return stackCoordinates(np.hypot(horizontal, ned[..., 2]),
+                                np.degrees(np.arctan2(ned[..., 1], ned[..., 0])),
+                                np.degrees(np.arctan2(-ned[..., 2], horizontal)))
+
+    def ecef2paeArray(self, ecef, origin):
+        """
+        Converts arrays of ecef coordinates into range, azimuth and elevation
+        angles seen from the origin (combines ecef2nedArray and ned2paeArray).
+        Input: ecef - N x 3 array of (x, y, z) in (m, m, m)
+            origin - (x0, y0, z0) in (m, m, m)
+        Output: pae - N x 3 array of (p, alpha, epsilon) in (m, degrees, degrees)
+        """
+        return self.ned2paeArray(self.ecef2nedArray(ecef, origin))
+
     def ecef2utm(self, ecef):
         """
         ecef2utm converts ECEF to UTM
@@ -289,6 +417,100 @@ class WGS84:
         else:
             return 'Z'
 
+    # latitude bands of 8 degrees from -80 degrees
+    UTM_LETTERS = 'CDEFGHJKLMNPQRSTUVWX'
+
+    def utmLetterDesignatorArray(self, lat):
+        """
+        Returns the latitude zones of an array of latitudes ('Z' outside -80 to 80 degrees)
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        letters = np.array(list(self.UTM_LETTERS + 'Z'))
+        band = np.floor((lat + 80.) / 8.)
+        band[~((band >= 0) & (band < len(self.UTM_LETTERS)))] = len(self.UTM_LETTERS)
+        return letters[band.astype(np.int64)]
+
+    def utmZoneArray(self, lat, lon):
+        """
+        Returns the UTM zone numbers and letters for arrays of lat, lon in decimal degrees,
+        including the special zones for Norway and Svalbard
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        zoneNumbers = np.floor((lon + 180.) / 6.).astype(np.int64) + 1
+        # Special zone for Norway
+        zoneNumbers[(56. <= lat) & (lat < 64.) & (3. <= lon) & (lon < 12.)] = 32
+        # Special zones for Svalbard
+        svalbard = (72. <= lat) & (lat < 84.)
+        for lonStart, lonEnd, zoneNumber in ((0., 9., 31), (9., 21., 33), (21., 33., 35), (33., 42., 37)):
+            zoneNumbers[svalbard & (lonStart <= lon) & (lon < lonEnd)] = zoneNumber
+        return zoneNumbers, self.utmLetterDesignatorArray(lat)
+
+    def lla2utmArray(self, lla, zoneNumber=None):
+        """
+        Converts arrays of lat, lon, alt to Universal Transverse Mercator coordinates,
+        using the same formulas as lla2utm
+        Input: lla - N x 3 array of (lat, lon, alt) in (decimal degrees, decimal degrees, m)
+            zoneNumber - project all points in this zone (eg to plot a track crossing
+                a zone border), None for the zone of each point
+        Output: utm - N x 3 array of (easting, northing, upping) in (m, m, m)
+            zones - array of the zones (eg '31U')
+            k - array of the scale factors
+        """
+        singlePoint = np.ndim(lla) == 1
+        lla = np.atleast_2d(np.asarray(lla, dtype=np.float64))
+        lat = lla[:, 0]
+        lon = lla[:, 1]
+        # Determine the zones
+        zoneNumbers, zoneLetters = self.utmZoneArray(lat, lon)
+        if zoneNumber is not None:
+            zoneNumbers = np.full_like(zoneNumbers, zoneNumber)
+        zones = np.char.add(zoneNumbers.astype(str), zoneLetters)
+        # Determine longitude origin
+        lonOriginRad = np.radians((zoneNumbers - 1) * 6 - 180 + 3)
+        latRad = np.radians(lat)
+        lonRad = np.radians(lon)
+        # Conversion constants
+        k0 = 0.9996
+        eSquared = self.e**2
+        ePrimeSquared = eSquared/(1.-eSquared)
+        sinLat = np.sin(latRad)
+        cosLat = np.cos(latRad)
+        tanLat = np.tan(latRad)
+        N = self.a/np.sqrt(1.-eSquared*sinLat**2)
+        T = tanLat**2
+        C = ePrimeSquared*cosLat**2
+        A = (lonRad - lonOriginRad)*cosLat
+        M = self.a*(
+            (1. -
+                eSquared/4. -
+                3.*eSquared**2/64. -
+                5.*eSquared**3/256)*latRad -
+            (3.*eSquared/8. +
+                3.*eSquared**2/32. +
+                45.*eSquared**3/1024.)*np.sin(2.*latRad) +
+            (15.*eSquared**2/256. +
+                45.*eSquared**3/1024.)*np.sin(4.*latRad) -
+            (35.*eSquared**3/3072.)*np.sin(6.*latRad))
+        # Calculate coordinates
+        x = k0*N*(
+            A+(1-T+C)*A**3/6. +
+            (5.-18.*T+T**2+72.*C-58.*ePrimeSquared)*A**5/120.) + 500000.
+        y = k0*(
+            M+N*tanLat*(
+                A**2/2. +
+                (5.-T+9.*C+4.*C**2)*A**4/24. +
+                (61.-58.*T+T**2+600.*C-330.*ePrimeSquared)*A**6/720.))
+        # Calculate scale factor
+        k = k0*(1 +
+                (1+C)*A**2/2. +
+                (5.-4.*T+42.*C+13.*C**2-28.*ePrimeSquared)*A**4/24. +
+                (61.-148.*T+16.*T**2)*A**6/720.)
+        utm = np.column_stack((x, y, lla[:, 2]))
+        if singlePoint:
+            return utm[0], zones[0], k[0]
+        return utm, zones, k
+
     def decimalDegrees2DMS(self, value, type):
         """
         Converts a Decimal Degree Value into
@@ -365,3 +587,45 @@ if __name__ == "__main__":
 
     utm = wgs84.lla2utm(lla)
     print('utm    : ', utm)
+
+    # compare the array versions with the scalar ones on a day of positions and orbits
+    import time
+    rng = np.random.RandomState(0)
+    nrPoints = 86400
+    llaArray = np.column_stack((rng.uniform(-89.9, 89.9, nrPoints), rng.uniform(-180., 180., nrPoints), rng.uniform(-100., 20200e3, nrPoints)))
+
+    start = time.time()
+    ecefScalar = np.array([wgs84.lla2ecef(point) for point in llaArray])
+    llaScalar = np.array([wgs84.ecef2lla(point) for point in ecefScalar])
+    paeScalar = np.array([wgs84.ecef2pae(point, begpRefPos) for point in ecefScalar])
+    timeScalar = time.time() - start
+
+    start = time.time()
+    ecefArray = wgs84.lla2ecefArray(llaArray)
+    llaBack = wgs84.ecef2llaArray(ecefArray)
+    paeArray = wgs84.ecef2paeArray(ecefArray, begpRefPos)
+    timeArray = time.time() - start
+
+    print('points = %d: scalar %.3f s, array %.3f s' % (nrPoints, timeScalar, timeArray))
+    print('max difference ecef      : %.3e m' % np.abs(ecefArray - ecefScalar).max())
+    print('max difference lat, lon  : %.3e deg (scalar %.3e deg)' % (np.abs(llaBack[:, :2] - llaArray[:, :2]).max(), np.abs(llaScalar[:, :2] - llaArray[:, :2]).max()))
+    print('max difference alt       : %.3e m (scalar %.3e m)' % (np.abs(llaBack[:, 2] - llaArray[:, 2]).max(), np.abs(llaScalar[:, 2] - llaArray[:, 2]).max()))
+    print('max difference pae       : %.3e m, %.3e deg' % (np.abs(paeArray[:, 0] - paeScalar[:, 0]).max(), np.abs(paeArray[:, 1:] - paeScalar[:, 1:]).max()))
+    print('ned2ecef(ecef2ned) error : %.3e m' % np.abs(wgs84.ned2ecefArray(wgs84.ecef2nedArray(ecefArray, begpRefPos), begpRefPos) - ecefArray).max())
+
+    # UTM projection of positions, including the zone borders and the Norway and Svalbard zones
+    llaUTM = np.column_stack((rng.uniform(-85., 85., nrPoints), rng.uniform(-180., 179.999, nrPoints), rng.uniform(-100., 1000., nrPoints)))
+    llaUTM[:8] = [[60., 5., 0.], [63.99, 2.99, 0.], [75., 8.9, 0.], [75., 9., 0.], [80., 41.9, 0.], [83.9, 20., 0.], [-80., -180., 0.], [0., 0., 0.]]
+
+    start = time.time()
+    utmScalar = [wgs84.lla2utm(point) for point in llaUTM]
+    timeScalar = time.time() - start
+
+    start = time.time()
+    utmArray, zones, scales = wgs84.lla2utmArray(llaUTM)
+    timeArray = time.time() - start
+
+    print('UTM points = %d: scalar %.3f s, array %.3f s' % (nrPoints, timeScalar, timeArray))
+    print('zones differing          : %d' % np.sum(zones != np.array([info[0] for utm, info in utmScalar])))
+    print('max difference east,north: %.3e m' % np.abs(utmArray - np.array([utm for utm, info in utmScalar])).max())
+    print('max difference scale     : %.3e' % np.abs(scales - np.array([info[1] for utm, info in utmScalar])).max())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+"""
+Downsampling of long time series before plotting
+
+A full day of 1 Hz (or higher rate) observations has far more points per line than the figure has
+pixel columns. The series are reduced to at most about the pixel width of the axes before they are
+given to matplotlib:
+
+- 'minmax' keeps per pixel column the first, minimum and maximum value, so the envelope of the
+  series, eg the dips of the CN0 during jamming, is drawn exactly as with all points
+- 'lttb' (Largest Triangle Three Buckets) keeps per bucket the point spanning the largest triangle
+  with its neighbours, which preserves the shape of smooth series with fewer points
+
+Points that must remain visible (eg loss of lock) are passed as keep, and a gap (NaN) in a pixel
+column is always kept so lines stay interrupted where there is no data.
+"""
+
+import numpy as np
+
+MINMAX = 'minmax'
+LTTB = 'lttb'
+
+
+def numericX(x):
+    """
+    numericX returns the x values as float array, datetimes are converted to microseconds since 1970
+    """
+    x = np.asarray(x)
+    if x.dtype == object or np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[us]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def pixelWidth(ax):
+    """
+    pixelWidth returns the width in pixels of the axes
+    """
+    fig = ax.figure
+    return max(int(round(ax.get_position().width * fig.get_figwidth() * fig.dpi)), 1)
+
+
+def pixelBuckets(xs, nrBuckets):
+    """
+    pixelBuckets returns for the (non-decreasing) x values the pixel column (0 .. nrBuckets-1) they fall in
+    """
+    span = xs[-1] - xs[0]
+    if not span > 0:
+        return np.zeros(len(xs), dtype=np.int64)
+    return np.minimum(((xs - xs[0]) * (nrBuckets / span)).astype(np.int64), nrBuckets - 1)
+
+
+def firstPerBucket(buckets, selected):
+    """
+    firstPerBucket returns the index of the first selected point of each bucket that has one
+    """
+    indices = np.flatnonzero(selected)
+    return indices[np.unique(buckets[indices], return_index=True)[1]]
+
+
+def minMaxIndices(xs, ys, nrBuckets):
+    """
+    minMaxIndices returns the indices of the first, minimum and maximum value in each of nrBuckets pixel columns
+    """
+    buckets = pixelBuckets(xs, nrBuckets)
+    starts = np.flatnonzero(np.diff(buckets)) + 1
+    starts = np.concatenate(([0], starts))
+    counts = np.diff(np.concatenate((starts, [len(ys)])))
+
+    valid = np.isfinite(ys)
+    yMin = np.where(valid, ys, np.inf)
+    yMax = np.where(valid, ys, -np.inf)
+    isMin = yMin == np.repeat(np.minimum.reduceat(yMin, starts), counts)
+    isMax = yMax == np.repeat(np.maximum.reduceat(yMax, starts), counts)
+
+    return np.concatenate((starts, firstPerBucket(buckets, isMin), firstPerBucket(buckets, isMax)))
+
+
+def lttbIndices(xs, ys, nrPoints):
+    """
+    lttbIndices returns the indices of nrPoints points selected with the Largest Triangle Three Buckets algorithm
+
+    The first and last point are kept, the other points are split in nrPoints - 2 buckets of equal size
+    from which the point forming the largest triangle with the previously selected point and the mean of
+    the next bucket is taken. NaN values are skipped, a bucket with only NaN keeps its first point.
+    """
+    nrValues = len(ys)
+    edges = np.linspace(1, nrValues - 1, nrPoints - 1).astype(np.int64)
+    edges = np.unique(edges)
+    nrBuckets = len(edges) - 1
+
+    # mean of the valid points of each bucket
+    valid = np.isfinite(ys)
+    counts = np.add.reduceat(valid, edges[:-1]).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        meanX = np.add.reduceat(np.where(valid, xs, 0.), edges[:-1]) / counts
+        meanY = np.add.reduceat(np.where(valid, ys, 0.), edges[:-1]) / counts
+
+    indices = np.empty(nrBuckets + 2, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = nrValues - 1
+    previous = 0 if valid[0] else None
+    for i in range(nrBuckets):
+        start, end = edges[i], edges[i + 1]
+        if i + 1 < nrBuckets:
+            nextX, nextY = meanX[i + 1], meanY[i + 1]
+        else:
+            nextX, nextY = xs[-1], ys[-1]
+
+        if previous is None:
+            # no valid point yet, take the point furthest from the next bucket
+            area = np.abs(ys[start:end] - nextY)
+        else:
+            prevX, prevY = xs[previous], ys[previous]
+            if not np.isfinite(nextY):
+                nextX, nextY = xs[end], prevY
+            area = np.abs((prevX - nextX) * (ys[start:end] - prevY) - (prevX - xs[start:end]) * (nextY - prevY))
+
+        if np.isfinite(area).any():
+            indices[i + 1] = start + np.nanargmax(area)
+            previous = indices[i + 1]
+        else:
+            indices[i + 1] = start
+
+    return indices
+
+
+def decimate(x, y, maxPoints, method=MINMAX, keep=None, xs=None):
+    """
+    decimate returns the (sorted) indices of the points of a series to plot
+
+    Parameters:
+        x: the x values (numbers or datetimes, non-decreasing)
+        y: the y values, NaN for missing values
+        maxPoints: maximum number of points (apart from those in keep), normally the pixel width
+        method: MINMAX or LTTB
+        keep: indices of points that are always kept (eg loss of lock)
+        xs: numericX(x) when already computed for another series with the same x
+
+    Returns:
+        indices into x and y, all indices when the series is not longer than maxPoints
+    """
+    nrValues = len(y)
+    if nrValues <= max(maxPoints, 3):
+        return np.arange(nrValues)
+
+    if xs is None:
+        xs = numericX(x)
+    ys = np.asarray(y, dtype=np.float64)
+
+    if method == MINMAX:
+        # the first, minimum and maximum of each pixel column
+        indices = minMaxIndices(xs, ys, max(maxPoints // 3, 1))
+    elif method == LTTB:
+        indices = lttbIndices(xs, ys, maxPoints)
+    else:
+        raise ValueError('unknown downsampling method %s' % method)
+
+    # keep a gap in every pixel column where data are missing
+    gaps = firstPerBucket(pixelBuckets(xs, max(maxPoints // 3, 1)), ~np.isfinite(ys))
+
+    if keep is not None:
+        keep = np.asarray(keep, dtype=np.int64).ravel()
+        indices = np.concatenate((indices, keep[(keep >= 0) & (keep < nrValues)]))
+
+    return np.unique(np.concatenate((indices, gaps, [0, nrValues - 1])))
+
+
+def plotDecimated(ax, x, y, method=MINMAX, keep=None, xs=None, **kwargs):
+    """
+    plotDecimated plots a series on the axes after downsampling it to the pixel width of the axes
+
+    Parameters:
+        ax: the axes to plot on
+        x, y, method, keep, xs: see decimate
+        kwargs: passed to ax.plot
+
+    Returns:
+        the lines created by ax.plot
+    """
+    indices = decimate(x, y, pixelWidth(ax), method, keep, xs)
+    return ax.plot(np.asarray(x)[indices], np.asarray(y)[indices], **kwargs)
+
+
+if __name__ == "__main__":
+    import time
+
+    # a day of 1 Hz CN0 values with a jamming dip and a data gap
+    nrValues = 86400
+    x = np.arange(nrValues, dtype=np.float64)
+    y = 45. + 5. * np.sin(x / 7200.) + np.random.randn(nrValues)
+    y[43200:43205] = 10.
+    y[60000:60600] = np.nan
+
+    for method in (MINMAX, LTTB):
+        start = time.time()
+        indices = decimate(x, y, 640, method)
+        print('%s: %d of %d points in %.3f s, dip kept: %s, gap kept: %s' % (method, len(indices), nrValues, time.time() - start,
+                                                                           np.nanmin(y[indices]) == 10., np.isnan(y[indices]).any()))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""
+Parallel rendering of the PNG figures
+
+A figure is described by a job (drawFunction, args, style): drawFunction(fig, *args) draws on the
+matplotlib Figure it receives using the object-oriented API, saves it and returns the name of the
+PNG file. style is a matplotlib style (eg 'ggplot') or None for the default style. The draw functions
+are module level functions, so the jobs can be sent to other processes.
+
+In headless mode (the default) every figure is a plain Figure with an Agg canvas, the jobs are
+distributed over a pool of processes and the PNG files are written concurrently. matplotlib.pyplot
+is never imported, so no interactive backend (nor a display) is needed. With display set, the
+figures are created through pyplot one after the other and shown at the end.
+"""
+
+import multiprocessing
+
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+
+def renderFigure(job):
+    """
+    renderFigure draws and saves the figure of a job on an Agg canvas
+
+    Parameters:
+        job: (drawFunction, args, style)
+
+    Returns:
+        name of the PNG file written
+    """
+    drawFunction, args, style = job
+    with matplotlib.style.context(style or []):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        return drawFunction(fig, *args)
+
+
+def displayFigures(jobs, verbose=False):
+    """
+    displayFigures draws and saves the figures of the jobs through pyplot and shows them interactively
+
+    Returns:
+        names of the PNG files written
+    """
+    import matplotlib.pyplot as plt
+
+    pngNames = []
+    for drawFunction, args, style in jobs:
+        with matplotlib.style.context(style or []):
+            pngNames.append(drawFunction(plt.figure(), *args))
+        logger.log(ssnLogging.verboseLevel(verbose), '    Created %s', pngNames[-1])
+    plt.show()
+
+    return pngNames
+
+
+def renderFigures(jobs, nrProcesses=None, display=False, verbose=False):
+    """
+    renderFigures creates the figures of all jobs
+
+    Parameters:
+        jobs: list of (drawFunction, args, style)
+        nrProcesses: number of worker processes (defaults to one per job, at most the number of CPUs)
+        display: show the figures interactively instead of rendering them headless in parallel
+
+    Returns:
+        names of the PNG files written
+    """
+    if not jobs:
+        return []
+    if display:
+        return displayFigures(jobs, verbose)
+
+    if nrProcesses is None:
+        nrProcesses = min(len(jobs), multiprocessing.cpu_count())
+    logger.log(ssnLogging.verboseLevel(verbose), '    Rendering %d figures using %d processes', len(jobs), nrProcesses)
+
+    if nrProcesses <= 1:
+        pngNames = [renderFigure(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(nrProcesses)
+        try:
+            pngNames = pool.map(renderFigure, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    for pngName in pngNames:
+        logger.log(ssnLogging.verboseLevel(verbose), '    Created %s', pngName)
+
+    return pngNames
@@ -1,21 +1,26 @@
 #!/usr/bin/env python
 
-import pylab
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.dates as md
 import matplotlib.cm as cm
-import sys
+import downsample
 
 from SSN import ssnConstants as mSSN
 from GNSS import gpstime
+from SSN import ssnLogging
 # import ggplot2
 
+logger = ssnLogging.getLogger(__name__)
 
-def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center'):
+# colors used for the signal types / satellites
+CN0_COLORS = ['purple', 'black', 'green', 'cyan', 'violet']
+
+
+def suplabel(fig, axis, label, label_prop=None, labelpad=3, ha='center', va='center'):
     """
     Add super ylabel or xlabel to the figure
     Similar to matplotlib.suptitle
+        fig        - the figure
         axis       - string: "x" or "y"
         label      - string
         label_prop - keyword dictionary for Text
@@ -23,7 +28,6 @@ def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center')
         ha         - horizontal alignment (default: "center")
         va         - vertical alignment (default: "center")
     """
-    fig = pylab.gcf()
     xmin = []
     ymin = []
     for ax in fig.axes:
@@ -43,10 +47,10 @@ def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center')
         raise Exception("Unexpected axis: x or y")
     if label_prop is None:
         label_prop = dict()
-    pylab.text(x, y, label, rotation=rotation,
-               transform=fig.transFigure,
-               ha=ha, va=va,
-               **label_prop)
+    fig.text(x, y, label, rotation=rotation,
+             transform=fig.transFigure,
+             ha=ha, va=va,
+             **label_prop)
 
 
 def TOW2UTC(WkNr, TOW):
@@ -58,250 +62,181 @@ def TOW2UTC(WkNr, TOW):
         TOW: list of TOWs to transform
 
     Return:
-        UTC: list of UTCs
+        UTC: array of UTCs (datetime)
     """
-    # transform TOW to UTC representation
-    UTC = []
-    for i in range(0, len(TOW)):
-        UTC.append(gpstime.UTCFromWT(float(WkNr), float(TOW[i])))
-    print("UTC = %s to %s" % (UTC[0], UTC[-1]))
+    # transform TOW to UTC representation (in GPS time as UTCFromWT) in a single pass
+    UTC = gpstime.datetimeFromWT(WkNr, TOW, leapSecs=0)
+    logger.debug("UTC = %s to %s", UTC[0], UTC[-1])
 
     return UTC
 
 
-def plotCN0(k, firstSV, listSVIDs, listST, spanElevation, spanUTC, spanJammingStart, spanJammingEnd, CN0meas, dataVisibilitySVprn, dataJammingValues, dateStr, verbose=False):
+def annotateCopyright(ax):
+    """
+    annotateCopyright adds the copyright notices below the axes
+    """
+    ax.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
+    ax.text(1, -0.125, r'$\copyright$ Andrei Alex (andrei.alex.toma@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
+
+
+def drawSignalTypeCN0(fig, signalType, satLabels, spanUTC, CN0s, dateStr):
     """
-    plotCN0 plots the CN0 values for SVs per signalType observed
+    drawSignalTypeCN0 draws the CN0 of all SVs observed on a signalType and saves it as <signal>-CN0.png
+
+    Parameters:
+        fig: the figure to draw on
+        satLabels: labels of the SVs (eg E11)
+        spanUTC: UTC times of the CN0 values
+        CN0s: CN0 values per SV
+
+    Returns:
+        name of the PNG file
+    """
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_prop_cycle(color=CN0_COLORS)
+
+    # plot for each SV its CN0 value for this signalType, reduced to the minimum and maximum per pixel so jamming dips remain
+    spanX = downsample.numericX(spanUTC)
+    for satLabel, CN0 in zip(satLabels, CN0s):
+        downsample.plotDecimated(ax, spanUTC, CN0, downsample.MINMAX, xs=spanX, linestyle='-', linewidth=0.5, alpha=0.75, label=satLabel)
+
+    # plot annotation
+    ax.set_title('Signaltype: %s' % mSSN.GNSSSignals[signalType]['name'], fontsize='x-large')
+    ax.set_xlabel('Time of ' + dateStr)
+    ax.set_ylabel('C/N0')
+    # adjust the X-axis to represent readable time
+    ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
+    ax.set_xlim(spanUTC[0], spanUTC[-1])
+    annotateCopyright(ax)
+
+    # Shrink current axis's height by x% on the bottom
+    box = ax.get_position()
+    ax.set_position([box.x0, box.y0 + box.height * 0.3, box.width, box.height * 0.7])
+    box = ax.get_position()
+
+    # add the legend
+    legend = ax.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='lower center', ncol=np.size(satLabels), fontsize='xx-small')
+    for line in legend.get_lines():  # the legend linewidth
+        line.set_linewidth(4)
+
+    pngName = '%s-CN0.png' % mSSN.GNSSSignals[signalType]['name']
+    fig.savefig(pngName, dpi=fig.dpi)
+
+    return pngName
+
+
+def drawSatelliteCN0(fig, SVID, signalTypes, spanUTC, CN0s, dateStr, spanElevation=None, elevation=None, spanJammingStart=(), spanJammingEnd=(), dataJammingValues=()):
+    """
+    drawSatelliteCN0 draws the CN0 of all signalTypes of a SV, its elevation (when visible) and the jamming periods,
+    and saves it as <syst>-<SV>-CN0.png
+
+    Parameters:
+        fig: the figure to draw on
+        signalTypes: signalTypes observed for the SV
+        spanUTC: UTC times of the CN0 values
+        CN0s: CN0 values per signalType
+        spanElevation, elevation: UTC times and elevation of the SV (None when not in the visibility data)
+        spanJammingStart, spanJammingEnd, dataJammingValues: jamming periods and their values
+
+    Returns:
+        name of the PNG file
+    """
+    gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
+    stLabels = [mSSN.GNSSSignals[signalType]['name'] for signalType in signalTypes]
+
+    ax = fig.add_subplot(1, 1, 1)
+    spanX = downsample.numericX(spanUTC)
+    if elevation is None:
+        colors = iter(cm.rainbow(np.linspace(0, 1, len(signalTypes))))
+        for stLabel, CN0 in zip(stLabels, CN0s):
+            downsample.plotDecimated(ax, spanUTC, CN0, downsample.MINMAX, xs=spanX, linestyle='-', color=next(colors), linewidth=0.25, alpha=0.75, label=stLabel)
+        ax.set_ylabel('C/N0')
+    else:
+        ax.set_prop_cycle(color=CN0_COLORS)
+        for stLabel, CN0 in zip(stLabels, CN0s):
+            downsample.plotDecimated(ax, spanUTC, CN0, downsample.MINMAX, xs=spanX, linestyle='-', linewidth=0.5, alpha=1, label=stLabel)
+
+        # plotting Elevation
+        ax2 = ax.twinx()
+        ax2.set_ylim(0, 90)
+        downsample.plotDecimated(ax2, spanElevation, elevation, downsample.LTTB, linestyle='-', color='red', linewidth=0.5, alpha=0.75, label='Elevation')
+        ax.set_ylabel('C/NO', fontsize='x-large')
+        ax2.set_ylabel('Elevation', fontsize='x-large')
+    ax.set_ylim(0, 60)
+
+    # plot annotation
+    ax.set_title('Satellite: %s%d' % (gnssSystShort, gnssPRN))
+    ax.set_xlabel('Time of ' + dateStr)
+
+    if elevation is not None:
+        # plotting vertical lines corresponding the jamming starting and ending time
+        y_min, y_max = ax.get_ylim()
+        for jamStart, jamEnd, jamValue in zip(spanJammingStart, spanJammingEnd, dataJammingValues):
+            ax.axvline(jamStart, color='k', linestyle='-')
+            ax.axvline(jamEnd, color='k', linestyle='-')
+            ax.text(jamStart, y_min + 2, jamValue, horizontalalignment='right', rotation='90')
+            ax.fill([jamStart, jamStart, jamEnd, jamEnd], [y_min, y_max, y_max, y_min], color='gray', alpha=0.2)
+
+    # adjust the X-axis to represent readable time
+    ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
+    ax.set_xlim(spanUTC[0], spanUTC[-1])
+    annotateCopyright(ax)
+
+    # Shrink current axis's height by x% on the bottom
+    box = ax.get_position()
+    ax.set_position([box.x0, box.y0 + box.height * 0.4, box.width, box.height * 0.6])
+    box = ax.get_position()
+
+    # add the legend
+    legend = ax.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='lower center', ncol=np.size(stLabels), fontsize='xx-small')
+    if elevation is None:
+        for line in legend.get_lines():  # the legend linewidth
+            line.set_linewidth(4)
+
+    fig.tight_layout(rect=(0, 0, 1, 1))
+    # Shrink current axis's height by 10% on the bottom
+    box = ax.get_position()
+    ax.set_position([box.x0, box.y0 + box.height * 0.1, box.width, box.height * 0.9])
+
+    pngName = '%s-%s%d-CN0.png' % (gnssSyst, gnssSystShort, gnssPRN)
+    if elevation is None:
+        fig.savefig(pngName, dpi=fig.dpi)
+    else:
+        fig.subplots_adjust(wspace=.2, hspace=.1)
+        fig.savefig(pngName, dpi=fig.dpi, bbox_inches='tight')
+
+    return pngName
+
+
+def cn0Figures(listSVIDs, listST, spanUTC, CN0meas, elevations, spanJammingStart, spanJammingEnd, dataJammingValues, dateStr):
+    """
+    cn0Figures creates the jobs for the CN0 plots: one per signalType with all SVs and one per SV with all
+    its signalTypes, its elevation and the jamming periods. The jobs are rendered by figureRenderer.renderFigures.
+
     Parameters:
-        k is the coresponding satellite from the Visibility block
-        listSVIDs is list of SVIDs we have data for
-        listST is list of signaltypes
-        spanTElevation is the GPS time representation of satellites from Elevation file
-        spanUTC is the UTC representation of spanElevation
-        CN0meas contains observed CN0 for all SVs and all signalTypes
+        listSVIDs, listST: SVID and signalType of each CN0 series
+        spanUTC: UTC times of the CN0 values
+        CN0meas: CN0 series for all SVs and all signalTypes
+        elevations: dict with per visible SVID (UTC times, elevation)
+        spanJammingStart, spanJammingEnd, dataJammingValues: jamming periods and their values
+        dateStr: observation date
+
+    Returns:
+        list of (drawFunction, args, style)
     """
-    # plt.style.use('ggplot')
-    # plt.style.use('BEGPIOS')
+    jobs = []
 
     # first plot all SVs per signalType
-    # get unique list of signaltypes to determine the number of plots we have to make
-    uniqSTs = list(set(listST))
-    uniqSVs = list(set(listSVIDs))
-    figNr = len(uniqSTs)  # nr of figures already used
-    # print('uniqSTs = %s' % uniqSTs)
-    # loop over the signalTypes
-    if k == firstSV:
-        for i, uniqSTi in enumerate(uniqSTs):
-            plt.figure(i)
-            ax = plt.gca()
-            ax.set_color_cycle(['purple', 'black', 'green', 'cyan', 'violet'])
-            # create label for identify SV and plot its CN0 value for this signalType
-            satLabel = []
-            # colors = iter(cm.rainbow(np.linspace(0, 1, len(listSVIDs))))
-            for j, STj in enumerate(listST):
-                if STj == uniqSTi:
-                    satLabel.append(mSSN.svPRN(listSVIDs[j])[1] + str(mSSN.svPRN(listSVIDs[j])[2]))
-                    plt.plot(spanUTC, CN0meas[j], linestyle='-', linewidth=0.5, alpha=0.75, label=satLabel[-1])
-            print('i = %d  len = %d' % (i, np.size(uniqSTs)))
-
-            # plot annotation
-            plt.title('Signaltype: %s' % mSSN.GNSSSignals[uniqSTi]['name'], fontsize='x-large')
-            plt.xlabel('Time of ' + dateStr)
-            plt.ylabel('C/N0')
-            # adjust the X-axis to represent readable time
-            ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
-            plt.xlim(spanUTC[0], spanUTC[-1])
-            # annotate for copyright
-            plt.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            plt.text(1, -0.125, r'$\copyright$ Andrei Alex (andrei.alex.toma@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            # add the legend
-
-            # Shrink current axis's height by x% on the bottom
-            box = ax.get_position()
-            # print('box.x0     = %f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            # ax = plt.subplot(111)
-            ax.set_position([box.x0, box.y0 + box.height * 0.3,
-                             box.width, box.height * 0.7])
-            box = ax.get_position()
-            # print('after\nbox.x0     = %f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            plt.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='lower center', ncol=np.size(satLabel), fontsize='xx-small')
-            llines = plt.gca().get_legend().get_lines()  # all the lines.Line2D instance in the legend
-            plt.setp(llines, linewidth=4)      # the legend linewidth
-            # ggplot2.rstyle(ax)
-
-            fig = plt.gcf()
-            if verbose:
-                print('\nfigname = %s -- %s' % (STj, mSSN.GNSSSignals[uniqSTi]['name']))
-            fig.savefig('%s-CN0.png' % (mSSN.GNSSSignals[uniqSTi]['name']), dpi=fig.dpi)
-
-            if i != len(uniqSTs) - 1:
-                if verbose:
-                    plt.show(block=False)
-            else:
-                if verbose:
-                    plt.show()
-
-        # second plot all signalTypes per SVs
-        # find the SV identifiers ans make them unique
-        for i, uniqSVi in enumerate(uniqSVs):
-            plt.figure(i + figNr)
-            ax = plt.gca()
-
-            # create label for signalType and plot its SN0 for this uniqSVi
-            stLabel = []
-            colors = iter(cm.rainbow(np.linspace(0, 1, len(listST))))
-
-            for j, SVj in enumerate(listSVIDs):
-                if SVj == uniqSVi:
-                    stLabel.append(mSSN.GNSSSignals[listST[j]]['name'])
-                    print('mSSN.GNSSSignals[listST[%d]][name] = %s' % (j, mSSN.GNSSSignals[listST[j]]['name']))
-                    print('spanUTC = %s  ==>  %s' % (spanUTC[0], spanUTC[-1]))
-                    plt.plot(spanUTC, CN0meas[j], linestyle='-', color=next(colors), linewidth=0.25, alpha=0.75, label=stLabel[-1])
-                    ax.set_ylim(0, 60)
-                    # plot annotation
-                    gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVj)
-                    textSVID = gnssSystShort + str(gnssPRN)
-                    print('j = %d - SV = %s,  uniqSVi = %s\n' % (i, textSVID, uniqSVi))
-
-                    plt.title('Satellite: %s' % textSVID)
-                    plt.xlabel('Time of ' + dateStr)
-                    plt.ylabel('C/N0')
-
-            # adjust the X-axis to represent readable time
-            ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
-            plt.xlim(spanUTC[0], spanUTC[-1])
-            # annotate for copyright
-            plt.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            plt.text(1, -0.125, r'$\copyright$ Andrei Alex (andrei.alex.toma@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            # add the legend
-            # Shrink current axis's height by x% on the bottom
-            box = ax.get_position()
-            # print('box.x0     = %f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            # ax = plt.subplot(111)
-            ax.set_position([box.x0, box.y0 + box.height * 0.4,
-                             box.width, box.height * 0.6])
-            box = ax.get_position()
-            # print('after\nbox.x0     = %f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            plt.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='lower center', ncol=np.size(stLabel), fontsize='xx-small')
-            llines = plt.gca().get_legend().get_lines()  # all the lines.Line2D instance in the legend
-            plt.setp(llines, linewidth=4)      # the legend linewidth
-
-            # plt.legend(bbox_to_anchor=(0., 1.052, 1., .052), loc='lower left', ncol=np.size(stLabel), mode="expand", borderaxespad=0., fontsize=9)
-            plt.tight_layout(rect=(0, 0, 1, 1))
-            # Shrink current axis's height by 10% on the bottom
-            box = ax.get_position()
-            ax = plt.subplot(111)
-            ax.set_position([box.x0, box.y0 + box.height * 0.1,
-                             box.width, box.height * 0.9])
-            fig = plt.gcf()
-            fig.savefig('%s-%s%d-CN0.png' % (gnssSyst, gnssSystShort, gnssPRN), dpi=fig.dpi)
-            if i != len(uniqSVs)-1:
-                if verbose:
-                    plt.show(block=False)
-            else:
-                if verbose:
-                    plt.show()
-        # close the figure
-            plt.close()
-    for i, uniqSVi in enumerate(uniqSVs):
-        if k == uniqSVi:
-            fig = plt.figure(i + figNr)
-            ax = plt.gca()
-            ax.set_color_cycle(['purple', 'black', 'green', 'cyan', 'violet'])
-
-            # create label for signalType and plot its SN0 for this uniqSVi
-            stLabel = []
-            for j, SVj in enumerate(listSVIDs):
-                if SVj == uniqSVi:
-                    stLabel.append(mSSN.GNSSSignals[listST[j]]['name'])
-                    print('mSSN.GNSSSignals[listST[%d]][name] = %s' % (j, mSSN.GNSSSignals[listST[j]]['name']))
-                    print('spanUTC = %s  ==>  %s' % (spanUTC[0], spanUTC[-1]))
-                    # plotting CNO
-                    ax.plot(spanUTC, CN0meas[j], linestyle='-', linewidth=0.5, alpha=1, label=stLabel[-1])
-                    ax.set_ylim(0, 60)
-                    # plot annotation for CN0
-                    gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVj)
-                    textSVID = gnssSystShort + str(gnssPRN)
-                    print('j = %d - SV = %s,  uniqSVi = %s\n' % (i, textSVID, uniqSVi))
-                    plt.title('Satellite: %s' % textSVID)
-                    plt.xlabel('Time of ' + dateStr)
-
-                    # plotting Elevation
-                    ax2 = ax.twinx()
-                    ax2.set_ylim(0, 90)
-                    ax2.plot(spanElevation, dataVisibilitySVprn, linestyle='-', color='red', linewidth=0.5, alpha=0.75, label='Elevation')
-                    ax.set_ylabel('C/NO', fontsize='x-large')
-                    ax2.set_ylabel('Elevation', fontsize='x-large')
-            y_min, y_max = ax.get_ylim()
-
-            # plotting vertical lines corresponding the jamming starting and ending time
-            for i, j, k in zip(spanJammingStart, spanJammingEnd, dataJammingValues):
-                ax.axvline(i, color='k', linestyle='-')
-                ax.axvline(j, color='K', linestyle='-')
-                ax.text(i, y_min + 2, k, horizontalalignment='right', rotation='90')
-                ax.fill([i, i, j, j], [y_min, y_max, y_max, y_min], color='gray', alpha=0.2)
-            # adjust the X-axis to represent readable time
-            ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
-            plt.xlim(spanUTC[0], spanUTC[-1])
-            # if k == uniqSVi:
-            #     ax2 = plt.gca()
-            #     ax2.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
-            #     ax2.xlim(spanUTC[0], spanUTC[-1])
-            # annotate for copyright
-            plt.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            plt.text(1, -0.125, r'$\copyright$ Andrei Alex (andrei.alex.toma@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-            # add the legend
-            # Shrink current axis's height by x% on the bottom
-            box = ax.get_position()
-            # print('box.x0     =a%f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            ax.set_position([box.x0, box.y0 + box.height * 0.4,
-                             box.width, box.height * 0.6])
-            box = ax.get_position()
-            # print('after\nbox.x0     = %f' % box.x0)
-            # print('box.y0     = %f' % box.y0)
-            # print('box.width  = %f' % box.width)
-            # print('box.height = %f' % box.height)
-
-            ax.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='lower center', ncol=np.size(stLabel), fontsize='xx-small')
-            # ax2.legend(bbox_to_anchor=(box.x0 + box.width*0.2, -0.15, box.width*0.6, 0.15), loc='best', ncol=np.size(stLabel), fontsize='xx-small')
-            # plt.legend(bbox_to_anchor=(0., 1.052, 1., .052), loc='lower left', ncol=np.size(stLabel), mode="expand", borderaxespad=0., fontsize=9)
-            # llines = plt.gca().get_legend().get_lines()  # all the lines.Line2D instance in the legend
-            # plt.setp(llines, linewidth=4)      # the legend linewidth
-
-            plt.tight_layout(rect=(0, 0, 1, 1))
-
-            # Shrink current axis's height by 10% on the bottom
-            box = ax.get_position()
-            ax.set_position([box.x0, box.y0 + box.height * 0.1, box.width, box.height * 0.9])
-            fig.subplots_adjust(wspace=.2, hspace=.1)
-            fig = plt.gcf()
-            fig.savefig('%s-%s%d-CN0.png' % (gnssSyst, gnssSystShort, gnssPRN), dpi=fig.dpi, bbox_inches='tight')
-
-            if i != len(uniqSVs)-1:
-                if verbose:
-                    plt.show(block=False)
-            else:
-                if verbose:
-                    plt.show()
-        # close the figure
-        plt.close()
+    for signalType in sorted(set(listST)):
+        iSeries = [j for j, STj in enumerate(listST) if STj == signalType]
+        satLabels = [mSSN.svPRN(listSVIDs[j])[1] + str(mSSN.svPRN(listSVIDs[j])[2]) for j in iSeries]
+        jobs.append((drawSignalTypeCN0, (signalType, satLabels, spanUTC, [CN0meas[j] for j in iSeries], dateStr), None))
+
+    # second plot all signalTypes per SV
+    for SVID in sorted(set(listSVIDs)):
+        iSeries = [j for j, SVj in enumerate(listSVIDs) if SVj == SVID]
+        spanElevation, elevation = elevations.get(SVID, (None, None))
+        jobs.append((drawSatelliteCN0, (SVID, [listST[j] for j in iSeries], spanUTC, [CN0meas[j] for j in iSeries], dateStr,
+                                        spanElevation, elevation, spanJammingStart, spanJammingEnd, dataJammingValues), None))
+
+    return jobs
@@ -9,8 +9,11 @@ import sys
 
 from SSN import ssnConstants as mSSN
 from GNSS import gpstime
+from SSN import ssnLogging
 # import ggplot2
 
+logger = ssnLogging.getLogger(__name__)
+
 
 def TOW2UTC(WkNr, TOW):
     '''
@@ -21,13 +24,11 @@ def TOW2UTC(WkNr, TOW):
         TOW: list of TOWs to transform
 
     Return:
-        UTC: list of UTCs
+        UTC: array of UTCs (datetime)
     '''
-    # transform TOW to UTC representation
-    UTC = []
-    for i in range(0, len(TOW)):
-        UTC.append(gpstime.UTCFromWT(float(WkNr), float(TOW[i])))
-    print("UTC = %s to %s" % (UTC[0], UTC[-1]))
+    # transform TOW to UTC representation (in GPS time as UTCFromWT) in a single pass
+    UTC = gpstime.datetimeFromWT(WkNr, TOW, leapSecs=0)
+    logger.debug("UTC = %s to %s", UTC[0], UTC[-1])
 
     return UTC
 
@@ -56,15 +57,14 @@ def plotCN0diff(listSVIDs, listST, spanUTC, CN0measdiff, dateStr, verbose=False)
             for j, SVj in enumerate(listSVIDs):
                 if SVj == uniqSVi:
                     stLabel.append(mSSN.GNSSSignals[listST[j]]['name'])
-                    print('mSSN.GNSSSignals[listST[%d]][name] = %s' % (j, mSSN.GNSSSignals[listST[j]]['name']))
-                    print('spanUTC = %s  ==>  %s' % (spanUTC[0], spanUTC[-1]))
-                    print(len(spanUTC), len(CN0measdiff[j]))
+                    logger.debug('mSSN.GNSSSignals[listST[%d]][name] = %s', j, mSSN.GNSSSignals[listST[j]]['name'])
+                    logger.debug('spanUTC = %s  ==>  %s (%d, %d)', spanUTC[0], spanUTC[-1], len(spanUTC), len(CN0measdiff[j]))
                     plt.plot(spanUTC, CN0measdiff[j], linestyle='-', linewidth=0.25, alpha=0.75, label=stLabel[-1])
                     ax.set_ylim(-4, 4)
                     # plot annotation
                     gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVj)
                     textSVID = gnssSystShort + str(gnssPRN)
-                    print('j = %d - SV = %s,  uniqSVi = %s\n' % (i, textSVID, uniqSVi))
+                    logger.debug('j = %d - SV = %s,  uniqSVi = %s', i, textSVID, uniqSVi)
 
                     plt.title('Satellite: %s' % textSVID)
                     plt.xlabel('Time of ' + dateStr)
@@ -4,17 +4,23 @@ from math import ceil
 import numpy as np
 import matplotlib.pyplot as plt
 
+from SSN import ssnLogging
 
-def plotNrSVsXDOP(dataXDOP, maxDOP, verbose=False):
+logger = ssnLogging.getLogger(__name__)
+
+
+def plotNrSVsXDOP(dataXDOP, maxDOP, pngName, verbose=False):
     '''
     plotNrSVsXDOP plots the observed/used number of SVs and the corresponding xDOP parameters
 
     Parameters:
         dataXDOP: numpy array that comes from reading the DOP_2 sbf2stf results file and with valid NrSVs detected
         maxDOP: the maximum xDOP value to display
+        pngName: name of the PNG file the plot is saved to
+        verbose: also display the plot interactively
     '''
     # plt.style.use('ggplot')
-    plt.style.use('BEGPIOS')
+    # plt.style.use('BEGPIOS')
     plt.figure(1)
     plt.title('xDOP values', fontsize='x-large')
 
@@ -26,12 +32,15 @@ def plotNrSVsXDOP(dataXDOP, maxDOP, verbose=False):
 
     for i, xDOP in enumerate(listXDOP):
         # clean the xDOP data column by eliminating all data == 65535
-        indicesOK = np.where(dataXDOP[xDOP] != 65535 and np.where(dataXDOP[xDOP] != np.nan))
+        indicesOK = np.where((dataXDOP[xDOP] != 65535) & ~np.isnan(dataXDOP[xDOP]))
         dataXDOPvalid = dataXDOP[xDOP][indicesOK]
         maxXDOP = int(ceil(max(dataXDOPvalid)))
-        print('max(dataXDOPvalid) = %f - ceil = %f' % (max(dataXDOPvalid), maxXDOP))
+        logger.debug('max(dataXDOPvalid) = %f - ceil = %f', max(dataXDOPvalid), maxXDOP)
         plt.plot(dataXDOP['DOP_TOW'][indicesOK], dataXDOPvalid, color=next(colors), marker='.', markersize=1, linestyle='None')
 
     ax = plt.gca()
     ax.set_ylim(0, min(maxDOP, maxXDOP))
-    plt.show()
+    plt.savefig(pngName)
+    logger.info('Created %s', pngName)
+    if verbose:
+        plt.show()
@@ -1,88 +1,75 @@
 #!/usr/bin/env python
 
-import matplotlib.pyplot as plt
+import numpy as np
 import plotConstants as mPlt
+import downsample
 import matplotlib.dates as md
 from SSN import ssnConstants as mSSN
 from GNSS import gpstime
 
 
-def plotLockTime(SVID, signalTypes, dataMeasSVID, lliIndices, lliTOWs, verbose):
+def drawLockTime(fig, SVID, signalTypes, dataMeasSVID, lliIndices):
     """
-    plotLockTime creates a plot of the locktime and indicates loss of locks
+    drawLockTime draws the locktime and indicates loss of locks, saved as <syst>-<SV>-locktime.png
 
     Parameters:
+        fig: the figure to draw on
         SVID: satellite ID
         signalTypes: signal types to represent
         dataMeasSVID: data from MeasEpoch_2 but for one SVs
-        indexLossOfLock: indices for the occurance of loss of lock
-        verbose: display interactive plot
+        lliIndices: indices for the occurance of loss of lock
+
+    Returns:
+        name of the PNG file
     """
-    # print('\nplotLockTime' + '-' * 25)
     gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
 
-    # for i, signalType in enumerate(signalTypes):
-    #     print('PLT: signalType[%d] = %s' % (i, signalType))
-    #     print('PLT: TOW = %s (%d)' % (dataMeasSVID[i]['MEAS_TOW'], len(dataMeasSVID[i]['MEAS_TOW'])))
-    #     print('PLT: lockTimes = %s (%d)\n' % (dataMeasSVID[i]['MEAS_LOCKTIME'], len(dataMeasSVID[i]['MEAS_LOCKTIME'])))
-    #     print("PLT: indexLossOfLock[%d] = %s (Nr = %d)" % (i, lliIndices[i], len(lliIndices[i])))
-    #     # myData2 = dataMeasSVID[i][lliIndices[i]]
-    #     # print("PLT: myData2 = %s (len = %d)" % (myData2['MEAS_TOW'], len(myData2['MEAS_TOW'])))
-    #     # print("PLT: idemand = %s (len = %d)\n" % (dataMeasSVID[i][lliIndices[i]]['MEAS_TOW'], len(dataMeasSVID[i][)lliIndices[i]]['MEAS_TOW']))
-
-    # create the plot window
-    # plt.style.use('BEGPIOS')
-    plt.style.use('ggplot')
-    plt.figure(1)
-    subPlot = plt.subplot(1, 1, 1)
+    subPlot = fig.add_subplot(1, 1, 1)
     # titles and axis-labels
     dateString = gpstime.UTCFromWT(float(dataMeasSVID[0]['MEAS_WNC'][0]), float(dataMeasSVID[0]['MEAS_TOW'][0])).strftime("%d/%m/%Y")
-    plt.title('Lock Times for %s PRN %d (%d)' % (gnssSyst, gnssPRN, SVID))  # , fontsize='18'
-    plt.ylabel('Lock Time [s]')
-    plt.xlabel('Time [hh:mm] (' + dateString + ')')
+    subPlot.set_title('Lock Times for %s PRN %d (%d)' % (gnssSyst, gnssPRN, SVID))  # , fontsize='18'
+    subPlot.set_ylabel('Lock Time [s]')
+    subPlot.set_xlabel('Time [hh:mm] (' + dateString + ')')
 
     for index, signalType in enumerate(signalTypes):
-        # lockTime = dataMeasSVID[index]['MEAS_LOCKTIME']
-        # print("index = %d  lockTime.size = %d" % (index, len(lockTime)))
         sigTypeColor = mPlt.getSignalTypeColor(signalType)
 
-        utc = []
-        for count in range(0, len(dataMeasSVID[index])):
-            utc.append(gpstime.UTCFromWT(float(dataMeasSVID[index]['MEAS_WNC'][count]), float(dataMeasSVID[index]['MEAS_TOW'][count])))
-
-        plt.plot(utc, dataMeasSVID[index]['MEAS_LOCKTIME'], color=sigTypeColor, linestyle='', markersize=0.75, marker='.')
+        # the locktimes reduced to the pixel width, keeping the points before and after each loss of lock
+        utc = gpstime.datetimeFromWT(dataMeasSVID[index]['MEAS_WNC'], dataMeasSVID[index]['MEAS_TOW'], leapSecs=0)
+        lliKeep = np.concatenate((lliIndices[index], np.asarray(lliIndices[index]) + 1))
+        downsample.plotDecimated(subPlot, utc, dataMeasSVID[index]['MEAS_LOCKTIME'], downsample.MINMAX, lliKeep, color=sigTypeColor, linestyle='', markersize=0.75, marker='.')
 
         # add a marker at the LLI
-        utc2 = []
-        for count2 in range(0, len(dataMeasSVID[index][lliIndices[index]])):
-            utc2.append(gpstime.UTCFromWT(float(dataMeasSVID[index][lliIndices[index]]['MEAS_WNC'][count2]), float(dataMeasSVID[index][lliIndices[index]]['MEAS_TOW'][count2])))
-        plt.plot(utc2, dataMeasSVID[index][lliIndices[index]]['MEAS_LOCKTIME'], color=sigTypeColor, linestyle='', markersize=7, markerfacecolor=sigTypeColor, marker=mPlt.mFilledMarkers[signalType % len(mPlt.mFilledMarkers)])
+        subPlot.plot(utc[lliIndices[index]], dataMeasSVID[index]['MEAS_LOCKTIME'][lliIndices[index]], color=sigTypeColor, linestyle='', markersize=7, markerfacecolor=sigTypeColor, marker=mPlt.mFilledMarkers[signalType % len(mPlt.mFilledMarkers)])
 
         # annotate the plot
         annotateTxt = mSSN.GNSSSignals[signalType]['name'] + str(': %d LLI' % len(lliIndices[index]))
         subPlot.text(0.02, 0.95 - index * 0.0375, annotateTxt, verticalalignment='bottom', horizontalalignment='left', transform=subPlot.transAxes, color=sigTypeColor, fontsize=12)
 
     # make x-axis a hh:mm:ss
-    ax = plt.gca()
     xfmt = md.DateFormatter('%H:%M:%S')
-    ax.xaxis.set_major_formatter(xfmt)
+    subPlot.xaxis.set_major_formatter(xfmt)
 
     # adjust range for Y axis
-    axes = plt.gca()
-    axes.set_ylim(mPlt.adjustYAxisLimits(axes))
-    axes.set_xlim(mPlt.adjustXAxisLimits(axes))
+    subPlot.set_ylim(mPlt.adjustYAxisLimits(subPlot))
+    subPlot.set_xlim(mPlt.adjustXAxisLimits(subPlot))
 
-    plt.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-    plt.text(1, -0.125, r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-    # mPlt.annotateText(r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', subPlot, 0, -0.12, 'left', fontsize='x-small')
-    # mPlt.annotateText(r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', subPlot, 1, -0.12, 'right', fontsize='x-small')
+    subPlot.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=subPlot.transAxes, alpha=0.5, fontsize='x-small')
+    subPlot.text(1, -0.125, r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=subPlot.transAxes, alpha=0.5, fontsize='x-small')
 
-    fig = plt.gcf()
     # fig.set_size_inches(12*2.5, 9*2.5)
-    fig.savefig('%s-%s%d-locktime.png' % (gnssSyst, gnssSystShort, gnssPRN), dpi=fig.dpi)
+    pngName = '%s-%s%d-locktime.png' % (gnssSyst, gnssSystShort, gnssPRN)
+    fig.savefig(pngName, dpi=fig.dpi)
+
+    return pngName
 
-    if verbose:
-        plt.show(block=False)  # block=False)
 
-    # close the figure
-    # plt.close()
+def lockTimeFigure(SVID, signalTypes, dataMeasSVID, lliIndices):
+    """
+    lockTimeFigure creates the job for the locktime plot of a SV, rendered by figureRenderer.renderFigures
+
+    Returns:
+        (drawFunction, args, style)
+    """
+    # plt.style.use('BEGPIOS')
+    return (drawLockTime, (SVID, signalTypes, dataMeasSVID, lliIndices), 'ggplot')
@@ -3,7 +3,6 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as md
 import matplotlib
-# from pyproj import Proj
 
 from GNSS import gpstime
 
@@ -21,7 +20,6 @@ def plotGEOD(dataGEODPos, dataDOP):
     # print "type", type(dataGEODPos)
     # print "data:", dataGEODPos[0:5]
     # print "data2:", dataGEODPos['MEAS_WNC'][0:5]
-    utc = []
     # index = sbf2stf.findNanValues(dataGEODPos['Latitude'])
     # print "index: ", index[0][:]
     # if len(index) < 0:
@@ -31,11 +29,8 @@ def plotGEOD(dataGEODPos, dataDOP):
     # dataDOPValid = dataDOP[index]
     # print "DATA %s" % dataGEODPos
     # print "DATA %s" % dataGEODPOSValid
-    for count in range(0, len(dataGEODPos)):
-        utc.append(gpstime.UTCFromWT(float(dataGEODPos['GEOD_WNC'][count]), float(dataGEODPos['GEOD_TOW'][count])))
+    utc = gpstime.datetimeFromWT(dataGEODPos['GEOD_WNC'], dataGEODPos['GEOD_TOW'], leapSecs=0)
 
-    # myProj = Proj("+proj=utm +north +ellps=WGS84 +datum=WGS84 +units=m +no_defs")
-    # east, north = myProj(rad2deg(dataGEODPOSValid['Longitude']), rad2deg(dataGEODPOSValid['Latitude']))
     # print "EAST", east[0]
     # print "NORTH", north[0]
     # print "len data", len(dataGEODPos)
@@ -1,16 +1,15 @@
 #!/usr/bin/env python
 
-import pylab
-import matplotlib.pyplot as plt
 import matplotlib.dates as md
-import plotConstants as mPlt
+import downsample
 import ssnConstants
 import gpstime
 
-def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center'):
+def suplabel(fig, axis, label, label_prop=None, labelpad=3, ha='center', va='center'):
     '''
     Add super ylabel or xlabel to the figure
     Similar to matplotlib.suptitle
+        fig        - the figure
         axis       - string: "x" or "y"
         label      - string
         label_prop - keyword dictionary for Text
@@ -18,7 +17,6 @@ def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center')
         ha         - horizontal alignment (default: "center")
         va         - vertical alignment (default: "center")
     '''
-    fig = pylab.gcf()
     xmin = []
     ymin = []
     for ax in fig.axes:
@@ -38,53 +36,56 @@ def suplabel(axis, label, label_prop=None, labelpad=3, ha='center', va='center')
         raise Exception("Unexpected axis: x or y")
     if label_prop is None:
         label_prop = dict()
-    pylab.text(x, y, label, rotation=rotation,
-               transform=fig.transFigure,
-               ha=ha, va=va,
-               **label_prop)
+    fig.text(x, y, label, rotation=rotation,
+             transform=fig.transFigure,
+             ha=ha, va=va,
+             **label_prop)
 
-def plotRange(SVID, signalTypes, georange, pseudorange, Last):
+def drawRange(fig, SVID, signalTypes, rangeResidual):
     """
-    plot Geometrical range vs Pseudorange per satellite and signaltype
+    drawRange plots Pseudorange minus Geometrical range of a satellite per signaltype, saved as <syst>-<SV>-range.png
 
+    Parameters:
+        fig: the figure to draw on
+        rangeResidual: per signal type [times, pseudorange - range (m)]
+
+    Returns:
+        name of the PNG file
     """
-    # plt.style.use('BEGPIOS')
-    plt.style.use('ggplot')
-    plt.figure(1)
+    gnssSyst, gnssSystShort, gnssPRN = ssnConstants.svPRN(SVID)
 
-    plt.suptitle('Geometrical range vs Pseudorange as function of satellite and signaltype', fontsize=20)
+    fig.suptitle('Pseudorange vs Geometrical range of %s%d' % (gnssSystShort, gnssPRN), fontsize='x-large')
 
-    subPlots = []
     for index, signalType in enumerate(signalTypes):
-        subPlots.append(plt.subplot(len(signalTypes), 1, index+1))
-        # utcgeo = []
-        # print "time geo:", pseudorange[index][0]
-        print len(georange[index][1])
-        print len(pseudorange[index][1])
-        DIFF = []
-        for counter in range(0, len(georange[index][1])):
-            DIFF.append(georange[index][1][counter]-pseudorange[index][1][counter]/1000)
-        plt.plot(georange[index][0], DIFF,
-                 label='geo - pr ' + str(ssnConstants.svPRN(SVID)[1]) + str(ssnConstants.svPRN(SVID)[2]))
+        ax = fig.add_subplot(len(signalTypes), 1, index+1)
+        downsample.plotDecimated(ax, rangeResidual[index][0], rangeResidual[index][1], downsample.MINMAX,
+                                 label='pr - geo %s%d %s' % (gnssSystShort, gnssPRN, ssnConstants.GNSSSignals[signalType]['name']))
+        ax.xaxis.set_major_formatter(md.DateFormatter('%H:%M:%S'))
+        ax.legend(shadow=True, loc='best', fontsize='small')
+
+    # mPlt.annotateText(r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', subPlots[index], 0, -0.22, 'left')
+    # mPlt.annotateText(r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', subPlots[index], 1, -0.22, 'right')
+    ax.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
+    ax.text(1, -0.125, r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
+
+    dateStrings = [times for times, residuals in rangeResidual if len(times)]
+    if dateStrings:
+        ax.set_xlabel('Time [hh:mm:ss] of ' + dateStrings[0][0].strftime("%d/%m/%Y"))
+    fig.subplots_adjust(left=0.15)
+    suplabel(fig, 'y', 'pseudo - geo (m)', labelpad=8)
 
-        # plt.plot(georange[index][0], georange[index][1],
-        #          label='delta range ' + str(ssnConstants.svPRN(SVID)[1]) + str(ssnConstants.svPRN(SVID)[2]))
-        # plt.plot(pseudorange[index][0], pseudorange[index][1]/1000,
-        #          label='pseudorange of: ' + str(ssnConstants.svPRN(SVID)[1]) + str(ssnConstants.svPRN(SVID)[2]))
+    pngName = '%s-%s%d-range.png' % (gnssSyst, gnssSystShort, gnssPRN)
+    fig.savefig(pngName, dpi=fig.dpi)
 
-        # for count in range(0, len(dataMeasSVID[index])):
-        #     utc.append(gpstime.UTCFromWT(float(georange[index]['MEAS_WNC'][count]), float(dataMeasSVID[index]['MEAS_TOW'][count])))
-        #     # utc.append(str(gpstime.UTCFromWT(float(weeknr[count]), float(tow[count])).time()))
+    return pngName
 
-    if Last == 1:
-        # mPlt.annotateText(r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', subPlots[index], 0, -0.22, 'left')
-        # mPlt.annotateText(r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', subPlots[index], 1, -0.22, 'right')
-        mPlt.text(0, -0.125, r'$\copyright$ Alain Muls (alain.muls@rma.ac.be)', horizontalalignment='left', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
-        mPlt.text(1, -0.125, r'$\copyright$ Frederic Snyers (fredericsn@gmail.com)', horizontalalignment='right', verticalalignment='bottom', transform=ax.transAxes, alpha=0.5, fontsize='x-small')
 
-        leg = plt.legend(shadow=True, bbox_to_anchor=(1.01, 1), loc=3)
-        dateString = georange[index][0][0].strftime("%d/%m/%Y")
-        plt.xlabel('Time [hh:mm:ss] of ' + dateString)
-        suplabel('y', 'geo - pseudo (km)')
-        # plt.ylabel('geo - pseudo (km)')
-        plt.show()
+def rangeFigure(SVID, signalTypes, rangeResidual):
+    """
+    rangeFigure creates the job for the range residual plot of a satellite, rendered by figureRenderer.renderFigures
+
+    Returns:
+        (drawFunction, args, style)
+    """
+    # plt.style.use('BEGPIOS')
+    return (drawRange, (SVID, signalTypes, rangeResidual), 'ggplot')
@@ -1,66 +1,283 @@
 #!/usr/bin/env python
 
+"""
+Cache manager for the SP3 orbit products
+
+getSP3 returns the name of the decompressed SP3 file of a GPS day in the local product cache
+(IGS_DIR). A file missing from the cache is taken from a local mirror directory (MIRROR_DIR,
+laid out as <mirror>/<week>/<file> or <mirror>/<file>) or downloaded from the product server
+(IGS_SERVER, an ftp:// or http:// URL, eg a local stand-in started with productServer). The
+.Z (unix compress) and .gz files are decompressed in-process.
+
+Concurrent requests for the same day wait for the first one instead of fetching the file again,
+and the cache is kept below MAX_CACHE_SIZE bytes by removing the least recently used SP3 files and
+Lagrange coefficient caches (see SP3ordinate).
+"""
+
 import sys
 import os
+import glob
+import gzip
+import io
 import ftplib
 import socket
-from subprocess import call
-
-def getSP3(GPS_WEEK, GPS_DATE):
-    # Defining variables en directories
-    home = os.path.expanduser("~")
-    IGSURL = 'cddis.gsfc.nasa.gov'
-    # GPS_WEEK = 1841
-    # GPS_DATE = 18411
-    MGEX = 'gnss/products/mgex/' + str(GPS_WEEK) + '/'
-    FILE = 'com' + str(GPS_DATE) + '.sp3.Z'
-    DIR = home + '/GNSSpy/SSN/data/IGS/'
-    DEST = DIR + FILE
-    if not os.path.exists(DIR):
-        os.mkdir(DIR)
-    print 'MGEX', MGEX
-
-    # Connecting to FTP
-    if not os.path.exists(DEST[:-2]):
-        try:
-            f = ftplib.FTP(IGSURL)
-            f.login()
-            SUCCES = 1
-        except (socket.error, socket.gaierror), e:
-            print 'Failed to connect to %s' % IGSURL
-            SUCCES = 0
-            return
-        print 'Connected to %s' % IGSURL
-
-        # Travelling to directory
-        if SUCCES == 1:
-            try:
-                f.cwd(MGEX)
-            except ftplib.error_perm:
-                print 'Could not reach %s' % MGEX
-                f.quit()
-                SUCCES = 0
-                return
-            print '%s reached' % MGEX
-
-        # Downloading file
-        if SUCCES == 1:
+import threading
+import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+try:
+    from urllib.request import urlopen
+    from urllib.parse import urlparse
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+except ImportError:
+    from urllib2 import urlopen
+    from urlparse import urlparse
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+# directory where the IGS products are stored
+IGS_DIR = os.path.join(os.path.expanduser("~"), 'GNSSpy', 'SSN', 'data', 'IGS', '')
+
+# server with the MGEX products, organised per GPS week
+IGS_SERVER = 'ftp://cddis.gsfc.nasa.gov/gnss/products/mgex'
+
+# local mirror of the MGEX products, searched before the server (None for no mirror)
+MIRROR_DIR = None
+
+# maximum size in bytes of the SP3 files and Lagrange coefficient caches kept in IGS_DIR
+MAX_CACHE_SIZE = 2 * 1024**3
+
+# files in IGS_DIR subject to the cache size limit
+CACHE_PATTERNS = ('*.sp3', 'lagrange*.npz')
+
+# compressed versions of a product, in order of preference
+COMPRESSIONS = ('.Z', '.gz', '')
+
+# time in seconds to wait for the product server
+SERVER_TIMEOUT = 60
+
+# serialises the requests for the same file
+_locksLock = threading.Lock()
+_fileLocks = {}
+
+
+def uncompressZ(data):
+    """
+    uncompressZ decompresses the contents of a .Z file (LZW as written by unix compress)
+    """
+    data = bytearray(data)
+    if len(data) < 3 or data[0] != 0x1f or data[1] != 0x9d:
+        raise IOError('not in compress (.Z) format')
+    maxBits = data[2] & 0x1f
+    blockMode = data[2] & 0x80
+    maxMaxCode = 1 << maxBits
+
+    codes = data[3:] + bytearray(b'\0\0\0')
+    nrBits = (len(data) - 3) * 8
+
+    table = [bytes(bytearray([value])) for value in range(256)]
+    if blockMode:
+        table.append(b'')  # code 256 clears the table
+    nBits = 9
+    maxCode = (1 << nBits) - 1
+    base = posBits = 0
+    previous = None
+    output = []
+
+    while posBits + nBits <= nrBits:
+        if len(table) > maxCode:
+            # the code width grows at a boundary of a group of 8 codes of the current width
+            posBits = base = base + (posBits - base + 8 * nBits - 1) // (8 * nBits) * (8 * nBits)
+            nBits += 1
+            maxCode = maxMaxCode if nBits == maxBits else (1 << nBits) - 1
+            continue
+
+        bytePos = posBits >> 3
+        code = ((codes[bytePos] | codes[bytePos + 1] << 8 | codes[bytePos + 2] << 16) >> (posBits & 7)) & ((1 << nBits) - 1)
+        posBits += nBits
+
+        if code == 256 and blockMode:
+            del table[256:]
+            posBits = base = base + (posBits - base + 8 * nBits - 1) // (8 * nBits) * (8 * nBits)
+            nBits = 9
+            maxCode = (1 << nBits) - 1
+            continue
+
+        if code < len(table):
+            entry = table[code]
+        elif code == len(table) and previous is not None:
+            entry = previous + previous[:1]
+        else:
+            raise IOError('corrupt compress (.Z) data')
+
+        output.append(entry)
+        if previous is not None and len(table) < maxMaxCode:
+            table.append(previous + entry[:1])
+        previous = entry
+
+    return b''.join(output)
+
+
+def decompress(data, compression):
+    """
+    decompress returns the decompressed contents of a product according to its compression ('.Z', '.gz' or '')
+    """
+    if compression == '.Z':
+        return uncompressZ(data)
+    elif compression == '.gz':
+        return gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+    return data
+
+
+def readMirror(mirror, GPS_WEEK, fileName):
+    """
+    readMirror returns the contents of a product in the local mirror, None when not found
+    """
+    for fileMirror in (os.path.join(mirror, str(GPS_WEEK), fileName), os.path.join(mirror, fileName)):
+        if os.path.isfile(fileMirror):
+            with open(fileMirror, 'rb') as fProduct:
+                return fProduct.read()
+    return None
+
+
+def readServer(server, GPS_WEEK, fileName, verbose=False):
+    """
+    readServer downloads a product from an ftp:// or http:// server, None when not available
+    """
+    url = '%s/%d/%s' % (server.rstrip('/'), GPS_WEEK, fileName)
+    address = urlparse(url)
+    try:
+        if address.scheme == 'ftp':
+            chunks = []
+            f = ftplib.FTP()
+            f.connect(address.hostname, address.port or 21, timeout=SERVER_TIMEOUT)
             try:
-                f.retrbinary('RETR %s' % FILE, open(DEST, 'wb').write)
-            except ftplib.error_perm:
-                print 'ERROR: cannot read file "%s"' % FILE
-                os.unlink(FILE)
-            else:
-                print 'Downloaded to %s' % DEST
-            f.quit()
-
-        # Decompressing Z file
+                f.login()
+                f.retrbinary('RETR %s' % address.path, chunks.append)
+            finally:
+                f.close()
+            data = b''.join(chunks)
+        else:
+            data = urlopen(url, timeout=SERVER_TIMEOUT).read()
+    except (socket.error, ftplib.Error, IOError) as e:
+        logger.log(ssnLogging.verboseLevel(verbose), '    Could not download %s (%s)', url, e)
+        return None
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Downloaded %s', url)
+    return data
+
+
+def fileLock(fileName):
+    """
+    fileLock returns the lock serialising the requests for a product file
+    """
+    with _locksLock:
+        return _fileLocks.setdefault(fileName, threading.Lock())
+
+
+def limitCache(cacheDir=IGS_DIR, maxSize=None, keep=None):
+    """
+    limitCache removes the least recently used SP3 files and Lagrange coefficient caches until the cache is below maxSize bytes
+
+    Parameters:
+        keep: file that is never removed (eg the one just added)
+    """
+    if maxSize is None:
+        maxSize = MAX_CACHE_SIZE
+
+    cached = []
+    for pattern in CACHE_PATTERNS:
+        for fileName in glob.glob(os.path.join(cacheDir, pattern)):
+            fileStat = os.stat(fileName)
+            cached.append((fileStat.st_mtime, fileStat.st_size, fileName))
+
+    cacheSize = sum(size for used, size, fileName in cached)
+    for used, size, fileName in sorted(cached):
+        if cacheSize <= maxSize:
+            break
+        if fileName != keep:
+            os.remove(fileName)
+            cacheSize -= size
+
+
+def getSP3(GPS_WEEK, GPS_DATE, mirror=None, server=None, verbose=False):
+    """
+    getSP3 returns the name of the decompressed SP3 file of a day from the product cache
+
+    Parameters:
+        GPS_WEEK: GPS week
+        GPS_DATE: GPS week and day of week (eg 18411)
+        mirror: local mirror directory (default MIRROR_DIR)
+        server: product server URL (default IGS_SERVER)
+
+    Returns:
+        name of the SP3 file, None when it is not available
+    """
+    mirror = MIRROR_DIR if mirror is None else mirror
+    server = IGS_SERVER if server is None else server
+
+    FILE = 'com' + str(GPS_DATE) + '.sp3'
+    DEST = os.path.join(IGS_DIR, FILE)
+
+    with fileLock(DEST):
+        if os.path.isfile(DEST):
+            # mark as recently used
+            os.utime(DEST, None)
+            return DEST
+
+        # the mirror is searched for all compressions before asking the server
+        sources = []
+        if mirror is not None:
+            sources += [(compression, lambda fileName: readMirror(mirror, GPS_WEEK, fileName)) for compression in COMPRESSIONS]
+        if server:
+            sources += [(compression, lambda fileName: readServer(server, GPS_WEEK, fileName, verbose)) for compression in COMPRESSIONS]
+        for compression, readProduct in sources:
+            data = readProduct(FILE + compression)
+            if data is not None:
+                break
+        else:
+            sys.stderr.write('  SP3 file %s not found in mirror or on server\n' % FILE)
+            return None
+
         try:
-            call(["uncompress", "-f", DEST])
-        except:
-            print 'Decompressing error'
-
-        return DEST[:-2]
-    else:
-        print '%s already downloaded and uncompressed' % FILE
-        return DEST[:-2]
+            data = decompress(data, compression)
+        except (IOError, EOFError) as e:
+            sys.stderr.write('  Decompressing %s failed: %s\n' % (FILE + compression, e))
+            return None
+
+        if not os.path.exists(IGS_DIR):
+            os.makedirs(IGS_DIR)
+        with open(DEST + '.part', 'wb') as fSP3:
+            fSP3.write(data)
+        os.rename(DEST + '.part', DEST)
+        logger.log(ssnLogging.verboseLevel(verbose), '    Stored %s in the product cache', DEST)
+
+        limitCache(IGS_DIR, keep=DEST)
+
+    return DEST
+
+
+def productServer(directory, port=0):
+    """
+    productServer serves a directory with products (organised per GPS week) over http on a local port,
+    as stand-in for the product server when working offline
+
+    Returns:
+        server: the HTTP server (stop it with server.shutdown())
+        url: the URL to use as product server
+    """
+    class ProductRequestHandler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            return os.path.join(directory, *[part for part in urlparse(path).path.split('/') if part not in ('', '.', '..')])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('localhost', port), ProductRequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server, 'http://localhost:%d' % server.server_address[1]
@@ -1,142 +1,204 @@
 #!/usr/bin/env python
 
+"""
+Lagrange coefficients of the SP3 orbits and clocks of all satellites
+
+The SP3 files of a day and its neighbouring days are each read once into an array
+[satellite, epoch, xyz] of positions and an array [satellite, epoch] of clock offsets. The coefficients of the 9th order Lagrange polynomials for every
+window of 9 epochs and every satellite follow from a single (batched) matrix product,
+and are kept in a binary cache file per GPS week and day, so subsequent runs skip the
+parsing. Within a run the coefficients of a day are kept in memory, so getlagrange
+only selects the rows of the requested satellite.
+"""
+
 import sys
 import os
 import SP3get
-import datetime
+import ssnLogging
 import numpy as np
-import matplotlib.pyplot as plt
-
-
-def getlagrange(nrSV, WEEK, DAY):
-
-    # nrSV = 'E11'
-    print nrSV
-    if DAY == 0:
-        DIR0 = SP3get.getSP3(WEEK-1, str(WEEK) + '6')
-        DIR1 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY))
-        DIR2 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY+1))
-    elif DAY == 6:
-        DIR0 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY-1))
-        DIR1 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY))
-        DIR2 = SP3get.getSP3(WEEK+1, 0)
-    else:
-        DIR0 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY-1))
-        DIR1 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY))
-        DIR2 = SP3get.getSP3(WEEK, str(WEEK) + str(DAY+1))
-
-    # DIR0 = SP3get.getSP3(1841, 18410)
-    # DIR1 = SP3get.getSP3(1841, 18411)
-    # DIR2 = SP3get.getSP3(1841, 18412)
-
-    # Extract Time and Ordinate information
-    time = []
-    sat = []
-
-    with open(DIR0, 'rb') as f:
-        for line in f:
-            if line.startswith('*  '):
-                time.append(line.split())
-            if line.startswith('P' + nrSV):
-                sat.append(line.split())
-    count1 = 1
-    count2 = 1
-
-    with open(DIR1, 'rb') as f:
-        for line in f:
-            if line.startswith('*  '):
-                time.append(line.split())
-                if count1 == 1:
-                    time.pop()
-                count1 += 1
-            if line.startswith('P' + nrSV):
-                sat.append(line.split())
-                if count2 == 1:
-                    sat.pop()
-                count2 += 1
-    count1 = 1
-    count2 = 1
-
-    with open(DIR2, 'rb') as f:
-        for line in f:
-            if line.startswith('*  '):
-                time.append(line.split())
-                if count1 == 1:
-                    time.pop()
-                count1 += 1
-            if line.startswith('P' + nrSV):
-                sat.append(line.split())
-                if count2 == 1:
-                    sat.pop()
-                count2 += 1
-
-    if not len(time) == len(sat):
-        print 'SP3 importation error'
-        exit()
-
-    # print time[0][1], time[1]
-    TIME = []
-    for count in range(0, len(time)):
-        TIME.append(datetime.datetime(int(time[count][1]), int(time[count][2]),
-                                      int(time[count][3]), int(time[count][4]),
-                                      int(time[count][5]), int(float(time[count][6]))))
-
-    # a = np.matrix([[1, (-4), (-4)**2, (-4)**3, (-4)**4, (-4)**5, (-4)**6, (-4)**7, (-4)**8], [1, (-3), (-3)**2, (-3)**3, (-3)**4, (-3)**5, (-3)**6, (-3)**7, (-3)**8], [1, (-2), (-2)**2, (-2)**3, (-2)**4, (-2)**5, (-2)**6, (-2)**7, (-2)**8], [1, (-1), (-1)**2, (-1)**3, (-1)**4, (-1)**5, (-1)**6, (-1)**7, (-1)**8], [1, 0, 0**2, 0**3, 0**4, 0**5, 0**6, 0**7, 0**8], [1, 1, 1**2, 1**3, 1**4, 1**5, 1**6, 1**7, 1**8], [1, 2, 2**2, 2**3, 2**4, 2**5, 2**6, 2**7, 2**8], [1, 3, 3**2, 3**3, 3**4, 3**5, 3**6, 3**7, 3**8], [1, 4, 4**2, 4**3, 4**4, 4**5, 4**6, 4**7, 4**8]])
-
-    T = np.matrix([[-2.22044605e-16, 1.77635684e-15, 0.00000000e+00,
-                    1.42108547e-14, 1.00000000e+00, -3.55271368e-15,
-                    0.00000000e+00, 0.00000000e+00, 0.00000000e+00],
-                   [3.57142857e-03, -3.80952381e-02, 2.00000000e-01,
-                    -8.00000000e-01, 3.51306286e-16, 8.00000000e-01,
-                    -2.00000000e-01, 3.80952381e-02, -3.57142857e-03],
-                   [-8.92857143e-04, 1.26984127e-02, -1.00000000e-01,
-                    8.00000000e-01, -1.42361111e+00, 8.00000000e-01,
-                    -1.00000000e-01, 1.26984127e-02, -8.92857143e-04],
-                   [-4.86111111e-03, 5.00000000e-02, -2.34722222e-01,
-                    3.38888889e-01, -1.48029737e-16, -3.38888889e-01,
-                    2.34722222e-01, -5.00000000e-02, 4.86111111e-03],
-                   [1.21527778e-03, -1.66666667e-02, 1.17361111e-01,
-                    -3.38888889e-01, 4.73958333e-01, -3.38888889e-01,
-                    1.17361111e-01, -1.66666667e-02, 1.21527778e-03],
-                   [1.38888889e-03, -1.25000000e-02, 3.61111111e-02,
-                    -4.02777778e-02, -6.09218364e-18, 4.02777778e-02,
-                    -3.61111111e-02, 1.25000000e-02, -1.38888889e-03],
-                   [-3.47222222e-04, 4.16666667e-03, -1.80555556e-02,
-                    4.02777778e-02, -5.20833333e-02, 4.02777778e-02,
-                    -1.80555556e-02, 4.16666667e-03, -3.47222222e-04],
-                   [-9.92063492e-05, 5.95238095e-04, -1.38888889e-03,
-                    1.38888889e-03, 8.73234500e-19, -1.38888889e-03,
-                    1.38888889e-03, -5.95238095e-04, 9.92063492e-05],
-                   [2.48015873e-05, -1.98412698e-04, 6.94444444e-04,
-                    -1.38888889e-03, 1.73611111e-03, -1.38888889e-03,
-                    6.94444444e-04, -1.98412698e-04, 2.48015873e-05]])
-
-    satAR = np.array(sat)
-    X = np.array(satAR[:, 1], dtype=np.float32)
-    Y = np.array(satAR[:, 2], dtype=np.float32)
-    Z = np.array(satAR[:, 3], dtype=np.float32)
-    COEF = []
-    # print np.shape(np.asmatrix(np.transpose([X[0:9], Y[0:9], Z[0:9]])))
-    for count in range(0, len(X)-9):
-        C = np.asmatrix(np.transpose([X[count:count+9], Y[count:count+9], Z[count:count+9]]))
-        COEF.append(np.dot(T, C))
-
-    return COEF, sat, TIME
-    # return COEF, sat, TIME
-    # print type(T)
-    # print type(C)
-    # print len(COEF)
-    # print COEF[0][:, 0]
-
-    # test of interpolation
-    # OUT = []
-    # # COEF = np.dot(T, C)
-    # for count in range(0, 9):
-    #     t = count-4
-    #     OUT.append(COEF[0][0, 0]*t**0 + COEF[0][1, 0]*t**1 + COEF[0][2, 0]*t**2 + COEF[0][3, 0]*t**3
-    #                + COEF[0][4, 0]*t**4 + COEF[0][5, 0]*t**5 + COEF[0][6, 0]*t**6 + COEF[0][7, 0]*t**7
-    #                + COEF[0][8, 0]*t**8)
-    # print len(OUT)
-    # plt.plot([-4, -3, -2, -1, 0, 1, 2, 3, 4], X[0:9])
-    # plt.plot([-4, -3, -2, -1, 0, 1, 2, 3, 4], OUT)
-    # plt.show()
+
+logger = ssnLogging.getLogger(__name__)
+
+# number of SP3 epochs used by the Lagrange interpolation
+NR_NODES = 9
+
+# the coefficients of the polynomial through the nodes t = -4 ... 4 are LAGRANGE x (values at the nodes)
+LAGRANGE = np.linalg.inv(np.vander(np.arange(-(NR_NODES // 2), NR_NODES // 2 + 1), NR_NODES, increasing=True))
+
+# value used in SP3 files for a missing position
+SP3_BAD_POSITION = 0.
+
+# value used in SP3 files for a missing clock offset (microseconds)
+SP3_BAD_CLOCK = 999999.
+
+# coefficients of the days already loaded
+_days = {}
+
+
+def cacheFileName(WEEK, DAY):
+    """
+    cacheFileName returns the name of the binary coefficient cache of a GPS week and day
+    """
+    return os.path.join(SP3get.IGS_DIR, 'lagrange%04d%d.npz' % (WEEK, DAY))
+
+
+def adjacentDays(WEEK, DAY):
+    """
+    adjacentDays returns the (WEEK, DAY) of the previous day, the day itself and the next day
+    """
+    return [divmod(WEEK * 7 + DAY + offset, 7) for offset in (-1, 0, 1)]
+
+
+def readSP3(sp3FileName):
+    """
+    readSP3 reads the satellite positions and clock offsets of an SP3 file
+
+    Parameters:
+        sp3FileName: name of the SP3 file
+
+    Returns:
+        epochs: datetime64 array with the epochs
+        satellites: list of the satellites (eg 'E11')
+        xyz: array [satellite, epoch, xyz] of the positions in km, NaN when missing
+        clock: array [satellite, epoch] of the clock offsets in microseconds, NaN when missing
+    """
+    epochs = []
+    positions = {}
+    with open(sp3FileName, 'r') as fSP3:
+        for line in fSP3:
+            if line.startswith('*'):
+                year, month, day, hour, minute, second = line[1:].split()[:6]
+                epochs.append('%s-%02d-%02dT%02d:%02d:%09.6f' % (year, int(month), int(day), int(hour), int(minute), float(second)))
+            elif line.startswith('P') and epochs:
+                # x, y, z and the clock offset, which may be left blank
+                positions.setdefault(line[1:4].replace(' ', '0'), []).append((len(epochs) - 1, line[4:46].split() + [line[46:60].strip() or 'nan']))
+
+    satellites = sorted(positions)
+    values = np.empty((len(satellites), len(epochs), 4))
+    values.fill(np.nan)
+    for iSat, satellite in enumerate(satellites):
+        iEpochs, valuesSat = zip(*positions[satellite])
+        values[iSat, list(iEpochs)] = np.array(valuesSat, dtype=np.float64)
+    xyz, clock = values[:, :, :3], values[:, :, 3]
+    xyz[xyz == SP3_BAD_POSITION] = np.nan
+    clock[clock >= SP3_BAD_CLOCK] = np.nan
+
+    return np.array(epochs, dtype='datetime64[us]'), satellites, xyz, clock
+
+
+def mergeSP3(sp3Data):
+    """
+    mergeSP3 combines the (epochs, satellites, xyz, clock) of consecutive SP3 files into one time span,
+    epochs present in more than one file are taken from the first one
+    """
+    satellites = sorted(set(satellite for epochs, satsFile, xyz, clock in sp3Data for satellite in satsFile))
+    epochs, iUnique = np.unique(np.concatenate([epochsFile for epochsFile, satsFile, xyz, clock in sp3Data]), return_index=True)
+
+    nrEpochs = sum(len(epochsFile) for epochsFile, satsFile, xyz, clock in sp3Data)
+    xyzAll = np.empty((len(satellites), nrEpochs, 3))
+    xyzAll.fill(np.nan)
+    clockAll = np.empty((len(satellites), nrEpochs))
+    clockAll.fill(np.nan)
+    start = 0
+    for epochsFile, satsFile, xyz, clock in sp3Data:
+        iSats = [satellites.index(satellite) for satellite in satsFile]
+        xyzAll[iSats, start:start + len(epochsFile)] = xyz
+        clockAll[iSats, start:start + len(epochsFile)] = clock
+        start += len(epochsFile)
+
+    return epochs, satellites, xyzAll[:, iUnique], clockAll[:, iUnique]
+
+
+def lagrangeCoefficients(xyz):
+    """
+    lagrangeCoefficients computes the Lagrange coefficients of every window of NR_NODES epochs for all satellites
+
+    Parameters:
+        xyz: array [satellite, epoch, xyz] of the positions (or [satellite, epoch, 1] of the clock offsets)
+
+    Returns:
+        COEF: array [satellite, window, power, xyz], window i is centred on epoch i + NR_NODES // 2
+    """
+    nrWindows = max(xyz.shape[1] - NR_NODES + 1, 0)
+    # view [satellite, window, node, xyz] on the positions without copying
+    windows = np.lib.stride_tricks.as_strided(xyz, shape=(xyz.shape[0], nrWindows, NR_NODES, xyz.shape[2]),
+                                              strides=(xyz.strides[0], xyz.strides[1], xyz.strides[1], xyz.strides[2]))
+    # LAGRANGE x (values at the nodes) for every satellite and window, np.matmul needs numpy 1.10
+    return np.einsum('pn,swnc->swpc', LAGRANGE, windows)
+
+
+def loadDay(WEEK, DAY, verbose=False):
+    """
+    loadDay returns the Lagrange coefficients of all satellites for a GPS week and day, using the SP3 files
+    of the day and its neighbours. They are read from the binary cache when available, else computed and cached.
+    The cache is only written when the SP3 files of the three days were read, so coefficients missing a neighbouring
+    day are recomputed once its SP3 file becomes available. Caches written without the clock offsets are recomputed too.
+
+    Returns:
+        dict with 'epochs' (datetime64), 'satellites', 'xyz' [satellite, epoch, xyz], 'COEF' [satellite, window, power, xyz],
+        'clock' [satellite, epoch] (microseconds) and 'CLOCKCOEF' [satellite, window, power, 1]
+    """
+    WEEK, DAY = int(WEEK), int(DAY)
+    if (WEEK, DAY) in _days:
+        return _days[(WEEK, DAY)]
+
+    day = None
+    cacheName = cacheFileName(WEEK, DAY)
+    if os.path.isfile(cacheName):
+        with np.load(cacheName) as cache:
+            if 'CLOCKCOEF' in cache.files:
+                # mark as recently used for SP3get.limitCache
+                os.utime(cacheName, None)
+                logger.log(ssnLogging.verboseLevel(verbose), '    Reading Lagrange coefficients from %s', cacheName)
+                day = dict((name, cache[name]) for name in ('epochs', 'xyz', 'COEF', 'clock', 'CLOCKCOEF'))
+                day['satellites'] = [str(satellite) for satellite in cache['satellites']]
+
+    if day is None:
+        sp3Data = []
+        complete = True
+        for weekSP3, daySP3 in adjacentDays(WEEK, DAY):
+            sp3FileName = SP3get.getSP3(weekSP3, '%d%d' % (weekSP3, daySP3), verbose=verbose)
+            if sp3FileName is None or not os.path.isfile(sp3FileName):
+                if (weekSP3, daySP3) == (WEEK, DAY):
+                    sys.stderr.write('  SP3 file for GPS week %d day %d not available. Program exits.\n' % (WEEK, DAY))
+                    sys.exit(1)
+                complete = False
+                continue
+            logger.log(ssnLogging.verboseLevel(verbose), '    Reading SP3 file %s', sp3FileName)
+            sp3Data.append(readSP3(sp3FileName))
+
+        epochs, satellites, xyz, clock = mergeSP3(sp3Data)
+        day = {'epochs': epochs, 'satellites': satellites, 'xyz': xyz, 'COEF': lagrangeCoefficients(xyz),
+               'clock': clock, 'CLOCKCOEF': lagrangeCoefficients(clock[:, :, np.newaxis])}
+
+        if complete:
+            logger.log(ssnLogging.verboseLevel(verbose), '    Writing Lagrange coefficients of %d satellites to %s', len(satellites), cacheName)
+            np.savez(cacheName, epochs=epochs, satellites=np.array(satellites), xyz=xyz, COEF=day['COEF'], clock=clock, CLOCKCOEF=day['CLOCKCOEF'])
+            SP3get.limitCache(SP3get.IGS_DIR, keep=cacheName)
+        else:
+            logger.log(ssnLogging.verboseLevel(verbose), '    Not caching the Lagrange coefficients, the SP3 file of a neighbouring day is missing')
+
+    _days[(WEEK, DAY)] = day
+    return day
+
+
+def getlagrange(nrSV, WEEK, DAY, verbose=False):
+    """
+    getlagrange returns the Lagrange coefficients of a satellite for a GPS week and day
+
+    Parameters:
+        nrSV: satellite (eg 'E11')
+
+    Returns:
+        COEF: array [window, power, xyz] of the coefficients
+        sat: array [epoch, xyz] of the SP3 positions
+        TIME: datetime64 array of the SP3 epochs
+    """
+    day = loadDay(WEEK, DAY, verbose)
+
+    if nrSV not in day['satellites']:
+        sys.stderr.write('  SP3 importation error: no orbit for %s\n' % nrSV)
+        sys.exit(1)
+    iSat = day['satellites'].index(nrSV)
+
+    return day['COEF'][iSat], day['xyz'][iSat], day['epochs']
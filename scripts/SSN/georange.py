@@ -4,14 +4,18 @@
 import sys
 import os
 import SP3ordinate
+import SP3get
 import getopt
 import sbf2stf
 import numpy as np
-from scipy import cos, sin, sqrt
 import time
 import ssnConstants as mSSN
+import ssnLogging
 import gpstime
+from SSN import svGroups
+from GNSS import wgs84
 from Plot import plotRange
+from Plot import figureRenderer
 
 
 # exit codes
@@ -24,15 +28,32 @@ E_WRONG_OPTION = 5
 E_SIGNALTYPE_MISMATCH = 6
 E_FAILURE = 99
 
+logger = ssnLogging.getLogger(__name__)
+
 # global used vars
 nameSBF = ''
 overwrite = False
 verbose = True
+display = False
+receiver = None
+quiet = False
+logLevels = None
+
+# number of light time iterations, after 3 iterations the range changes less than a millimetre
+LIGHT_TIME_ITERATIONS = 3
+
+# SP3 positions are in km
+SP3_UNIT = 1000.
+
+# SP3 clock offsets are in microseconds
+SP3_CLOCK_UNIT = 1.e-6
+
+WGS84 = wgs84.WGS84()
 
 start = time.time()
 # get startup path
 ospath = sys.path.append(os.path.join(os.path.dirname(sys.argv[0]), "subfolder"))
-print sys.argv[0], ospath
+# print sys.argv[0], ospath
 
 
 # print usage of script
@@ -40,10 +61,16 @@ def usage():
     """
     prints the usage of the script
     """
-    sys.stderr.write('sbf2Meas.py -f|--file=SBF-data-file -o|--overwrite -v|--verbose -h|--help\n')
+    sys.stderr.write('sbf2Meas.py -f|--file=SBF-data-file -o|--overwrite -m|--mirror=dir -s|--server=URL -r|--receiver=lat,lon,alt -d|--display -v|--verbose -q|--quiet --log=LEVELS -h|--help\n')
     sys.stderr.write('where: -f|--file : specify filename of SBF data to convert\n')
     sys.stderr.write('       -o|--overwrite : overwrite converted files (default not)\n')
+    sys.stderr.write('       -m|--mirror : local mirror directory of the SP3 products (default none)\n')
+    sys.stderr.write('       -s|--server : URL of the SP3 product server (default %s)\n' % SP3get.IGS_SERVER)
+    sys.stderr.write('       -r|--receiver : receiver position in degrees and m (default from PVTGeodetic_2)\n')
+    sys.stderr.write('       -d|--display : show the plots interactively (default render them headless in parallel)\n')
     sys.stderr.write('       -v|--verbose : enable verbosity\n')
+    sys.stderr.write('       -q|--quiet : only display warnings and errors\n')
+    sys.stderr.write('       --log : log level for all modules or per module, eg debug or sbf2stf=debug\n')
     sys.stderr.write('       -h|--help : print this help message\n')
 
 
@@ -61,10 +88,14 @@ def treatCmdOpts(argv):
     global nameSBF
     global overwrite
     global verbose
+    global receiver
+    global display
+    global quiet
+    global logLevels
 
     try:
-        opts, args = getopt.getopt(argv, "hof:",
-                                   ["file=", "overwrite", "help"])
+        opts, args = getopt.getopt(argv, "hodvqf:m:s:r:",
+                                   ["file=", "overwrite", "mirror=", "server=", "receiver=", "display", "verbose", "quiet", "log=", "help"])
     except getopt.GetoptError:
         usage()
         sys.exit(E_UNKNOWN_OPTION)
@@ -77,125 +108,199 @@ def treatCmdOpts(argv):
             nameSBF = arg
         elif opt in ("-o", "--overwrite"):
             overwrite = True
+        elif opt in ("-m", "--mirror"):
+            SP3get.MIRROR_DIR = arg
+        elif opt in ("-s", "--server"):
+            SP3get.IGS_SERVER = arg
+        elif opt in ("-r", "--receiver"):
+            try:
+                receiver = [float(value) for value in arg.split(',')]
+            except ValueError:
+                receiver = []
+            if len(receiver) != 3:
+                sys.stderr.write('wrong receiver position %s, give lat,lon,alt\n' % arg)
+                sys.exit(E_WRONG_OPTION)
+        elif opt in ("-d", "--display"):
+            display = True
         elif opt in ("-v", "--verbose"):
             verbose = True
+        elif opt in ("-q", "--quiet"):
+            quiet = True
+        elif opt == "--log":
+            logLevels = arg
+
+
+def timeSeconds(times):
+    """
+    timeSeconds converts (an array of) datetimes to float seconds since 1970-01-01 in one step
+    """
+    return (np.asarray(times, dtype='datetime64[us]') - np.datetime64('1970-01-01T00:00:00', 'us')) / np.timedelta64(1, 's')
+
+
+def interpolate(COEF, TIME, Time, iSats=None):
+    """
+    interpolate evaluates the Lagrange polynomials of the SP3 orbit at all measurement times at once
+
+    The times are converted once to float seconds, the SP3 epoch closest to each measurement time is found
+    with np.searchsorted and the polynomial of the 9 epoch window centred on it is evaluated for all times
+    and coordinates together with Horner's scheme.
+
+    Parameters:
+        COEF: Lagrange coefficients per window of 9 SP3 epochs (list of 9 x 3 matrices or array
+              [window, power, xyz]), window i is centred on TIME[i + 4] with t in units of the SP3 interval
+        TIME: SP3 epochs (datetimes or float seconds)
+        Time: measurement times (datetimes or float seconds)
+        iSats: satellite of each measurement time when COEF holds all satellites ([satellite, window, power, xyz])
+
+    Returns:
+        xyz: N x 3 array with the interpolated satellite positions
+    """
+    COEF = np.asarray(COEF, dtype=np.float64)
+    nrWindows, nrNodes = COEF.shape[-3:-1]
+    halfWindow = nrNodes // 2
+
+    epochs = np.asarray(TIME)
+    if epochs.dtype.kind not in 'fiu':
+        epochs = timeSeconds(epochs)
+    times = np.atleast_1d(np.asarray(Time))
+    if times.dtype.kind not in 'fiu':
+        times = timeSeconds(times)
+    interval = np.median(np.diff(epochs[:nrWindows + nrNodes]))
+
+    # closest SP3 epoch, limited to the epochs on which a full window is centred
+    iAfter = np.clip(np.searchsorted(epochs, times), 1, len(epochs) - 1)
+    with np.errstate(invalid='ignore'):
+        iClosest = iAfter - (times - epochs[iAfter - 1] < epochs[iAfter] - times)
+    iCentre = np.clip(iClosest, halfWindow, nrWindows - 1 + halfWindow)
+    t = ((times - epochs[iCentre]) / interval)[:, np.newaxis]
+
+    # Horner's scheme for all times and coordinates together
+    if iSats is None:
+        windowCoef = COEF[iCentre - halfWindow]
+    else:
+        windowCoef = COEF[iSats, iCentre - halfWindow]
+    xyz = windowCoef[:, -1, :].copy()
+    for power in range(nrNodes - 2, -1, -1):
+        xyz *= t
+        xyz += windowCoef[:, power, :]
+
+    return xyz
+
+
+def satelliteRanges(COEF, TIME, Time, rxXYZ, iSats=None, nrIterations=LIGHT_TIME_ITERATIONS):
+    """
+    satelliteRanges computes the geometric ranges between the receiver and the satellites for all measurements at once
+
+    The satellite positions are interpolated at the transmission time, found by iterating on the light time, and
+    rotated over the angle the earth turns during the light time (Sagnac effect). All iterations work on whole arrays.
+
+    Parameters:
+        COEF, TIME, iSats: the SP3 orbits, see interpolate
+        Time: reception times (datetimes or float seconds)
+        rxXYZ: receiver position in ECEF (m), (3,) or one row per reception time
+
+    Returns:
+        ranges: geometric ranges (m)
+        satXYZ: N x 3 array with the satellite positions at transmission in the ECEF frame at reception (m)
+    """
+    times = np.atleast_1d(np.asarray(Time))
+    if times.dtype.kind not in 'fiu':
+        times = timeSeconds(times)
+    rxXYZ = np.asarray(rxXYZ, dtype=np.float64)
+
+    lightTimes = np.zeros(len(times))
+    for iteration in range(nrIterations):
+        satXYZ = interpolate(COEF, TIME, times - lightTimes, iSats) * SP3_UNIT
+        cosRotation = np.cos(WGS84.omega_ie * lightTimes)
+        sinRotation = np.sin(WGS84.omega_ie * lightTimes)
+        satXYZ = np.column_stack((cosRotation * satXYZ[:, 0] + sinRotation * satXYZ[:, 1],
+                                  cosRotation * satXYZ[:, 1] - sinRotation * satXYZ[:, 0],
+                                  satXYZ[:, 2]))
+        ranges = np.sqrt(np.sum((satXYZ - rxXYZ)**2, axis=-1))
+        lightTimes = ranges / WGS84.c
+
+    return ranges, satXYZ
+
+
+def receiverPosition(dataPos, TOWs):
+    """
+    receiverPosition returns for each TOW the receiver position and clock bias of the closest PVTGeodetic_2 solution
+
+    Parameters:
+        dataPos: PVTGeodetic_2 data (latitude and longitude in radians)
+        TOWs: TOWs for which the receiver position is wanted
+
+    Returns:
+        rxXYZ: N x 3 array with the receiver positions in ECEF (m), None when there are no valid solutions
+        clockBias: receiver clock biases (s)
+    """
+    valid = np.isfinite(dataPos['GEOD_Latitude']) & (np.abs(dataPos['GEOD_Latitude']) <= np.pi / 2) & np.isfinite(dataPos['GEOD_ClockBias'])
+    dataPos = dataPos[valid]
+    if len(dataPos) == 0:
+        return None, None
+    dataPos = dataPos[np.argsort(dataPos['GEOD_TOW'], kind='mergesort')]
+
+    iAfter = np.clip(np.searchsorted(dataPos['GEOD_TOW'], TOWs), 0, len(dataPos) - 1)
+    iBefore = np.clip(iAfter - 1, 0, len(dataPos) - 1)
+    iClosest = np.where(np.abs(dataPos['GEOD_TOW'][iBefore] - TOWs) < np.abs(dataPos['GEOD_TOW'][iAfter] - TOWs), iBefore, iAfter)
+
+    lla = np.column_stack((np.degrees(dataPos['GEOD_Latitude']), np.degrees(dataPos['GEOD_Longitude']), dataPos['GEOD_Height']))
+    return WGS84.lla2ecefArray(lla)[iClosest], dataPos['GEOD_ClockBias'][iClosest] / 1000.
+
+
+def rangeResiduals(dataMeas, rxXYZ, clockBias=None, verbose=False):
+    """
+    rangeResiduals computes the pseudorange minus geometric range for all measurements in one call
+
+    The satellite clock offset of the SP3 file, interpolated at the transmission time, is removed from the residuals.
+
+    Parameters:
+        dataMeas: MeasEpoch_2 data
+        rxXYZ: receiver position in ECEF (m), (3,) or one row per measurement
+        clockBias: receiver clock bias (s) per measurement, None to leave it in the residuals
+
+    Returns:
+        residuals: pseudorange - range + c.dt_sat (m) per measurement, NaN for SVs without SP3 orbit or clock
+    """
+    WEEK = int(dataMeas['MEAS_WNC'][0])
+    DAY = int(gpstime.DOWFromWT(dataMeas['MEAS_TOW'][0]))
+    day = SP3ordinate.loadDay(WEEK, DAY, verbose)
+
+    # SP3 satellite of each measurement
+    SVIDs, iSVIDs = np.unique(dataMeas['MEAS_SVID'], return_inverse=True)
+    iSatsSVID = []
+    for SVID in SVIDs:
+        gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
+        PRN = '%s%02d' % (gnssSystShort, gnssPRN)
+        iSatsSVID.append(day['satellites'].index(PRN) if PRN in day['satellites'] else -1)
+        if PRN not in day['satellites']:
+            logger.log(ssnLogging.verboseLevel(verbose), '    No SP3 orbit for %s', PRN)
+    iSats = np.array(iSatsSVID, dtype=np.int64)[iSVIDs]
+    hasOrbit = iSats >= 0
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Computing ranges for %d measurements', np.sum(hasOrbit))
+
+    # SP3 orbits are in GPS time, so no leap seconds are applied
+    times = timeSeconds(gpstime.datetime64FromWT(dataMeas['MEAS_WNC'], dataMeas['MEAS_TOW'], leapSecs=0))
+    rxXYZ = np.asarray(rxXYZ, dtype=np.float64)
+    ranges = np.empty(len(dataMeas))
+    ranges.fill(np.nan)
+    ranges[hasOrbit] = satelliteRanges(day['COEF'], day['epochs'], times[hasOrbit], rxXYZ[hasOrbit] if rxXYZ.ndim == 2 else rxXYZ, iSats[hasOrbit])[0]
 
+    # satellite clock offsets at the transmission times
+    satClocks = np.empty(len(dataMeas))
+    satClocks.fill(np.nan)
+    satClocks[hasOrbit] = interpolate(day['CLOCKCOEF'], day['epochs'], times[hasOrbit] - ranges[hasOrbit] / WGS84.c, iSats[hasOrbit])[:, 0] * SP3_CLOCK_UNIT
+
+    residuals = dataMeas['MEAS_CODE'] - ranges + WGS84.c * satClocks
+    if clockBias is not None:
+        residuals -= WGS84.c * clockBias
+    return residuals
 
-def format_timedelta(td):
-    minutes, seconds = divmod(td.seconds + td.days * 86400, 60)
-    # hours, minutes = divmod(minutes, 60)
-    return float('{:02d}.{:02d}'.format(minutes, seconds))
-
-
-def interpolate(COEF, TIME, Time):
-    # Function will Interpolate the satellite position (which lagranges polynomial coefficients are calculated in COEF)
-    # At the moment of Time.
-    # There is need of the TIME array (array of observations) to determine which polynomial model has to be chosen.
-
-    # Find the index where Time is the closest to the SP3 time
-    XOUT = []
-    YOUT = []
-    ZOUT = []
-    TIME2 = []
-    for count in range(0, len(TIME)):
-        TIME2.append(float(TIME[count].strftime("%s.%f")))
-    # print TIME2
-    TIME2 = np.asarray(TIME2)
-    for counter in range(0, len(Time)):
-        # DIFF = []
-        DIFF = (np.abs(TIME2 - np.asarray(float(Time[counter].strftime("%s.%f"))))).argmin()
-        # for count in range(0, len(TIME)):
-        #   DIFF.append(np.abs(format_timedelta(TIME[count] - Time[counter])).argmin())
-        #   DIFF = np.array(DIFF)
-        #   DIFF = np.absolute(DIFF)
-
-        # index = np.where(DIFF == DIFF.min()) # absolute index van closest hit.
-        index = DIFF
-        # print index
-        T4 = index+4
-        t = format_timedelta((Time[counter]-TIME[T4]))/(15.)
-        # XOUT.append(np.polyval(np.flipud(COEF[index][:, 0]), t))
-        # YOUT.append(np.polyval(np.flipud(COEF[index][:, 1]), t))
-        # ZOUT.append(np.polyval(np.flipud(COEF[index][:, 2]), t))
-
-        # This is faster:
-        XOUT.append([COEF[index][0, 0]*t**0 + COEF[index][1, 0]*t**1 + COEF[index][2, 0]*t**2 + COEF[index][3, 0]*t**3 +
-                    COEF[index][4, 0]*t**4 + COEF[index][5, 0]*t**5 + COEF[index][6, 0]*t**6 + COEF[index][7, 0]*t**7 +
-                    COEF[index][8, 0]*t**8])
-
-        YOUT.append([COEF[index][0, 1]*t**0 + COEF[index][1, 1]*t**1 + COEF[index][2, 1]*t**2 + COEF[index][3, 1]*t**3 +
-                    COEF[index][4, 1]*t**4 + COEF[index][5, 1]*t**5 + COEF[index][6, 1]*t**6 + COEF[index][7, 1]*t**7 +
-                    COEF[index][8, 1]*t**8])
-
-        ZOUT.append([COEF[index][0, 2]*t**0 + COEF[index][1, 2]*t**1 + COEF[index][2, 2]*t**2 + COEF[index][3, 2]*t**3 +
-                    COEF[index][4, 2]*t**4 + COEF[index][5, 2]*t**5 + COEF[index][6, 2]*t**6 + COEF[index][7, 2]*t**7 +
-                    COEF[index][8, 2]*t**8])
-    return [Time, XOUT, YOUT, ZOUT]
-    # index = index[0][0]
-    # print index
-    # print DIFF
-    # T4 = index + 4
-    # T4 = index+4
-    # index = index+1
-    # index = index
-    # print "Time:", Time
-    # print "Time:", format_timedelta(Time-TIME[T4])
-    # # print "delta ", format_timedelta((Time-TIME[T4]))
-    # print COEF[index][4, 0]
-    # t = format_timedelta((Time-TIME[T4]))/(15.)
-    # t = -4
-    # print t
-
-    # # EVALUATE
-    # XOUT = np.polyval(np.flipud(COEF[index][:, 0]), t)
-    # YOUT = np.polyval(np.flipud(COEF[index][:, 1]), t)
-    # ZOUT = np.polyval(np.flipud(COEF[index][:, 2]), t)
-
-    # BACKUP
-    # XOUT = [COEF[index][0, 0]*t**0 + COEF[index][1, 0]*t**1 + COEF[index][2, 0]*t**2 + COEF[index][3, 0]*t**3
-    #         + COEF[index][4, 0]*t**4 + COEF[index][5, 0]*t**5 + COEF[index][6, 0]*t**6 + COEF[index][7, 0]*t**7
-    #         + COEF[index][8, 0]*t**8]
-
-    # YOUT = [COEF[index][0, 1]*t**0 + COEF[index][1, 1]*t**1 + COEF[index][2, 1]*t**2 + COEF[index][3, 1]*t**3
-    #         + COEF[index][4, 1]*t**4 + COEF[index][5, 1]*t**5 + COEF[index][6, 1]*t**6 + COEF[index][7, 1]*t**7
-    #         + COEF[index][8, 1]*t**8]
-
-    # ZOUT = [COEF[index][0, 2]*t**0 + COEF[index][1, 2]*t**1 + COEF[index][2, 2]*t**2 + COEF[index][3, 2]*t**3
-    #         + COEF[index][4, 2]*t**4 + COEF[index][5, 2]*t**5 + COEF[index][6, 2]*t**6 + COEF[index][7, 2]*t**7
-    #         + COEF[index][8, 2]*t**8]
-    # print "len X", len(XOUT)
-
-
-def coord2range(COORDX, COORDY, COORDZ):
-    lon = 0.08226562731
-    lat = 0.88779580846
-    alt = 114.56200
-    # lon = 0.0860754828642  # rad
-    # lat = 0.900026776971  # rad
-    # alt = 28.0311583525  # meter
-    X, Y, Z = geodetic2ecef(lat, lon, alt)
-    georange = []
-    for count in range(0, len(COORDX)):
-        georange.append(sqrt((COORDX[count]-X)**2 + (COORDY[count]-Y)**2 + (COORDZ[count]-Z)**2))
-    return georange
-
-
-def geodetic2ecef(lat, lon, alt):
-    # Constants defined by the World Geodetic System 1984 (WGS84)
-    a = 6378.137
-    b = 6356.7523142
-    esq = 6.69437999014 * 0.001
-    e1sq = 6.73949674228 * 0.001
-
-    """Convert geodetic coordinates to ECEF."""
-    xi = sqrt(1 - esq * sin(lat)*sin(lat))
-    x = (a / xi + alt) * cos(lat) * cos(lon)
-    y = (a / xi + alt) * cos(lat) * sin(lon)
-    z = (a / xi * (1 - esq) + alt) * sin(lat)
-    return x, y, z
 
 if __name__ == "__main__":
     treatCmdOpts(sys.argv[1:])
+    ssnLogging.configure(quiet, logLevels)
     # check whether the SBF datafile exists
     if not os.path.isfile(nameSBF):
         sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % nameSBF)
@@ -203,6 +308,8 @@ if __name__ == "__main__":
 
     # execute the conversion sbf2stf needed
     SBF2STFOPTS = ['MeasEpoch_2', 'MeasExtra_1']     # options for conversion, ORDER IMPORTANT!!
+    if receiver is None:
+        SBF2STFOPTS.append('PVTGeodetic_2')
     sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
 
     # print 'SBF2STFOPTS = %s' % SBF2STFOPTS
@@ -214,8 +321,11 @@ if __name__ == "__main__":
         elif option == 'MeasExtra_1':
             # read the MeasExtra data into numpy array
             dataExtra = sbf2stf.readMeasExtra(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
+        elif option == 'PVTGeodetic_2':
+            # read the receiver positions into numpy array
+            dataPos = sbf2stf.readGEODPosEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
         else:
-            print '  wrong option %s given.' % option
+            logger.error('  wrong option %s given.', option)
             sys.exit(E_WRONG_OPTION)
 
     # check whether the same signaltypes are on corresponsing lines after sorting
@@ -225,51 +335,33 @@ if __name__ == "__main__":
     dataMeas['MEAS_CODE'] = sbf2stf.removeSmoothing(dataMeas['MEAS_CODE'], dataExtra['EXTRA_SMOOTHINGCORR'], dataExtra['EXTRA_MPCORR'])
     # print 'rawPR = %s\n' % dataMeas['MEAS_CODE']
 
-    # find list of SVIDs observed
-    SVIDs = sbf2stf.observedSatellites(dataMeas['MEAS_SVID'], verbose)
-
-    signalTypes = sbf2stf.observedSignalTypes(dataMeas['MEAS_SIGNALTYPE'], verbose)
-    # print "signalTypes %s" % signalTypes
-    indexSignalType = []
-    dataMeasSignalType = []
-
-    for SVID in SVIDs:
-        WEEK = dataMeas['MEAS_WNC'][0]
-        DAY = gpstime.DOWFromWT(dataMeas['MEAS_TOW'][0])
-        # print WEEK, DAY
-        gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
-        PRN = gnssSystShort + str(gnssPRN)
-        COEF, sat, TIME = SP3ordinate.getlagrange(PRN, WEEK, DAY)
-        georange = []
-        pseudorange = []
-        indexSVID = sbf2stf.indicesSatellite(SVID, dataMeas['MEAS_SVID'], verbose)
-        dataMeasSVID = dataMeas[indexSVID]
-        signalTypesSVID = sbf2stf.observedSignalTypes(dataMeasSVID['MEAS_SIGNALTYPE'], verbose)
-        for index, signalType in enumerate(signalTypes):
-            timeSVID = []
-            indexSignalType = sbf2stf.indicesSignalType(signalType, dataMeasSVID['MEAS_SIGNALTYPE'], verbose)
-            dataMeasSVIDSignalType = dataMeasSVID[indexSignalType]
-            for count in range(0, len(dataMeasSVIDSignalType)):
-                timeSVID.append(gpstime.UTCFromWT(float(dataMeasSVIDSignalType['MEAS_WNC'][count]), float(dataMeasSVIDSignalType['MEAS_TOW'][count])))
-            # COORD = []
-            print "Interpolating Values"
-            # for count in range(0, len(timeSVID)):
-            #   COORD.append(interpolate(COEF, TIME, timeSVID[count]))
-            COORD = interpolate(COEF, TIME, timeSVID)
-            georange.append([COORD[0], coord2range(COORD[1], COORD[2], COORD[3])])
-            # print "COORD %s", COORD[0]
-            pseudorange.append([timeSVID, dataMeasSVIDSignalType['MEAS_CODE']])
-        if SVID == SVIDs[-1]:
-            Last = 1
-        else:
-            Last = 0
-        plotRange.plotRange(SVID, signalTypes, georange, pseudorange, Last)
+    # group the measurements per SV and signal type, the residuals are computed in this order
+    measGroups = svGroups.SVSignalGroups(dataMeas, 'MEAS', verbose)
+    dataMeas = measGroups.data
+
+    # receiver position given by the user or of the receiver's own solution at each epoch
+    if receiver is None:
+        rxXYZ, clockBias = receiverPosition(dataPos, dataMeas['MEAS_TOW'])
+        if rxXYZ is None:
+            sys.stderr.write('No valid PVTGeodetic_2 solutions, give the receiver position. Exiting.\n')
+            sys.exit(E_FAILURE)
+    else:
+        rxXYZ, clockBias = WGS84.lla2ecefArray(receiver), None
+
+    residuals = rangeResiduals(dataMeas, rxXYZ, clockBias, verbose)
+
+    signalTypes = measGroups.allSignalTypes
+    jobs = []
+    for SVID in measGroups.SVIDs:
+        rangeResidual = []
+        for signalType in signalTypes:
+            rows = measGroups.groupSlice((SVID, signalType))
+            # SP3 orbits are in GPS time, so no leap seconds are applied
+            timeSVID = gpstime.datetimeFromWT(dataMeas['MEAS_WNC'][rows], dataMeas['MEAS_TOW'][rows], leapSecs=0)
+            rangeResidual.append([timeSVID, residuals[rows]])
+        jobs.append(plotRange.rangeFigure(SVID, signalTypes, rangeResidual))
+
+    # render the plots of all satellites in parallel
+    figureRenderer.renderFigures(jobs, display=display, verbose=verbose)
     end = time.time()
-    print "TIME: ", end-start
-    # print "georange %s" % georange
-    # Time = datetime.datetime(2015, 4, 20, 15, 0, 0)
-    # # test: Time = datetime.datetime(2015, 4, 20, 15, 0, 0)
-    # OUT = interpolate(COEF, TIME, Time)
-
-    # print OUT
-# result: print "-14636.606871 -18632.262465 -17744.662250"
+    logger.info("TIME: %s", end - start)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+
+"""
+Vectorized jamming detection on the CN0 of all satellites and signal types at once
+
+The CN0 series are the rows of a 2D array [series, epoch], eg taken from the
+[SV, signalType, epoch] cube of SVSignalGroups. For each series:
+    - the unjammed starting period lasts as long as the CN0 does not drop by more than the
+      normal variation between consecutive epochs, its mean is the first baseline
+    - a jamming event starts at the first epoch where the CN0 is below baseline - normal variation,
+      the baseline then becomes the CN0 of the epoch before the start
+    - the event stops at the first epoch where the CN0 is no longer below the new baseline - normal variation
+Missing CN0 values (NaN) count as a CN0 of 0 dBHz, so a loss of signal is a jamming event.
+
+The threshold crossings are searched for all series together, each pass examining a window of
+epochs per series, so the work is proportional to the number of epochs and not to the number of
+events times the number of epochs. The events are returned as a structured array (see colFmtJamEvent).
+"""
+
+import time
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import ssnLogging
+from GNSS import gpstime
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# upper limits of the mean elevation (degrees) and the normal CN0 variation (dBHz) for each elevation band
+ELEVATION_BANDS = [10, 20, 30, 40, 50, 60, 70, 80]
+NORMAL_VARIATIONS = [3, 3, 1.5, 1.5, 1.25, 1.25, 1, 0.75, 0.75]
+
+# number of epochs examined per series in each pass of the search for threshold crossings
+SEARCH_WINDOW = 1024
+
+
+def normVarDet(elevMean):
+    """
+    normVarDet chooses the normal variation value corresponding to the mean elevation of the satellite
+
+    Parameters:
+        elevMean: mean of elevation the satellite traversed (scalar or array)
+
+    Returns:
+        normVar: normal variation (float or array of floats)
+    """
+    iBand = np.searchsorted(ELEVATION_BANDS, elevMean, side='left')
+
+    return np.asarray(NORMAL_VARIATIONS, dtype=np.float64)[iBand]
+
+
+def startPeriod(CN0, normVar):
+    """
+    startPeriod determines the unjammed starting period of each CN0 series
+
+    The period ends at the first epoch where the CN0 drops by more than the normal variation
+    w.r.t. the previous epoch (or where it is missing).
+
+    Parameters:
+        CN0: 2D array [series, epoch] of CN0 values (NaN when not observed)
+        normVar: normal variation for each series
+
+    Returns:
+        startLength: number of epochs in the starting period of each series
+        startMean: mean CN0 of the starting period (NaN if it contains missing values)
+    """
+    nrSeries, nrEpochs = CN0.shape
+    normVar = np.asarray(normVar, dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        drops = ~(CN0[:, 1:] > CN0[:, :-1] - normVar[:, np.newaxis])
+    startLength = np.where(drops.any(axis=1), drops.argmax(axis=1) + 1, nrEpochs)
+
+    inStart = np.arange(nrEpochs) < startLength[:, np.newaxis]
+    startMean = np.where(inStart, CN0, 0).sum(axis=1, dtype=np.float64) / np.maximum(startLength, 1)
+
+    return startLength, startMean
+
+
+def firstCrossing(CN0, rows, fromEpochs, thresholds, below=True, window=SEARCH_WINDOW):
+    """
+    firstCrossing finds for the given rows the first epoch at or after fromEpochs where the CN0 is below
+    (or, with below=False, not below) the threshold of the row
+
+    Parameters:
+        CN0: 2D array [series, epoch] without missing values
+        rows: indices of the series to search
+        fromEpochs: first epoch to examine for each row
+        thresholds: threshold for each row
+
+    Returns:
+        crossings: epoch of the crossing for each row, number of epochs when there is none
+    """
+    nrEpochs = CN0.shape[1]
+    crossings = np.empty(len(rows), dtype=np.int64)
+    crossings.fill(nrEpochs)
+
+    offsets = np.asarray(fromEpochs, dtype=np.int64).copy()
+    searching = np.flatnonzero(offsets < nrEpochs)
+    windowEpochs = np.arange(window)
+    while searching.size > 0:
+        epochs = offsets[searching, np.newaxis] + windowEpochs
+        values = CN0[rows[searching, np.newaxis], np.minimum(epochs, nrEpochs - 1)]
+        hits = values < thresholds[searching, np.newaxis]
+        if not below:
+            hits = ~hits
+        hits &= epochs < nrEpochs
+
+        found = hits.any(axis=1)
+        crossings[searching[found]] = epochs[found, hits[found].argmax(axis=1)]
+
+        offsets[searching] += window
+        searching = searching[~found & (offsets[searching] < nrEpochs)]
+
+    return crossings
+
+
+def detectJamming(CN0, normVar, spanTOW, SVIDs, signalTypes, fillValue=0., verbose=False):
+    """
+    detectJamming detects the jamming events on a set of CN0 series
+
+    Parameters:
+        CN0: 2D array [series, epoch] of CN0 values (NaN when not observed)
+        normVar: normal variation for each series (see normVarDet)
+        spanTOW: TOW of each epoch
+        SVIDs, signalTypes: SVID and signal type of each series
+        fillValue: CN0 value used for the missing observations
+
+    Returns:
+        events: array (dtype colFmtJamEvent) sorted on series and start, with the SVID, signal type,
+            the start and stop epoch indices and TOWs and the depth (baseline minus lowest CN0) of each event.
+            An event still ongoing at the last epoch has STOP equal to the number of epochs and a NaN STOPTOW.
+    """
+    CN0 = np.atleast_2d(CN0)
+    nrSeries, nrEpochs = CN0.shape
+    # one normal variation per series, a scalar applies to all of them
+    normVar = np.asarray(normVar, dtype=np.float64) * np.ones(nrSeries)
+    spanTOW = np.asarray(spanTOW, dtype=np.float64)
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Detecting jamming on %d CN0 series of %d epochs', nrSeries, nrEpochs)
+
+    startLength, baseline = startPeriod(CN0, normVar)
+
+    # missing values are replaced once for the whole array, a sentinel closes the last series
+    values = np.where(np.isnan(CN0), fillValue, CN0).astype(np.float64)
+    flatValues = np.append(values.ravel(), np.inf)
+
+    eventRows, eventStarts, eventStops, eventDepths = [], [], [], []
+    active = np.flatnonzero(startLength < nrEpochs)
+    fromEpochs = startLength.astype(np.int64)
+    while active.size > 0:
+        starts = firstCrossing(values, active, fromEpochs[active], baseline[active] - normVar[active], below=True)
+        jammed = starts < nrEpochs
+        active, starts = active[jammed], starts[jammed]
+        if active.size == 0:
+            break
+
+        # the baseline becomes the CN0 just before the start of the event
+        baseline[active] = values[active, starts - 1]
+        stops = firstCrossing(values, active, starts + 1, baseline[active] - normVar[active], below=False)
+
+        # lowest CN0 of each event [start, stop[ by a single reduceat over the flattened array
+        bounds = np.empty(2 * active.size, dtype=np.int64)
+        bounds[0::2] = active * nrEpochs + starts
+        bounds[1::2] = active * nrEpochs + stops
+        lowest = np.minimum.reduceat(flatValues, bounds)[0::2]
+
+        eventRows.append(active)
+        eventStarts.append(starts)
+        eventStops.append(stops)
+        eventDepths.append(baseline[active] - lowest)
+
+        fromEpochs[active] = stops + 1
+        active = active[stops + 1 < nrEpochs]
+
+    events = np.empty(sum(len(rows) for rows in eventRows), dtype=np.dtype({'names': list(mSSN.colNamesJamEvent), 'formats': mSSN.colFmtJamEvent.split(',')}))
+    if len(events) == 0:
+        return events
+
+    rows = np.concatenate(eventRows)
+    starts = np.concatenate(eventStarts)
+    stops = np.concatenate(eventStops)
+    order = np.lexsort((starts, rows))
+    rows, starts, stops = rows[order], starts[order], stops[order]
+
+    events['JAM_SVID'] = np.asarray(SVIDs)[rows]
+    events['JAM_SIGNALTYPE'] = np.asarray(signalTypes)[rows]
+    events['JAM_START'] = starts
+    events['JAM_STOP'] = stops
+    events['JAM_STARTTOW'] = spanTOW[starts]
+    events['JAM_STOPTOW'] = np.append(spanTOW, np.nan)[stops]
+    events['JAM_DEPTH'] = np.concatenate(eventDepths)[order]
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Found %d jamming events on %d CN0 series', len(events), len(np.unique(rows)))
+
+    return events
+
+
+class StreamJamDetector(object):
+    """
+    StreamJamDetector applies the jamming detection epoch by epoch on live MeasEpoch data
+
+    The state of each SV and signal type (starting period sum, previous CN0, baseline and whether it is
+    jammed) is kept in fixed size arrays indexed by SVID and signal type, so the memory used does not
+    depend on the duration of the session. The normal variation of a SV follows from the running mean of
+    the elevations received in SatVisibility (the lowest band as long as no elevation is known).
+
+    Every received epoch is handled at once for all SVs and signal types, a start or stop of jamming
+    is reported in the epoch it occurs. A signal that is no longer received counts as CN0 of fillValue,
+    after maxGap seconds without observations it is forgotten and restarts with a new starting period.
+
+    As the span of the data is not known beforehand, the results differ from detectJamming at the edges:
+        - the starting period of a signal begins at its first valid CN0, while detectJamming starts all
+          series at the first epoch of the span (a signal rising later has an empty starting period there)
+        - an observation with a NaN CN0 does not start the starting period, the signal stays unseen until
+          it has a valid CN0
+        - a jammed signal that is forgotten gets a stop event with a NaN CN0, it was not seen recovering,
+          like the NaN STOPTOW of an event still ongoing at the end of the span in detectJamming
+
+    Parameters:
+        fillValue: CN0 value used for the missing observations
+        maxGap: number of seconds after which a signal no longer received is forgotten
+    """
+    MAX_SVID = 256
+    MAX_SIGNALTYPE = 64
+
+    # phases of a signal
+    UNSEEN, STARTING, TRACKING, JAMMED = 0, 1, 2, 3
+
+    def __init__(self, fillValue=0., maxGap=60., verbose=False):
+        self.fillValue = fillValue
+        self.maxGap = maxGap
+        self.verbose = verbose
+
+        nrSlots = self.MAX_SVID * self.MAX_SIGNALTYPE
+        self.phase = np.zeros(nrSlots, dtype=np.int8)
+        self.startSum = np.zeros(nrSlots)
+        self.startCount = np.zeros(nrSlots, dtype=np.int64)
+        self.previous = np.zeros(nrSlots)
+        self.baseline = np.zeros(nrSlots)
+        self.lastSeen = np.zeros(nrSlots)
+
+        self.elevationSum = np.zeros(self.MAX_SVID)
+        self.elevationCount = np.zeros(self.MAX_SVID, dtype=np.int64)
+
+        self.eventDType = np.dtype({'names': list(mSSN.colNamesJamStreamEvent), 'formats': mSSN.colFmtJamStreamEvent.split(',')})
+
+    def normVar(self, SVIDs):
+        """
+        normVar returns the normal variation of the SVs based on their mean elevation up to now
+        """
+        count = self.elevationCount[SVIDs]
+        meanElevation = np.where(count > 0, self.elevationSum[SVIDs] / np.maximum(count, 1), 0.)
+
+        return normVarDet(meanElevation)
+
+    def addVisibility(self, dataVisibility):
+        """
+        addVisibility updates the mean elevation of the SVs with SatVisibility data
+        """
+        known = ~np.isnan(dataVisibility['VISIBILITY_ELEVATION'])
+        SVIDs = dataVisibility['VISIBILITY_SVID'][known].astype(np.int64)
+        np.add.at(self.elevationSum, SVIDs, dataVisibility['VISIBILITY_ELEVATION'][known])
+        np.add.at(self.elevationCount, SVIDs, 1)
+
+    def addMeasurements(self, dataMeas):
+        """
+        addMeasurements handles the epochs contained in MeasEpoch data in order of time
+
+        Returns:
+            events: array (dtype colFmtJamStreamEvent) with the start and stop events of jamming
+        """
+        epochs = dataMeas['MEAS_WNC'].astype(np.float64) * gpstime.secsInWeek + dataMeas['MEAS_TOW']
+        order = np.argsort(epochs, kind='mergesort')
+        dataMeas, epochs = dataMeas[order], epochs[order]
+
+        boundaries = np.flatnonzero(np.diff(epochs)) + 1
+        events = [np.empty(0, dtype=self.eventDType)]
+        for start, stop in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(epochs)]))):
+            if stop > start:
+                epoch = dataMeas[start:stop]
+                events.append(self.processEpoch(int(epoch['MEAS_WNC'][0]), float(epoch['MEAS_TOW'][0]), epoch['MEAS_SVID'], epoch['MEAS_SIGNALTYPE'], epoch['MEAS_CN0']))
+
+        return np.concatenate(events)
+
+    def processEpoch(self, WNc, TOW, SVIDs, signalTypes, CN0):
+        """
+        processEpoch updates the state of all signals with the CN0 values observed at an epoch
+
+        Parameters:
+            WNc, TOW: time of the epoch
+            SVIDs, signalTypes, CN0: the observations of the epoch
+
+        Returns:
+            events: array (dtype colFmtJamStreamEvent) with the jamming starts and stops at this epoch
+        """
+        epochTime = WNc * gpstime.secsInWeek + TOW
+        observed = np.asarray(SVIDs, dtype=np.int64) * self.MAX_SIGNALTYPE + np.asarray(signalTypes, dtype=np.int64)
+        self.lastSeen[observed] = epochTime
+
+        # the signals that were tracked but are not observed at this epoch
+        missing = np.setdiff1d(np.flatnonzero(self.phase != self.UNSEEN), observed)
+        lost = missing[epochTime - self.lastSeen[missing] > self.maxGap]
+        lostJammed = lost[self.phase[lost] == self.JAMMED]
+        self.phase[lost] = self.UNSEEN
+        missing = np.setdiff1d(missing, lost)
+
+        slots = np.concatenate((observed, missing))
+        values = np.concatenate((np.asarray(CN0, dtype=np.float64), np.empty(len(missing))))
+        isMissing = np.isnan(values)
+        isMissing[len(observed):] = True
+        values[isMissing] = self.fillValue
+        normVar = self.normVar(slots // self.MAX_SIGNALTYPE)
+        phase = self.phase[slots]
+        previous = self.previous[slots]
+
+        # new signals start their starting period at their first valid CN0
+        unseen = phase == self.UNSEEN
+        new = unseen & ~isMissing
+        self.startSum[slots[new]] = values[new]
+        self.startCount[slots[new]] = 1
+        self.phase[slots[new]] = self.STARTING
+
+        # the starting period continues as long as CN0 does not drop more than the normal variation
+        starting = phase == self.STARTING
+        continuing = starting & ~isMissing & (values > previous - normVar)
+        self.startSum[slots[continuing]] += values[continuing]
+        self.startCount[slots[continuing]] += 1
+        ended = starting & ~continuing
+        self.baseline[slots[ended]] = self.startSum[slots[ended]] / self.startCount[slots[ended]]
+        phase[ended] = self.TRACKING
+
+        # start and stop of jamming w.r.t. the baseline
+        below = values < self.baseline[slots] - normVar
+        jamStarts = (phase == self.TRACKING) & below
+        self.baseline[slots[jamStarts]] = previous[jamStarts]
+        jamStops = (phase == self.JAMMED) & ~below
+
+        phase[jamStarts] = self.JAMMED
+        phase[jamStops] = self.TRACKING
+        self.phase[slots[~unseen]] = phase[~unseen]
+        self.previous[slots] = values
+
+        nrEvents = np.count_nonzero(jamStarts) + np.count_nonzero(jamStops) + len(lostJammed)
+        events = np.zeros(nrEvents, dtype=self.eventDType)
+        events['JAMSTREAM_WNC'] = WNc
+        events['JAMSTREAM_TOW'] = TOW
+        eventSlots = np.concatenate((slots[jamStarts], slots[jamStops], lostJammed))
+        events['JAMSTREAM_SVID'] = eventSlots // self.MAX_SIGNALTYPE
+        events['JAMSTREAM_SIGNALTYPE'] = eventSlots % self.MAX_SIGNALTYPE
+        events['JAMSTREAM_JAMMED'][:np.count_nonzero(jamStarts)] = 1
+        events['JAMSTREAM_CN0'] = np.concatenate((values[jamStarts], values[jamStops], np.empty(len(lostJammed)) * np.nan))
+        events['JAMSTREAM_BASELINE'] = self.baseline[eventSlots]
+
+        return events
+
+
+def jammingPositionsLoop(CN0Series, normVar):
+    """
+    jammingPositionsLoop is the original epoch by epoch detection of jamDet.py, kept as reference
+
+    Returns:
+        jammingPos: alternating start and stop epoch indices of the events
+    """
+    start = [CN0Series[0]]
+    for j in range(len(CN0Series))[1:]:
+        if CN0Series[j] > CN0Series[j - 1] - normVar:
+            start.append(CN0Series[j])
+        else:
+            break
+
+    CN0Series = np.where(np.isnan(CN0Series), 0, CN0Series)
+    checker = 0
+    startMean = np.mean(start)
+    jammingPos = []
+    for j in range(len(CN0Series))[len(start):]:
+        if CN0Series[j] < startMean - normVar:
+            if checker == 0:
+                startMean = CN0Series[j - 1]
+                jammingPos.append(j)
+            checker = 1
+        else:
+            if checker == 1:
+                jammingPos.append(j)
+            checker = 0
+
+    return jammingPos
+
+
+if __name__ == "__main__":
+    # benchmark on a full day of 1 Hz CN0 for 40 SVs x 3 signal types against the original loop
+    nrSVs, nrSignalTypes, nrEpochs = 40, 3, 86400
+    nrSeries = nrSVs * nrSignalTypes
+
+    rng = np.random.RandomState(1)
+    CN0 = (45 + rng.normal(0, 0.2, (nrSeries, nrEpochs))).astype(np.float32)
+    # the SVs are visible only part of the day and have some data gaps and jammed periods
+    for i in range(nrSeries):
+        rise = rng.randint(0, nrEpochs // 2)
+        CN0[i, :rise] = np.nan
+        CN0[i, rise + rng.randint(nrEpochs // 4, nrEpochs // 2):] = np.nan
+        for gap in rng.randint(0, nrEpochs, 5):
+            CN0[i, gap:gap + rng.randint(1, 30)] = np.nan
+        for jam in rng.randint(0, nrEpochs, 10):
+            CN0[i, jam:jam + rng.randint(10, 600)] -= rng.uniform(5, 20)
+    # first epoch of the day is observed so the starting periods are not empty
+    CN0[:, 0] = 45
+    normVar = normVarDet(rng.uniform(0, 90, nrSeries))
+    spanTOW = np.arange(nrEpochs, dtype=np.float64)
+    SVIDs = np.repeat(np.arange(1, nrSVs + 1), nrSignalTypes)
+    signalTypes = np.tile(np.arange(nrSignalTypes), nrSVs)
+
+    start = time.time()
+    loopPositions = [jammingPositionsLoop(CN0[i], normVar[i]) for i in range(nrSeries)]
+    timeLoop = time.time() - start
+
+    start = time.time()
+    events = detectJamming(CN0, normVar, spanTOW, SVIDs, signalTypes)
+    timeVectorized = time.time() - start
+
+    # compare the events with the positions found by the loop
+    vectorizedPositions = [[] for i in range(nrSeries)]
+    for event in events:
+        i = (event['JAM_SVID'] - 1) * nrSignalTypes + event['JAM_SIGNALTYPE']
+        vectorizedPositions[i].append(int(event['JAM_START']))
+        if event['JAM_STOP'] < nrEpochs:
+            vectorizedPositions[i].append(int(event['JAM_STOP']))
+
+    print('series = %d x epochs = %d, events = %d' % (nrSeries, nrEpochs, len(events)))
+    print('loop:       %8.3f s' % timeLoop)
+    print('vectorized: %8.3f s' % timeVectorized)
+    print('speed up = %.1f' % (timeLoop / timeVectorized))
+    print('identical events: %s' % (loopPositions == vectorizedPositions))
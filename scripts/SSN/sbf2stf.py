@@ -2,11 +2,16 @@
 
 import sys
 import subprocess
-import time
+import threading
+import signal
 import os
+import glob
+import multiprocessing
 import numpy as np
 from SSN import location
 from SSN import ssnConstants as mSSN
+from SSN import stfReader
+from SSN import ssnLogging
 
 
 # exit codes
@@ -19,66 +24,129 @@ E_FAILURE = 99
 E_DOP_INVALID = 10
 E_NRSVS_INVALID = 11
 
+logger = ssnLogging.getLogger(__name__)
 
-def runCmd(cmd, optCmd, verbose=False):
+
+# maximal time in seconds an external command may run (None for no limit)
+TIME2WAIT = 300
+
+# return code of a command killed by Popen.kill (SIGKILL on POSIX, TerminateProcess with exit code 1 on Windows)
+KILLED_RETURNCODE = -signal.SIGKILL if hasattr(signal, 'SIGKILL') else 1
+
+
+def streamOutput(pipe, lines, prefix=None, stream=None):
     """
-    Run an external command and wait until it finishes (or max time set by TIME2WAIT)
+    streamOutput reads the lines from a pipe of a subprocess until it is closed, run as a thread
+
+    Parameters:
+        pipe: stdout or stderr of the subprocess
+        lines: list to which the lines read are appended
+        prefix: when not None, each line is written to stream preceded by prefix as soon as it arrives
+        stream: stream the lines are echoed to (default sys.stdout)
+    """
+    if stream is None:
+        stream = sys.stdout
+    for line in iter(pipe.readline, b''):
+        lines.append(line)
+        if prefix is not None:
+            stream.write('%s%s\n' % (prefix, line.decode('ascii', 'replace').rstrip()))
+            stream.flush()
+    pipe.close()
+
+
+def executeCmd(cmd, optCmd, timeout=TIME2WAIT, verbose=False):
+    """
+    Run an external command and wait until it finishes without polling, the command is killed after timeout seconds
 
     Parameters:
       cmd           the command to execute
       optCmd        the options passed to cmd
+      timeout       maximal time in seconds the command may run (None for no limit)
 
     Returns
-        on completion, returns the stdout output of program
-        on error, informs the error and exits
+        returncode, stdout and stderr output of the command and whether the timeout occured
     """
-    # some constants used
-    TIME2WAIT = 300
-    NROFDOTS = 10
-
-    # start the subprocess and use timing to failstop it
     cmdFull = [cmd] + optCmd
-    t_nought = time.time()
     p = subprocess.Popen(cmdFull, shell=False,
                          stdout=subprocess.PIPE,
                          stderr=subprocess.PIPE)
-    # Wait for date to terminate. Get returncode
-    seconds_passed = 0
-    while(p.poll() is None and seconds_passed < TIME2WAIT):
-        # We can do other things here while we wait
-        time.sleep(1.)
-        seconds_passed = time.time() - t_nought
-        if verbose:
-            dots = (('.' * (((int)(seconds_passed - 1) % NROFDOTS) + 1)) + (' ' * NROFDOTS))
-            sys.stdout.write('  Converting SBF data %s\r' % dots)
-            sys.stdout.flush()
-
-    if verbose:
-        sys.stdout.write('\n')
+
+    # read stdout and stderr in threads so that a full pipe never blocks the command, stderr is echoed to stderr
+    outPrefix = '  %s: ' % os.path.basename(cmd) if verbose else None
+    errPrefix = '  %s (stderr): ' % os.path.basename(cmd) if verbose else None
+    outLines = []
+    errLines = []
+    readers = [threading.Thread(target=streamOutput, args=(p.stdout, outLines, outPrefix, sys.stdout)),
+               threading.Thread(target=streamOutput, args=(p.stderr, errLines, errPrefix, sys.stderr))]
+    for reader in readers:
+        reader.daemon = True
+        reader.start()
+
+    # a timer kills the command when the time has passed, wait returns as soon as the command ends
+    killed = threading.Event()
+
+    def killCmd():
+        killed.set()
+        try:
+            p.kill()
+        except OSError:
+            # command ended meanwhile
+            pass
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, killCmd)
+        timer.start()
+    returnCode = p.wait()
+    if timer is not None:
+        timer.cancel()
+
+    # the timer may fire between the end of the command and cancel, the command only timed out when the kill ended it
+    timedOut = killed.is_set() and returnCode == KILLED_RETURNCODE
+
+    # children of a killed command may keep the pipes open, so do not wait for the readers after a timeout
+    if not timedOut:
+        for reader in readers:
+            reader.join()
+
+    return returnCode, b''.join(outLines), b''.join(errLines), timedOut
+
+
+def runCmd(cmd, optCmd, verbose=False, timeout=TIME2WAIT):
+    """
+    Run an external command and wait until it finishes (or max time set by timeout)
+
+    Parameters:
+      cmd           the command to execute
+      optCmd        the options passed to cmd
+      timeout       maximal time in seconds the command may run (None for no limit)
+
+    Returns
+        on completion, returns the stdout output of program
+        on error, informs the error and exits
+    """
+    returnCode, results, errors, timedOut = executeCmd(cmd, optCmd, timeout, verbose)
 
     # check the condition at end of execution
-    if (seconds_passed >= TIME2WAIT):
+    if timedOut:
         sys.stderr.write('  maximal processing time passed. %s exits.\n' % cmd)
         sys.exit(E_TIME_PASSED)
-    else:
-        (results, errors) = p.communicate()
-        # sys.stdout.write("\nCommand output : \n", results)
-        # print("error : ", errors)
-        if errors == '':
-            return results
-        else:
-            sys.stderr.write("  execution of %s failed with errors %s. %s exits.\n" %
-                             (cmdFull, errors, cmd))
-            sys.exit(E_FAILURE)
+    elif errors:
+        sys.stderr.write("  execution of %s failed with errors %s. %s exits.\n" %
+                         ([cmd] + optCmd, errors, cmd))
+        sys.exit(E_FAILURE)
 
+    return results
 
-def runSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False):
+
+def runSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False, timeout=TIME2WAIT):
     """
     run the sbf2stf conversion and return the files created
 
     Parameters:
         sbfFileName: name of SBF file to convert with sbf2stf
         optSBF2STF: list of options given for sbf2stf
+        timeout: maximal time in seconds for the conversion (None for no limit)
 
     Returns:
         nameConverted: list of names of output files created
@@ -91,8 +159,7 @@ def runSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False):
     # make a private copy of the options optSBF2STF passed
     privateOptSBF2STF = list(optSBF2STF)
 
-    if verbose:
-        sys.stdout.write('Executing %s on %s\n' % (SBF2STF, sbfFileName))
+    logger.log(ssnLogging.verboseLevel(verbose), 'Executing %s on %s', SBF2STF, sbfFileName)
 
     # create the vars containing the names of the files created
     nameConverted = []
@@ -117,16 +184,15 @@ def runSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False):
 
     nameConvertedReUse = []
     nameConvertedCreate = []
-    if verbose:
-        for i in range(len(nameConvertedExists)):
-            if nameConvertedExists[i] is True:
-                nameConvertedReUse.append(nameConverted[i])
-            else:
-                nameConvertedCreate.append(nameConverted[i])
-        if overwrite:
-            sys.stdout.write('  Creating files: %s\n' % nameConvertedCreate)
+    for i in range(len(nameConvertedExists)):
+        if nameConvertedExists[i] is True:
+            nameConvertedReUse.append(nameConverted[i])
         else:
-            sys.stdout.write('  Re-using files: %s\n' % nameConvertedReUse)
+            nameConvertedCreate.append(nameConverted[i])
+    if overwrite:
+        logger.log(ssnLogging.verboseLevel(verbose), '  Creating files: %s', nameConvertedCreate)
+    else:
+        logger.log(ssnLogging.verboseLevel(verbose), '  Re-using files: %s', nameConvertedReUse)
 
     # Perform SBF conversion if needed
     if False in nameConvertedExists:
@@ -139,17 +205,104 @@ def runSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False):
         # cmdOpts += ['--precision', '3']             # 3 decimals
         # cmdOpts += ['-v']                           # verbose
         # cmdOpts += ['--unsugaredMeasEpoch']
-        if verbose:
-            sys.stdout.write('  Options: %s\n' % cmdOpts)
+        logger.log(ssnLogging.verboseLevel(verbose), '  Options: %s', cmdOpts)
         # execute the SBF2STF
-        runCmd(SBF2STF, cmdOpts, verbose)
+        runCmd(SBF2STF, cmdOpts, verbose, timeout)
 
-    if verbose:
-        sys.stdout.write('  SBF2STF conversion done. Returning files %s\n' % nameConverted)
+    logger.log(ssnLogging.verboseLevel(verbose), '  SBF2STF conversion done. Returning files %s', nameConverted)
 
     return nameConverted
 
 
+def stfCacheName(stfFileName):
+    """
+    stfCacheName returns the name of the binary cache of a sbf2stf converted file
+
+    The size and modification time (in ms) of the stf file are part of the name, so a
+    re-conversion of the SBF file automatically invalidates the cache.
+    """
+    stat = os.stat(stfFileName)
+
+    return '%s.%d-%d.npy' % (stfFileName, stat.st_size, int(stat.st_mtime * 1000))
+
+
+def readSTFCache(stfFileName, dtype, verbose=False):
+    """
+    readSTFCache memory-maps the binary cache of a sbf2stf converted file
+
+    Parameters:
+        stfFileName: name of the file created by sbf2stf
+        dtype: dtype the cached array must have
+
+    Returns:
+        the cached array (copy-on-write memory map) or None when no valid cache exists
+    """
+    cacheName = stfCacheName(stfFileName)
+    if not os.path.isfile(cacheName):
+        return None
+
+    try:
+        data = np.load(cacheName, mmap_mode='c')
+    except (IOError, ValueError):
+        return None
+
+    if data.dtype != dtype:
+        return None
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Using cache %s', cacheName)
+
+    return data
+
+
+def writeSTFCache(stfFileName, data, verbose=False):
+    """
+    writeSTFCache saves the array read from a sbf2stf converted file as binary cache, removing outdated caches
+
+    Parameters:
+        stfFileName: name of the file created by sbf2stf
+        data: the (sorted) array read from the file
+    """
+    cacheName = stfCacheName(stfFileName)
+    for oldCacheName in glob.glob(stfFileName + '.*-*.npy'):
+        if oldCacheName != cacheName:
+            os.remove(oldCacheName)
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Creating cache %s', cacheName)
+
+    try:
+        np.save(cacheName, data)
+    except IOError:
+        # the cache is only an optimisation, continue when the directory is not writable
+        sys.stderr.write('  Could not write cache %s\n' % cacheName)
+
+
+def readSTF(stfFileName, colFmt, colNames, sortColumns=None, verbose=False):
+    """
+    readSTF reads a sbf2stf converted csv file into a numpy structured array using the binary cache
+
+    The first time the csv file is parsed (and sorted) and the result is stored in a binary
+    cache next to it, later calls load this cache as a memory map.
+
+    Parameters:
+        stfFileName: name of file created by sbf2stf
+        colFmt, colNames: format and names of the columns (see ssnConstants)
+        sortColumns: columns to sort on, the last being the primary sort key (see np.lexsort)
+
+    Returns:
+        data: array with the content of the file
+    """
+    dtype = np.dtype({'names': list(colNames), 'formats': colFmt.split(',')})
+
+    data = readSTFCache(stfFileName, dtype, verbose)
+    if data is None:
+        data = stfReader.readSTFFile(stfFileName, colFmt, colNames, verbose=verbose)
+        if sortColumns is not None:
+            data = data[np.lexsort([data[column] for column in sortColumns])]
+        writeSTFCache(stfFileName, data, verbose)
+
+    return data
+
+
 def readDOPEpoch(stfMeasEpochFName, verbose=False):
     """
     reads the sbf2stf converted DOP cvs file and stores it into dataMeas numpy darray
@@ -160,10 +313,9 @@ def readDOPEpoch(stfMeasEpochFName, verbose=False):
     Returns:
         DOP: contains the DOP afterbirthr sorting for TOW
     """
-    if verbose:
-        sys.stdout.write('    Reading DOP_2 data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading DOP_2 data')
 
-    DOPData = np.genfromtxt(stfMeasEpochFName, delimiter=",", skip_header=2, dtype=mSSN.colFmtDOP, names=mSSN.colNamesDOP)  # , filling_values=np.nan
+    DOPData = readSTF(stfMeasEpochFName, mSSN.colFmtDOP, mSSN.colNamesDOP, verbose=verbose)  # , filling_values=np.nan
 
     return DOPData
 
@@ -178,12 +330,11 @@ def readGEODPosEpoch(stfMeasEpochFName, verbose=False):
     Returns:
         dataMeas: contains the dataMeas after sorting for TOW
     """
-    if verbose:
-        sys.stdout.write('    Reading Geodetic_2 data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading Geodetic_2 data')
 
-    GEODPosData = np.genfromtxt(stfMeasEpochFName, delimiter=",", skip_header=2, dtype=mSSN.colFmtPosGeod, names=mSSN.colNamesPosGeod)
+    GEODPosData = readSTF(stfMeasEpochFName, mSSN.colFmtPosGeod, mSSN.colNamesPosGeod, verbose=verbose)
 
-    print("GEODPosData = %s (#%d)" % (GEODPosData, len(GEODPosData)))
+    logger.debug("GEODPosData = %s (#%d)", GEODPosData, len(GEODPosData))
 
     return GEODPosData
 
@@ -198,14 +349,10 @@ def readMeasEpoch(stfMeasEpochFName, verbose=False):
     Returns:
         dataMeas: contains the dataMeas after sorting for TOW, CHANNEL and SIGNALTYPE
     """
-    if verbose:
-        sys.stdout.write('    Reading and sorting MeasEpoch_2 data\n')
-
-    measData = np.genfromtxt(stfMeasEpochFName, delimiter=",", skip_header=2, dtype=mSSN.colFmtMeasEpoch, names=mSSN.colNamesMeasEpoch)
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading and sorting MeasEpoch_2 data')
 
-    # sort the measData array according to TOW, CHANNEL, SIGNALTYPE
-    sortIndexMeas = np.lexsort((measData['MEAS_SIGNALTYPE'], measData['MEAS_CHANNEL'], measData['MEAS_TOW']))
-    dataMeasSorted = measData[sortIndexMeas]
+    # read the measData array sorted according to TOW, CHANNEL, SIGNALTYPE
+    dataMeasSorted = readSTF(stfMeasEpochFName, mSSN.colFmtMeasEpoch, mSSN.colNamesMeasEpoch, ('MEAS_SIGNALTYPE', 'MEAS_CHANNEL', 'MEAS_TOW'), verbose)
 
     return dataMeasSorted
 
@@ -222,14 +369,10 @@ def readMeasExtra(stfMeasExtraName, verbose=False):
     """
     # colNames = ['EXTRA_WNC', 'EXTRA_TOW', 'EXTRA_CHANNEL', 'EXTRA_ANTENNA', 'EXTRA_SIGNALTYPE', 'EXTRA_LOCKTIME', 'EXTRA_CODEVARIANCE', 'EXTRA_CARRIERVARIANCE', 'EXTRA_DOPPLERVARIANCE', 'EXTRA_MPCORR', 'EXTRA_SMOOTHINGCORR', 'EXTRA_CUMMLOSSCONT']
     # colFmt = '%d,%f,%d,%d,%d,%d,%f,%f,%f,%d,%d,%d'
-    if verbose:
-        sys.stdout.write('    Reading and sorting MeasExtra_1 data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading and sorting MeasExtra_1 data')
 
-    dataExtra = np.genfromtxt(stfMeasExtraName, delimiter=",", skip_header=2, dtype=mSSN.colFmtMeasExtra, names=mSSN.colNamesMeasExtra)
-
-    # sort the dataExtra array according to TOW, CHANNEL, SIGNALTYPE
-    sortIndexExtra = np.lexsort((dataExtra['EXTRA_SIGNALTYPE'], dataExtra['EXTRA_CHANNEL'], dataExtra['EXTRA_TOW']))
-    dataExtraSorted = dataExtra[sortIndexExtra]
+    # read the dataExtra array sorted according to TOW, CHANNEL, SIGNALTYPE
+    dataExtraSorted = readSTF(stfMeasExtraName, mSSN.colFmtMeasExtra, mSSN.colNamesMeasExtra, ('EXTRA_SIGNALTYPE', 'EXTRA_CHANNEL', 'EXTRA_TOW'), verbose)
 
     return dataExtraSorted
 
@@ -244,10 +387,9 @@ def readSatVisibility(stfSatVisibilityName, verbose=False):
     Returns:
         dataVisibility: contains the dataVisibility after sorting for Wnc and TOW
     """
-    if verbose:
-        sys.stdout.write('    Reading and sorting SatVisibility_1 data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading and sorting SatVisibility_1 data')
 
-    dataVisibility = np.genfromtxt(stfSatVisibilityName, delimiter=",", skip_header=2, dtype=mSSN.colFmtSatVisibility, names=mSSN.colNamesSatVisibility)
+    dataVisibility = readSTF(stfSatVisibilityName, mSSN.colFmtSatVisibility, mSSN.colNamesSatVisibility, verbose=verbose)
 
     # sort the dataVisibility array according to Wnc and TOW
     # sortIndexVisibility = np.lexsort((dataVisibility['VISIBILITY_WNC'], dataVisibility['VISIBILITY_TOW']))
@@ -281,14 +423,100 @@ def readChannelStatus(stfChannelStatusName, verbose=False):
     Returns:
         chanStatus: contains the channel status
     """
-    if verbose:
-        sys.stdout.write('    Reading ChannelStatus_1 data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading ChannelStatus_1 data')
 
-    chanStatus = np.genfromtxt(stfChannelStatusName, delimiter=",", skip_header=2, dtype=mSSN.colFmtChannelStatus, names=mSSN.colNamesChannelStatus)
+    chanStatus = readSTF(stfChannelStatusName, mSSN.colFmtChannelStatus, mSSN.colNamesChannelStatus, verbose=verbose)
 
     return chanStatus
 
 
+# functions reading the file created by sbf2stf for each conversion option
+readFunctions = {'MeasEpoch_2': readMeasEpoch,
+                 'MeasExtra_1': readMeasExtra,
+                 'SatVisibility_1': readSatVisibility,
+                 'ChannelStatus_1': readChannelStatus,
+                 'DOP_2': readDOPEpoch,
+                 'PVTGeodetic_2': readGEODPosEpoch,
+                 }
+
+
+def convertBlock(convertArgs):
+    """
+    convertBlock converts and parses one block type of a SBF file, used as worker of convertSBF2STF
+
+    The parsed array is not returned to the calling process but stored in the binary cache
+    next to the converted file, from where it is memory-mapped by the caller.
+
+    Parameters:
+        convertArgs: tuple (sbfFileName, option, overwrite, timeout)
+
+    Returns:
+        option, name of the converted file and exit code (E_SUCCESS or the code sys.exit was called with)
+    """
+    sbfFileName, option, overwrite, timeout = convertArgs
+
+    try:
+        stfFileName = runSBF2STF(sbfFileName, [option], overwrite, timeout=timeout)[0]
+        readFunctions[option](stfFileName)
+    except SystemExit as e:
+        # do not let a worker die, the pool would wait forever for its result
+        return option, None, e.code
+
+    return option, stfFileName, E_SUCCESS
+
+
+def iterSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False, nrProcesses=None, timeout=TIME2WAIT):
+    """
+    iterSBF2STF converts and parses each block type of a SBF file in its own process
+
+    Parameters:
+        sbfFileName: name of SBF file to convert with sbf2stf
+        optSBF2STF: list of options given for sbf2stf
+        nrProcesses: number of worker processes (defaults to one per option, at most the number of CPUs)
+        timeout: maximal time in seconds for each conversion (None for no limit)
+
+    Returns:
+        generator yielding (option, data) in order of completion of the conversions
+    """
+    for option in optSBF2STF:
+        if option not in readFunctions:
+            sys.stderr.write('  wrong option %s given. Program exits.\n' % option)
+            sys.exit(E_UNKNOWN_OPTION)
+
+    if nrProcesses is None:
+        nrProcesses = min(len(optSBF2STF), multiprocessing.cpu_count())
+
+    logger.log(ssnLogging.verboseLevel(verbose), 'Converting %s for %s using %d processes', sbfFileName, optSBF2STF, nrProcesses)
+
+    pool = multiprocessing.Pool(nrProcesses)
+    try:
+        for option, stfFileName, exitCode in pool.imap_unordered(convertBlock, [(sbfFileName, option, overwrite, timeout) for option in optSBF2STF]):
+            if exitCode != E_SUCCESS:
+                sys.stderr.write('  conversion of %s for %s failed. Program exits.\n' % (sbfFileName, option))
+                sys.exit(exitCode)
+
+            yield option, readFunctions[option](stfFileName, verbose)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def convertSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose=False, nrProcesses=None, timeout=TIME2WAIT):
+    """
+    convertSBF2STF converts and parses the block types of a SBF file in parallel
+
+    Parameters:
+        sbfFileName: name of SBF file to convert with sbf2stf
+        optSBF2STF: list of options given for sbf2stf
+
+    Returns:
+        list of structured arrays, in the order of optSBF2STF
+    """
+    data = dict(iterSBF2STF(sbfFileName, optSBF2STF, overwrite, verbose, nrProcesses, timeout))
+
+    return [data[option] for option in optSBF2STF]
+
+
 def removeSmoothing(code, smoothingCorr, mpCorr):
     """
     removes the code smoothing and multi-path correction applied by the Rx firmware
@@ -318,8 +546,7 @@ def verifySignalTypeOrder(measSignalType, extraSignalType, measTOW, verbose=Fals
     Returns:
         True if all OK, else False
     """
-    if verbose:
-        sys.stdout.write('    Checking SignalType order\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Checking SignalType order')
 
     if len(measSignalType) == len(extraSignalType):
         deltaSignalType = measSignalType - extraSignalType
@@ -347,18 +574,10 @@ def observedSatellites(colSVIDs, verbose=False):
     Returns:
         Ordered list of observed SVIDs
     """
-    if verbose:
-        sys.stdout.write('    Extracting list of observed satellites: ')
-
     listSVIDs = sorted(list(set(colSVIDs)))
 
-    if verbose:
-        for index, SVPRN in enumerate(listSVIDs):
-            gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVPRN)
-            sys.stdout.write('%s%d (%d)' % (gnssSystShort, gnssPRN, SVPRN))
-            if index < len(listSVIDs) - 1:
-                sys.stdout.write(', ')
-        sys.stdout.write('\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Extracting list of observed satellites: %s',
+               ', '.join('%s%d (%d)' % (mSSN.svPRN(SVPRN)[1], mSSN.svPRN(SVPRN)[2], SVPRN) for SVPRN in listSVIDs))
 
     return listSVIDs
 
@@ -373,18 +592,10 @@ def observedSignalTypes(measSignalTypes, verbose=False):
     Returns:
         Ordered list of observed signal types
     """
-    if verbose:
-        sys.stdout.write('      Extracting list of observed signal types: ')
-
     listSignalTypes = sorted(list(set(measSignalTypes)))
 
-    if verbose:
-        for index, signalType in enumerate(listSignalTypes):
-            sys.stdout.write('%s (%d)' % (mSSN.GNSSSignals[signalType]['name'], signalType))
-            if index < len(listSignalTypes) - 1:
-                sys.stdout.write(', ')
-        sys.stdout.write('\n')
-        # sys.stdout.write('%s\n' % listSignalTypes)
+    logger.log(ssnLogging.verboseLevel(verbose), '      Extracting list of observed signal types: %s',
+               ', '.join('%s (%d)' % (mSSN.GNSSSignals[signalType]['name'], signalType) for signalType in listSignalTypes))
     return listSignalTypes
 
 
@@ -401,8 +612,7 @@ def indicesSatellite(SVID, dataSVIDs, verbose=False):
     """
     # print('SVID = %s' % SVID)
     # print('dataSVIDs = %s' % dataSVIDs)
-    if verbose:
-        sys.stdout.write('    Extracting data for SVID %d\n' % SVID)
+    logger.log(ssnLogging.verboseLevel(verbose), '    Extracting data for SVID %d', SVID)
 
     return np.where(dataSVIDs == SVID)
 
@@ -418,8 +628,7 @@ def indicesSignalType(signalType, measSignalType, verbose=False):
     Returns:
         array containing the indices
     """
-    if verbose:
-        sys.stdout.write('        Getting data for SignalType %s\n' % signalType)
+    logger.log(ssnLogging.verboseLevel(verbose), '        Getting data for SignalType %s', signalType)
 
     # print('measSignalType = %s' % measSignalType)
     # print('type measSignalType = %s' % type(measSignalType))
@@ -437,8 +646,7 @@ def findValidElevation(elevData, verbose=False):
     returns:
         indices which indicate valid elevation data
     """
-    if verbose:
-        sys.stdout.write('    Extracting valid elevation data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Extracting valid elevation data')
 
     return np.where(elevData != -1)
 
@@ -453,12 +661,10 @@ def findValidDOP(pdopData, verbose=False):
     Returns:
         indices which indicate valid DOP data
     """
-    if verbose:
-        sys.stdout.write('    Extracting valid PDOP data\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '    Extracting valid PDOP data')
 
     validDOPIndices = np.where(pdopData != 65535)
-    if verbose:
-        print('validDOPIndices = %s (#%d)' % (validDOPIndices, np.size(validDOPIndices)))
+    logger.debug('validDOPIndices = %s (#%d)', validDOPIndices, np.size(validDOPIndices))
 
     if (np.size(validDOPIndices) == 0):
         sys.stderr.write('       No xDOP entries found. Program exits.\n')
@@ -477,12 +683,10 @@ def findNrSVs(nrSVsData, verbose=False):
     Returns:
         indices which indicate positive nr of SVs
     """
-    if verbose:
-        sys.stdout.write('      Extracting number of observed satellites.\n')
+    logger.log(ssnLogging.verboseLevel(verbose), '      Extracting number of observed satellites.')
 
     validNrSVsIndices = np.where(nrSVsData != 255)
-    if verbose:
-        print('validNrSVsIndices = %s (#%d)' % (validNrSVsIndices, np.size(validNrSVsIndices)))
+    logger.debug('validNrSVsIndices = %s (#%d)', validNrSVsIndices, np.size(validNrSVsIndices))
 
     if (np.size(validNrSVsIndices) == 0):
         sys.stderr.write('       No SVs found. Program exits.\n')
@@ -491,130 +695,12 @@ def findNrSVs(nrSVsData, verbose=False):
     return validNrSVsIndices
 
 
-def findLossOfLock(measLockTime, verbose=False):
-    """
-    returns the indices where a loss of lock occured
-
-    Parameters:
-        measLockTime is the locktime for a specific SVID and specific SignalType
-
-    Returns:
-        array containing the indices where a loss of lock occured
-    """
-    if verbose:
-        sys.stdout.write('  Looking for Loss of Lock\n')
-
-    # calculate the difference between subsequent lockTimes and find the loss of lock
-    diffLockTime = np.diff(np.int64(measLockTime))
-
-    # # for intermediate results only
-    # print('measLockTime = %s (%d)' % (measLockTime, np.size(measLockTime)))
-    # print('diffLockTime = %s (%d)' % (diffLockTime, np.size(diffLockTime)))
-    # print('type diffLockTime = %s' % type(diffLockTime))
-
-    # # for i in range(np.size(diffLockTime)):
-    # #     # if diffLockTime[i] == 0:
-    # #     print('DIFFLOCKTIME[%d] = %s' % (i, diffLockTime[i]))
-
-    # indicesLossOfLock = np.where(diffLockTime < 0)
-
-    # print('indicesLossOfLock = %s' % indicesLossOfLock)
-    # # EOF intermediate results
-
-    return np.where(diffLockTime < 0)
-
-
 def findNanValues(data):
     """
     findNanValues looks where the data is NaN
     """
     # if verbose:
     #     sys.stdout.write('  Looking for NaN index\n')
-    print('data = %s (#%d)' % (data, len(data)))
+    logger.debug('data = %s (#%d)', data, len(data))
 
     return np.where(~np.isnan(data))
-
-
-def findSidePeaks(SVID, signalTypes, dataMeasSVID, verbose=False):
-    """
-    findSidePeaks finds the side peak correlation by differencing the code measurements on E1A and E6
-    Parameters:
-        SVID: identifies the satellite
-        signalTypes: the signals observed for that satellite (ordered list!! so 16 (L1A) before 18 (E6A))
-        dataMeasSVID: the data observed for that satellite
-    Returns:
-        iTOW: the TOWs for which both signals are present
-        dPR: the difference between the E1A and E6A Pseudo Range measurements
-        sidePeakIndex: the index at which a jump in dPR is detected (exluding the first value)
-        jumpDPR: the difference between dPR at detected side peak and its previous value (thus jump in dPR detected)
-        jumpDPRNear97Indices: indices in jumpDPR identifying the elements nearest to 9.7 integer multiple
-    """
-    print('-' * 50)
-    if verbose:
-        sys.stdout.write('  Looking for Side Peaks\n')
-
-    gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
-
-    # define limits for delta PR for detecting 'possible' and 'probable' sidePeak indicators
-    dPRlimit = 4.0  # meter
-    jumpMargin = 0.05  # 5 percent margin on multiple of 9.7 m
-
-    # deterimine the intersection and get the indices on both signal types for that intersection
-    indexTOWIntersect = []
-    iMeas = []  # intersection on TOW between the signaltypes for this SVID
-    # get the TOW that are present for bith SignalTypes
-    iTOW = np.intersect1d(dataMeasSVID[0]['MEAS_TOW'], dataMeasSVID[1]['MEAS_TOW'])
-    # print('iTOW %s ()' % (iTOW, len(iTOW)))
-
-    for index, dataSVIDMeas in enumerate(dataMeasSVID):
-        mask = np.in1d(dataSVIDMeas['MEAS_TOW'], iTOW)
-        indexTOWIntersect.append(np.argwhere(mask).flatten())
-        # create intersection views on data
-        iMeas.append(dataSVIDMeas[indexTOWIntersect[index]])
-
-        print('indexTOWIntersect[%d] = %s (#%d)' % (index, indexTOWIntersect[index], len(indexTOWIntersect[index])))
-        print('iMeas[%d][MEAS_TOW] = %s (#%d)\n' % (index, iMeas[index]['MEAS_TOW'], len(iMeas[index]['MEAS_CODE'])))
-
-        # # save for debugging purposes
-        # fileName = 'meas%s%d-st%d.csv' % (gnssSystShort, gnssPRN, signalTypes[index])
-        # np.savetxt(fileName, iMeas[index], fmt=mSSN.colFmtMeasEpoch)
-
-    # determine difference between observed CODE measurements at each intersecting TOW
-    dPR = iMeas[0]['MEAS_CODE'] - iMeas[1]['MEAS_CODE']
-    print('dPR = %s (#%d)' % (dPR, len(dPR)))
-
-    # look for side-peak indicators when dPR > dPRlimit
-    sidePeakIndex = np.where(np.fabs(np.ediff1d(np.concatenate((np.array([0]), dPR)))) > dPRlimit)[0]
-    print('sidePeakIndex = %s (#%d)\n' % (sidePeakIndex, len(sidePeakIndex)))
-    sidePeakIndex = []
-    sidePeakIndex = np.where(np.fabs(np.ediff1d(dPR[0:])) > dPRlimit)[0] + 1  # add 1 since we ignore the first value for ediff1d
-    print('sidePeakIndex = %s (#%d)\n' % (sidePeakIndex, len(sidePeakIndex)))
-
-    print(np.ediff1d(np.concatenate((np.array([0]), dPR))))
-    print(np.ediff1d(dPR[0:]))
-    print('sidePeakIndex = %s (#%d)\n' % (sidePeakIndex, len(sidePeakIndex)))
-
-    # create array for the TOW/dPR based on the  index indicators for sidePeaks
-    sidePeakTOWs = dataMeasSVID[0][indexTOWIntersect[0]]['MEAS_TOW'][sidePeakIndex]
-    sidePeakDPR = dPR[sidePeakIndex]
-    print('sidePeakTOWs = %s (#%d)' % (sidePeakTOWs, len(sidePeakTOWs)))
-    print('sidePeakDPR = %s (#%d)\n' % (sidePeakDPR, len(sidePeakDPR)))
-
-    # calculate the difference between the detected sidePeak dPR and the previous observed value of dPR
-    prevIndex = sidePeakIndex - 1
-    jumpDPR = dPR[sidePeakIndex] - dPR[prevIndex]
-    print('jumpDPR = %s (#%d)' % (jumpDPR, len(jumpDPR)))
-    print('jumpDPR = %s (#%d)' % ((abs(jumpDPR) / 9.7), len(jumpDPR)))
-    print('jumpDPR = %s (#%d)' % (np.rint((abs(jumpDPR) / 9.7)), len(jumpDPR)))
-
-    jumpDPRNear97 = abs((abs(jumpDPR) / 9.7) - np.rint((abs(jumpDPR) / 9.7)))
-    jumpDPRNear97Indices = np.where(jumpDPRNear97 < jumpMargin)[0]
-    print('jumpDPRNear97 = %s (#%d)' % (jumpDPRNear97Indices, len(jumpDPRNear97Indices)))
-
-    jumpDPRNear1465 = abs((abs(jumpDPR) / 14.65) - np.rint((abs(jumpDPR) / 14.65)))
-    jumpDPRNear1465Indices = np.where(jumpDPRNear1465 < jumpMargin)[0]
-    print('jumpDPRNear1465 = %s (#%d)' % (jumpDPRNear1465Indices, len(jumpDPRNear1465Indices)))
-
-    print('-' * 50)
-
-    return iTOW, dPR, sidePeakTOWs, sidePeakDPR, jumpDPR, jumpDPRNear97Indices, jumpDPRNear1465Indices
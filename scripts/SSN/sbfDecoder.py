@@ -0,0 +1,617 @@
+#!/usr/bin/env python
+
+"""
+In-process decoder for Septentrio Binary Format (SBF) files
+
+Reads the SBF blocks directly from the binary file (sync bytes, block ID and length, CRC)
+and creates the same numpy structured arrays as the sbf2stf.readXXX functions do after an
+sbf2stf conversion, so no external program nor intermediate ASCII files are needed.
+
+The block layouts follow the SBF Reference Guide of the Septentrio receivers. All fields
+are extracted with vectorised numpy indexing, only the scan over the block headers is done
+block by block.
+"""
+
+import sys
+import struct
+import binascii
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import ssnLogging
+from GNSS import wgs84
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# exit codes
+E_SUCCESS = 0
+E_FILE_NOT_EXIST = 1
+E_UNKNOWN_OPTION = 3
+
+# SBF header: sync bytes, CRC, ID, length followed by TOW and WNc which are present in all blocks
+SBF_SYNC = b'$@'
+SBF_HEADER_LENGTH = 8
+SBF_TIME_LENGTH = 14
+
+# do-not-use values used by SBF
+DNU_TOW = 4294967295
+DNU_WNC = 65535
+DNU_FLOAT = -2e10
+
+# speed of light
+SPEED_OF_LIGHT = wgs84.WGS84.c
+
+
+def _signalFrequencies():
+    """
+    creates a lookup table with the carrier frequency for each signal type (NaN if unknown)
+    """
+    freqs = np.empty(64)
+    freqs.fill(np.nan)
+    for signalType, signal in mSSN.GNSSSignals.items():
+        if 'freq' in signal and float(signal['freq']) > 0:
+            freqs[signalType] = float(signal['freq'])
+    return freqs
+
+
+signalFrequency = _signalFrequencies()
+
+
+def carrierFrequency(signalType, freqNr):
+    """
+    carrierFrequency returns the carrier frequency for signal types, taking the GLONASS FDMA channels into account
+
+    Parameters:
+        signalType: array with the signal types
+        freqNr: array with the frequency numbers (GLONASS frequency number + 8)
+
+    Returns:
+        freq: carrier frequencies in Hz (NaN when unknown)
+    """
+    freq = signalFrequency[signalType]
+
+    # GLONASS L1 and L2 frequencies depend on the frequency number k
+    k = freqNr.astype(np.float64) - 8
+    gloL1 = (signalType == 8) | (signalType == 9)
+    gloL2 = (signalType == 10) | (signalType == 11)
+    freq[gloL1] = 1602.0e6 + k[gloL1] * 0.5625e6
+    freq[gloL2] = 1246.0e6 + k[gloL2] * 0.4375e6
+
+    return freq
+
+
+def readField(sbfBuffer, offsets, fmt):
+    """
+    readField extracts a little endian field located at offsets from the SBF buffer
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        offsets: array with the byte offsets of the field
+        fmt: numpy format of the field (eg 'u2', 'f8')
+
+    Returns:
+        array with the values of the field
+    """
+    dt = np.dtype('<' + fmt)
+    indices = np.asarray(offsets, dtype=np.int64)[:, np.newaxis] + np.arange(dt.itemsize)
+
+    return np.ascontiguousarray(sbfBuffer[indices]).view(dt).reshape(-1)
+
+
+def scanBlocks(sbfData, start=0, verbose=False):
+    """
+    scanBlocks searches the SBF data for the valid blocks (sync found, length correct and CRC OK)
+
+    Parameters:
+        sbfData: the SBF data (bytes, mmap or any object supporting find and slicing)
+        start: byte offset from which to start the scan
+
+    Returns:
+        blocks: array (dtype colFmtSBFBlock) with offset, number, revision, length, TOW and WNc of each block
+        end: byte offset just after the last complete block
+    """
+    offsets = []
+    IDs = []
+    lengths = []
+    TOWs = []
+    WNcs = []
+    nrCRCErrors = 0
+
+    dataLength = len(sbfData)
+    end = start
+    pos = sbfData.find(SBF_SYNC, start)
+    while 0 <= pos <= dataLength - SBF_TIME_LENGTH:
+        crc, ID, length = struct.unpack_from('<HHH', sbfData, pos + 2)
+
+        if length < SBF_TIME_LENGTH or length % 4 != 0:
+            # not a real block, resync on next occurence of sync bytes
+            pos = sbfData.find(SBF_SYNC, pos + 1)
+            continue
+
+        if pos + length > dataLength:
+            # incomplete block at end of data
+            break
+
+        if binascii.crc_hqx(sbfData[pos + 4:pos + length], 0) != crc:
+            nrCRCErrors += 1
+            pos = sbfData.find(SBF_SYNC, pos + 1)
+            continue
+
+        TOW, WNc = struct.unpack_from('<IH', sbfData, pos + SBF_HEADER_LENGTH)
+        offsets.append(pos)
+        IDs.append(ID)
+        lengths.append(length)
+        TOWs.append(TOW)
+        WNcs.append(WNc)
+
+        end = pos + length
+        pos = sbfData.find(SBF_SYNC, end)
+
+    blocks = np.zeros(len(offsets), dtype=createDType(mSSN.colFmtSBFBlock, mSSN.colNamesSBFBlock))
+    blocks['BLOCK_OFFSET'] = offsets
+    IDs = np.array(IDs, dtype=np.uint16)
+    blocks['BLOCK_NUMBER'] = IDs & 0x1FFF
+    blocks['BLOCK_REVISION'] = IDs >> 13
+    blocks['BLOCK_LENGTH'] = lengths
+    blocks['BLOCK_TOW'] = TOWs
+    blocks['BLOCK_WNC'] = WNcs
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Found %d SBF blocks (%d CRC errors)', len(blocks), nrCRCErrors)
+
+    return blocks, end
+
+
+def createDType(colFmt, colNames):
+    """
+    createDType creates the numpy dtype from the format and names defined in ssnConstants
+    """
+    return np.dtype({'names': list(colNames), 'formats': colFmt.split(',')})
+
+
+def blockTime(blocks, parents):
+    """
+    blockTime returns WNc and TOW (in seconds) of the block each sub-block belongs to
+    """
+    return blocks['BLOCK_WNC'][parents], blocks['BLOCK_TOW'][parents] / 1000.
+
+
+def walkSubBlocks(sbfBuffer, blocks, firstOffset, nrSubBlocks, sb1Length, sb2Length=None, n2Offset=None):
+    """
+    walkSubBlocks determines the offsets of all (nested) sub-blocks of a set of blocks
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the blocks for which the sub-blocks are searched
+        firstOffset: offset of the first sub-block relative to the start of the block
+        nrSubBlocks, sb1Length: number and length of the sub-blocks for each block
+        sb2Length: length of the nested sub-blocks for each block (None if no nesting)
+        n2Offset: offset within a sub-block of the field containing the number of nested sub-blocks
+
+    Returns:
+        sb1Offsets, sb1Parents: offsets of the sub-blocks and index of block they belong to
+        sb2Offsets, sb2Parents: offsets of the nested sub-blocks and index of sub-block they belong to
+    """
+    nrSubBlocks = nrSubBlocks.astype(np.int64)
+    sb1Length = sb1Length.astype(np.int64)
+
+    if sb2Length is None:
+        # sub-blocks are just adjacent
+        sb1Parents = np.repeat(np.arange(len(blocks)), nrSubBlocks)
+        sb1Index = np.arange(len(sb1Parents)) - np.repeat(np.cumsum(nrSubBlocks) - nrSubBlocks, nrSubBlocks)
+        sb1Offsets = blocks['BLOCK_OFFSET'].astype(np.int64)[sb1Parents] + firstOffset + sb1Index * sb1Length[sb1Parents]
+        return sb1Offsets, sb1Parents, None, None
+
+    # with nested sub-blocks the offset of the i-th sub-block depends on the previous ones,
+    # so walk over the i-th sub-block of all blocks at the same time
+    sb2Length = sb2Length.astype(np.int64)
+    current = blocks['BLOCK_OFFSET'].astype(np.int64) + firstOffset
+    sb1Offsets = []
+    sb1Parents = []
+    nr2SubBlocks = []
+    active = np.nonzero(nrSubBlocks > 0)[0]
+    i = 0
+    while active.size > 0:
+        offsets = current[active]
+        n2 = readField(sbfBuffer, offsets + n2Offset, 'u1').astype(np.int64)
+        sb1Offsets.append(offsets)
+        sb1Parents.append(active)
+        nr2SubBlocks.append(n2)
+
+        current[active] = offsets + sb1Length[active] + n2 * sb2Length[active]
+        i += 1
+        active = active[nrSubBlocks[active] > i]
+
+    if len(sb1Offsets) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    # sort the sub-blocks in the order they appear in the file
+    sb1Offsets = np.concatenate(sb1Offsets)
+    sb1Parents = np.concatenate(sb1Parents)
+    nr2SubBlocks = np.concatenate(nr2SubBlocks)
+    order = np.argsort(sb1Offsets, kind='mergesort')
+    sb1Offsets = sb1Offsets[order]
+    sb1Parents = sb1Parents[order]
+    nr2SubBlocks = nr2SubBlocks[order]
+
+    # nested sub-blocks follow directly the sub-block they belong to
+    sb2Parents = np.repeat(np.arange(len(sb1Offsets)), nr2SubBlocks)
+    sb2Index = np.arange(len(sb2Parents)) - np.repeat(np.cumsum(nr2SubBlocks) - nr2SubBlocks, nr2SubBlocks)
+    blockParents = sb1Parents[sb2Parents]
+    sb2Offsets = sb1Offsets[sb2Parents] + sb1Length[blockParents] + sb2Index * sb2Length[blockParents]
+
+    return sb1Offsets, sb1Parents, sb2Offsets, sb2Parents
+
+
+def decodeMeasEpoch(sbfBuffer, blocks):
+    """
+    decodeMeasEpoch decodes the MeasEpoch blocks (4027) into the MeasEpoch_2 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the MeasEpoch blocks found by scanBlocks
+
+    Returns:
+        measData: array with one line per observed signal, sorted on TOW, CHANNEL and SIGNALTYPE
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+    N1 = readField(sbfBuffer, offsets + 14, 'u1')
+    SB1Length = readField(sbfBuffer, offsets + 15, 'u1')
+    SB2Length = readField(sbfBuffer, offsets + 16, 'u1')
+
+    t1, t1Parents, t2, t2Parents = walkSubBlocks(sbfBuffer, blocks, 20, N1, SB1Length, SB2Length, 19)
+
+    # Type1 sub-blocks: the reference signal for each satellite
+    t1Type = readField(sbfBuffer, t1 + 1, 'u1')
+    t1ObsInfo = readField(sbfBuffer, t1 + 18, 'u1')
+    t1Signal = signalNumber(t1Type, t1ObsInfo)
+    t1SVID = readField(sbfBuffer, t1 + 2, 'u1')
+    t1FreqNr = glonassFreqNr(t1Signal, t1ObsInfo)
+    t1Freq = carrierFrequency(t1Signal, t1FreqNr)
+
+    codeMSB = readField(sbfBuffer, t1 + 3, 'u1') & 0x0F
+    codeLSB = readField(sbfBuffer, t1 + 4, 'u4')
+    t1Code = (codeMSB.astype(np.float64) * 4294967296. + codeLSB) * 0.001
+    t1Code[(codeMSB == 0) & (codeLSB == 0)] = np.nan
+
+    doppler = readField(sbfBuffer, t1 + 8, 'i4')
+    t1Doppler = doppler * 0.0001
+    t1Doppler[doppler == -2147483648] = np.nan
+
+    t1Carrier = carrierPhase(t1Code, t1Freq, readField(sbfBuffer, t1 + 14, 'i1'), readField(sbfBuffer, t1 + 12, 'u2'))
+
+    # Type2 sub-blocks: the other signals of the same satellite, expressed relative to its Type1
+    t2Type = readField(sbfBuffer, t2, 'u1')
+    t2ObsInfo = readField(sbfBuffer, t2 + 5, 'u1')
+    t2Signal = signalNumber(t2Type, t2ObsInfo)
+    t2FreqNr = t1FreqNr[t2Parents]
+    t2Freq = carrierFrequency(t2Signal, t2FreqNr)
+
+    offsetsMSB = readField(sbfBuffer, t2 + 3, 'u1').astype(np.int64)
+    codeOffsetMSB = signExtend(offsetsMSB & 0x07, 3)
+    codeOffsetLSB = readField(sbfBuffer, t2 + 6, 'u2')
+    t2Code = t1Code[t2Parents] + (codeOffsetMSB * 65536 + codeOffsetLSB) * 0.001
+    t2Code[(codeOffsetMSB == -4) & (codeOffsetLSB == 0)] = np.nan
+
+    dopplerOffsetMSB = signExtend(offsetsMSB >> 3, 5)
+    dopplerOffsetLSB = readField(sbfBuffer, t2 + 10, 'u2')
+    t2Doppler = t1Doppler[t2Parents] * t2Freq / t1Freq[t2Parents] + (dopplerOffsetMSB * 65536 + dopplerOffsetLSB) * 0.0001
+    t2Doppler[(dopplerOffsetMSB == -16) & (dopplerOffsetLSB == 0)] = np.nan
+
+    t2Carrier = carrierPhase(t2Code, t2Freq, readField(sbfBuffer, t2 + 4, 'i1'), readField(sbfBuffer, t2 + 8, 'u2'))
+
+    # combine both types of sub-blocks
+    measData = np.zeros(len(t1) + len(t2), dtype=createDType(mSSN.colFmtMeasEpoch, mSSN.colNamesMeasEpoch))
+    parents = np.concatenate((t1Parents, t1Parents[t2Parents]))
+    measData['MEAS_WNC'], measData['MEAS_TOW'] = blockTime(blocks, parents)
+    t1Channel = readField(sbfBuffer, t1, 'u1')
+    measData['MEAS_CHANNEL'] = np.concatenate((t1Channel, t1Channel[t2Parents]))
+    measData['MEAS_SVID'] = np.concatenate((t1SVID, t1SVID[t2Parents]))
+    measData['MEAS_FREQNR'] = np.concatenate((t1FreqNr, t2FreqNr))
+    measData['MEAS_ANTENNA'] = np.concatenate((t1Type >> 5, t2Type >> 5))
+    measData['MEAS_SIGNALTYPE'] = np.concatenate((t1Signal, t2Signal))
+    measData['MEAS_CODE'] = np.concatenate((t1Code, t2Code))
+    measData['MEAS_CARRIER'] = np.concatenate((t1Carrier, t2Carrier))
+    measData['MEAS_DOPPLER'] = np.concatenate((t1Doppler, t2Doppler))
+    measData['MEAS_CN0'] = carrierToNoise(np.concatenate((readField(sbfBuffer, t1 + 15, 'u1'), readField(sbfBuffer, t2 + 2, 'u1'))), measData['MEAS_SIGNALTYPE'])
+    measData['MEAS_LOCKTIME'] = np.concatenate((readField(sbfBuffer, t1 + 16, 'u2'), readField(sbfBuffer, t2 + 1, 'u1')))
+    obsInfo = np.concatenate((t1ObsInfo, t2ObsInfo))
+    measData['MEAS_HALFCYCLEAMBIGUITY'] = (obsInfo >> 2) & 0x01
+    measData['MEAS_SMOOTHING'] = obsInfo & 0x01
+
+    # sort the measData array according to TOW, CHANNEL, SIGNALTYPE
+    sortIndexMeas = np.lexsort((measData['MEAS_SIGNALTYPE'], measData['MEAS_CHANNEL'], measData['MEAS_TOW']))
+
+    return measData[sortIndexMeas]
+
+
+def signalNumber(typeField, obsInfo):
+    """
+    signalNumber extracts the signal type from the Type field, using the extension in ObsInfo/Info when needed
+    """
+    signal = typeField & 0x1F
+    extended = (signal == 31)
+    signal[extended] = 32 + (obsInfo[extended] >> 3)
+
+    return signal
+
+
+def glonassFreqNr(signalType, obsInfo):
+    """
+    glonassFreqNr returns the GLONASS frequency number (+8) for GLONASS signals, 0 otherwise
+    """
+    freqNr = obsInfo >> 3
+    freqNr[(signalType < 8) | (signalType > 11)] = 0
+
+    return freqNr
+
+
+def signExtend(value, nrBits):
+    """
+    signExtend interpretes the nrBits lowest bits of value as a two's complement number
+    """
+    return np.where(value >= (1 << (nrBits - 1)), value - (1 << nrBits), value)
+
+
+def carrierPhase(code, freq, carrierMSB, carrierLSB):
+    """
+    carrierPhase calculates the full carrier phase (cycles) from the pseudo-range and the carrier offset
+    """
+    carrier = code * freq / SPEED_OF_LIGHT + (carrierMSB.astype(np.float64) * 65536 + carrierLSB) * 0.001
+    carrier[(carrierMSB == -128) & (carrierLSB == 0)] = np.nan
+
+    return carrier
+
+
+def carrierToNoise(CN0, signalType):
+    """
+    carrierToNoise converts the raw CN0 field into dB-Hz (no offset for the GPS P(Y) signals)
+    """
+    value = CN0 * 0.25 + 10
+    PY = (signalType == 1) | (signalType == 2)
+    value[PY] -= 10
+    value[CN0 == 255] = np.nan
+
+    return value
+
+
+def decodeMeasExtra(sbfBuffer, blocks):
+    """
+    decodeMeasExtra decodes the MeasExtra blocks (4000) into the MeasExtra_1 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the MeasExtra blocks found by scanBlocks
+
+    Returns:
+        dataExtra: array with one line per observed signal, sorted on TOW, CHANNEL and SIGNALTYPE
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+    N = readField(sbfBuffer, offsets + 14, 'u1')
+    SBLength = readField(sbfBuffer, offsets + 15, 'u1')
+    dopplerVarFactor = readField(sbfBuffer, offsets + 16, 'f4')
+
+    sb, parents, _, _ = walkSubBlocks(sbfBuffer, blocks, 20, N, SBLength)
+
+    dataExtra = np.zeros(len(sb), dtype=createDType(mSSN.colFmtMeasExtra, mSSN.colNamesMeasExtra))
+    dataExtra['EXTRA_WNC'], dataExtra['EXTRA_TOW'] = blockTime(blocks, parents)
+    dataExtra['EXTRA_CHANNEL'] = readField(sbfBuffer, sb, 'u1')
+    extraType = readField(sbfBuffer, sb + 1, 'u1')
+    dataExtra['EXTRA_ANTENNA'] = extraType >> 5
+    dataExtra['EXTRA_SIGNALTYPE'] = signalNumber(extraType, readField(sbfBuffer, sb + 14, 'u1'))
+    dataExtra['EXTRA_LOCKTIME'] = readField(sbfBuffer, sb + 10, 'u2')
+
+    codeVar = readField(sbfBuffer, sb + 6, 'u2')
+    dataExtra['EXTRA_CODEVARIANCE'] = np.where(codeVar == 65535, np.nan, codeVar * 0.0001)
+    carrierVar = readField(sbfBuffer, sb + 8, 'u2')
+    dataExtra['EXTRA_CARRIERVARIANCE'] = np.where(carrierVar == 65535, np.nan, carrierVar)
+    dataExtra['EXTRA_DOPPLERVARIANCE'] = dataExtra['EXTRA_CODEVARIANCE'] * dopplerVarFactor[parents]
+
+    dataExtra['EXTRA_MPCORR'] = readField(sbfBuffer, sb + 2, 'i2')
+    dataExtra['EXTRA_SMOOTHINGCORR'] = readField(sbfBuffer, sb + 4, 'i2')
+    dataExtra['EXTRA_CUMMLOSSCONT'] = readField(sbfBuffer, sb + 12, 'u1')
+
+    # sort the dataExtra array according to TOW, CHANNEL, SIGNALTYPE
+    sortIndexExtra = np.lexsort((dataExtra['EXTRA_SIGNALTYPE'], dataExtra['EXTRA_CHANNEL'], dataExtra['EXTRA_TOW']))
+
+    return dataExtra[sortIndexExtra]
+
+
+def decodeSatVisibility(sbfBuffer, blocks):
+    """
+    decodeSatVisibility decodes the SatVisibility blocks (4012) into the SatVisibility_1 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the SatVisibility blocks found by scanBlocks
+
+    Returns:
+        dataVisibility: array with one line per satellite and epoch (azimuth and elevation in degrees)
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+    N = readField(sbfBuffer, offsets + 14, 'u1')
+    SBLength = readField(sbfBuffer, offsets + 15, 'u1')
+
+    sb, parents, _, _ = walkSubBlocks(sbfBuffer, blocks, 16, N, SBLength)
+
+    dataVisibility = np.zeros(len(sb), dtype=createDType(mSSN.colFmtSatVisibility, mSSN.colNamesSatVisibility))
+    dataVisibility['VISIBILITY_WNC'], dataVisibility['VISIBILITY_TOW'] = blockTime(blocks, parents)
+    dataVisibility['VISIBILITY_SVID'] = readField(sbfBuffer, sb, 'u1')
+    dataVisibility['VISIBILITY_FREQNR'] = readField(sbfBuffer, sb + 1, 'u1')
+    dataVisibility['VISIBILITY_SOURCE'] = readField(sbfBuffer, sb + 7, 'u1') & 0x0F
+    azimuth = readField(sbfBuffer, sb + 2, 'u2')
+    dataVisibility['VISIBILITY_AZIMUTH'] = np.where(azimuth == 65535, np.nan, azimuth * 0.01)
+    elevation = readField(sbfBuffer, sb + 4, 'i2')
+    dataVisibility['VISIBILITY_ELEVATION'] = np.where(elevation == -32768, np.nan, elevation * 0.01)
+    dataVisibility['VISIBILITY_RISESET'] = readField(sbfBuffer, sb + 6, 'u1')
+
+    return dataVisibility
+
+
+def decodeChannelStatus(sbfBuffer, blocks):
+    """
+    decodeChannelStatus decodes the ChannelStatus blocks (4013) into the ChannelStatus_1 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the ChannelStatus blocks found by scanBlocks
+
+    Returns:
+        chanStatus: array with one line per channel state (unknown elevation is set to -1)
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+    N = readField(sbfBuffer, offsets + 14, 'u1')
+    SB1Length = readField(sbfBuffer, offsets + 15, 'u1')
+    SB2Length = readField(sbfBuffer, offsets + 16, 'u1')
+
+    sat, satParents, state, stateParents = walkSubBlocks(sbfBuffer, blocks, 20, N, SB1Length, SB2Length, 9)
+    sat = sat[stateParents]
+
+    chanStatus = np.zeros(len(state), dtype=createDType(mSSN.colFmtChannelStatus, mSSN.colNamesChannelStatus))
+    chanStatus['CHST_WNC'], chanStatus['CHST_TOW'] = blockTime(blocks, satParents[stateParents])
+    chanStatus['CHST_RxChannel'] = readField(sbfBuffer, sat + 10, 'u1')
+    chanStatus['CHST_SVID'] = readField(sbfBuffer, sat, 'u1')
+    chanStatus['CHST_FreqNr'] = readField(sbfBuffer, sat + 1, 'u1')
+    chanStatus['CHST_HealthStatus'] = readField(sbfBuffer, sat + 6, 'u2')
+    azRiseSet = readField(sbfBuffer, sat + 4, 'u2')
+    chanStatus['CHST_Azimuth'] = azRiseSet & 0x01FF
+    elevation = readField(sbfBuffer, sat + 8, 'i1')
+    chanStatus['CHST_Elevation'] = np.where(elevation == -128, -1, elevation)
+    chanStatus['CHST_RiseSet'] = azRiseSet >> 14
+    chanStatus['CHST_Antenna'] = readField(sbfBuffer, state, 'u1')
+    chanStatus['CHST_TrackingStatus'] = readField(sbfBuffer, state + 2, 'u2')
+    chanStatus['CHST_PVTStatus'] = readField(sbfBuffer, state + 4, 'u2')
+    chanStatus['CHST_PVTInfo'] = readField(sbfBuffer, state + 6, 'u2')
+
+    return chanStatus
+
+
+def decodeDOP(sbfBuffer, blocks):
+    """
+    decodeDOP decodes the DOP blocks (4001) into the DOP_2 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the DOP blocks found by scanBlocks
+
+    Returns:
+        DOPData: array with one line per epoch
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+
+    DOPData = np.zeros(len(blocks), dtype=createDType(mSSN.colFmtDOP, mSSN.colNamesDOP))
+    DOPData['DOP_WNC'], DOPData['DOP_TOW'] = blockTime(blocks, np.arange(len(blocks)))
+    DOPData['DOP_NrSV'] = readField(sbfBuffer, offsets + 14, 'u1')
+    for column, offset in (('DOP_PDOP', 16), ('DOP_TDOP', 18), ('DOP_HDOP', 20), ('DOP_VDOP', 22)):
+        xDOP = readField(sbfBuffer, offsets + offset, 'u2')
+        DOPData[column] = np.where(xDOP == 0, np.nan, xDOP * 0.01)
+    for column, offset in (('DOP_HPL', 24), ('DOP_VPL', 28)):
+        DOPData[column] = floatField(sbfBuffer, offsets + offset, 'f4')
+
+    return DOPData
+
+
+def floatField(sbfBuffer, offsets, fmt):
+    """
+    floatField reads a float field and replaces the do-not-use value by NaN
+    """
+    value = readField(sbfBuffer, offsets, fmt).astype(np.float64)
+    value[value == DNU_FLOAT] = np.nan
+
+    return value
+
+
+def decodePVTGeodetic(sbfBuffer, blocks):
+    """
+    decodePVTGeodetic decodes the PVTGeodetic blocks (4007) into the PVTGeodetic_2 format
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the PVTGeodetic blocks found by scanBlocks
+
+    Returns:
+        GEODPosData: array with one line per epoch (NaN when no position available)
+    """
+    offsets = blocks['BLOCK_OFFSET'].astype(np.int64)
+
+    GEODPosData = np.zeros(len(blocks), dtype=createDType(mSSN.colFmtPosGeod, mSSN.colNamesPosGeod))
+    GEODPosData['GEOD_WNC'], GEODPosData['GEOD_TOW'] = blockTime(blocks, np.arange(len(blocks)))
+    mode = readField(sbfBuffer, offsets + 14, 'u1')
+    GEODPosData['GEOD_MODE'] = mode & 0x0F
+    GEODPosData['GEOD_2D/3D'] = mode >> 7
+    GEODPosData['GEOD_AutoBase'] = (mode >> 6) & 0x01
+    GEODPosData['GEOD_Error'] = readField(sbfBuffer, offsets + 15, 'u1')
+    for column, offset, fmt in (('GEOD_Latitude', 16, 'f8'), ('GEOD_Longitude', 24, 'f8'), ('GEOD_Height', 32, 'f8'),
+                                ('GEOD_Undulation', 40, 'f4'), ('GEOD_Vn', 44, 'f4'), ('GEOD_Ve', 48, 'f4'),
+                                ('GEOD_Vu', 52, 'f4'), ('GEOD_COG', 56, 'f4'), ('GEOD_ClockBias', 60, 'f8'),
+                                ('GEOD_ClockDrift', 68, 'f4')):
+        GEODPosData[column] = floatField(sbfBuffer, offsets + offset, fmt)
+    GEODPosData['GEOD_TimeSystem'] = readField(sbfBuffer, offsets + 72, 'u1')
+    GEODPosData['GEOD_Datum'] = readField(sbfBuffer, offsets + 73, 'u1')
+    GEODPosData['GEOD_NrSV'] = readField(sbfBuffer, offsets + 74, 'u1')
+    GEODPosData['GEOD_WACorrInfo'] = readField(sbfBuffer, offsets + 75, 'u1')
+    GEODPosData['GEOD_ReferenceID'] = readField(sbfBuffer, offsets + 76, 'u2')
+    GEODPosData['GEOD_MeanCorrAge'] = readField(sbfBuffer, offsets + 78, 'u2')
+    GEODPosData['GEOD_SignalInfo'] = readField(sbfBuffer, offsets + 80, 'u4')
+    GEODPosData['GEOD_AlertFlag'] = readField(sbfBuffer, offsets + 84, 'u1')
+    hasNrBases = blocks['BLOCK_REVISION'] >= 1
+    GEODPosData['GEOD_NrBases'][hasNrBases] = readField(sbfBuffer, offsets[hasNrBases] + 85, 'u1')
+
+    return GEODPosData
+
+
+# SBF blocks that can be decoded, named after the corresponding sbf2stf conversion option
+sbfBlocks = {'MeasEpoch_2': {'number': 4027, 'decode': decodeMeasEpoch},
+             'MeasExtra_1': {'number': 4000, 'decode': decodeMeasExtra},
+             'SatVisibility_1': {'number': 4012, 'decode': decodeSatVisibility},
+             'ChannelStatus_1': {'number': 4013, 'decode': decodeChannelStatus},
+             'DOP_2': {'number': 4001, 'decode': decodeDOP},
+             'PVTGeodetic_2': {'number': 4007, 'decode': decodePVTGeodetic},
+             }
+
+
+def decodeBlocks(sbfBuffer, blocks, optSBF2STF, verbose=False):
+    """
+    decodeBlocks decodes the blocks of the types requested from scanned SBF data
+
+    Parameters:
+        sbfBuffer: numpy uint8 array containing the SBF data
+        blocks: the blocks found by scanBlocks
+        optSBF2STF: list of block types to decode (using the sbf2stf names, eg 'MeasEpoch_2')
+
+    Returns:
+        list of structured arrays, in the order of optSBF2STF
+    """
+    decoded = []
+    for option in optSBF2STF:
+        if option not in sbfBlocks:
+            sys.stderr.write('  SBF block %s can not be decoded. Program exits.\n' % option)
+            sys.exit(E_UNKNOWN_OPTION)
+
+        blocksOption = blocks[(blocks['BLOCK_NUMBER'] == sbfBlocks[option]['number']) & (blocks['BLOCK_TOW'] != DNU_TOW)]
+        logger.log(ssnLogging.verboseLevel(verbose), '    Decoding %s (%d blocks)', option, len(blocksOption))
+        decoded.append(sbfBlocks[option]['decode'](sbfBuffer, blocksOption))
+
+    return decoded
+
+
+def readSBF(sbfFileName, optSBF2STF, verbose=False):
+    """
+    readSBF decodes a SBF file in-process, replacing the runSBF2STF conversion and readXXX functions
+
+    Parameters:
+        sbfFileName: name of SBF file to decode
+        optSBF2STF: list of block types to decode (using the sbf2stf names, eg 'MeasEpoch_2')
+
+    Returns:
+        list of structured arrays, in the order of optSBF2STF
+    """
+    logger.log(ssnLogging.verboseLevel(verbose), 'Decoding %s in-process', sbfFileName)
+
+    with open(sbfFileName, 'rb') as fSBF:
+        sbfData = fSBF.read()
+
+    blocks, _ = scanBlocks(sbfData, verbose=verbose)
+
+    return decodeBlocks(np.frombuffer(sbfData, dtype=np.uint8), blocks, optSBF2STF, verbose)
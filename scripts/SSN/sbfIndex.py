@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+
+"""
+Block index for Septentrio Binary Format (SBF) files
+
+The SBF file is memory-mapped and its block headers are scanned once. The resulting index
+(offset, block number, revision, length, TOW and WNc of each block) is kept in a sidecar
+.npy file next to the SBF file, so that later runs can select the blocks of a given type
+within a TOW window and decode only these, without reading the rest of the file.
+
+When the SBF file is still growing (eg a receiver logging all day), only the appended part is
+scanned to extend the index, and readSBFIncremental decodes only the blocks appended since the
+previous run and appends them to per block type binary files, so a refresh costs in proportion
+to the new data. All block types are decoded up to the same epoch, the last one present for each
+of them, so an epoch whose blocks are only partly written is left for the next run.
+"""
+
+import sys
+import os
+import mmap
+import json
+import struct
+import binascii
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import sbfDecoder
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# exit codes
+E_SUCCESS = 0
+E_FILE_NOT_EXIST = 1
+
+# extension of the sidecar file containing the block index
+INDEX_EXTENSION = '.idx.npy'
+
+# extension of the file keeping the state of the incremental decoding and of the decoded data files
+INCREMENTAL_EXTENSION = '.inc.json'
+DATA_EXTENSION = '.dat'
+
+# number of milliseconds in a GPS week
+MS_IN_WEEK = 604800 * 1000
+
+
+def indexFileName(sbfFileName):
+    """
+    indexFileName returns the name of the sidecar file containing the block index of a SBF file
+    """
+    return sbfFileName + INDEX_EXTENSION
+
+
+def mapSBF(fSBF):
+    """
+    mapSBF memory-maps an opened SBF file read-only (returns an empty string for an empty file)
+    """
+    if os.fstat(fSBF.fileno()).st_size == 0:
+        return b''
+
+    return mmap.mmap(fSBF.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def indexIsValid(sbfFileName, blocks):
+    """
+    indexIsValid checks that a stored index is not older than the SBF file and that all indexed blocks are inside the file
+    """
+    if os.path.getmtime(indexFileName(sbfFileName)) < os.path.getmtime(sbfFileName):
+        return False
+
+    if len(blocks) > 0 and int(blocks['BLOCK_OFFSET'][-1]) + int(blocks['BLOCK_LENGTH'][-1]) > os.path.getsize(sbfFileName):
+        return False
+
+    return True
+
+
+def indexedEnd(blocks):
+    """
+    indexedEnd returns the byte offset just after the last indexed block
+    """
+    if len(blocks) == 0:
+        return 0
+
+    return int(blocks['BLOCK_OFFSET'][-1]) + int(blocks['BLOCK_LENGTH'][-1])
+
+
+def blockIsIntact(sbfData, offset, length):
+    """
+    blockIsIntact checks that the SBF data still contains a valid block at the given offset (sync and CRC)
+    """
+    if offset + length > len(sbfData) or sbfData[offset:offset + 2] != sbfDecoder.SBF_SYNC:
+        return False
+
+    crc, = struct.unpack_from('<H', sbfData, offset + 2)
+
+    return binascii.crc_hqx(sbfData[offset + 4:offset + length], 0) == crc
+
+
+def blockSignature(sbfData, offset, length):
+    """
+    blockSignature returns offset, length and CRC of the block at offset, used to recognise a block in a later run
+    """
+    if offset + length > len(sbfData):
+        return [offset, length, None]
+
+    return [offset, length, struct.unpack_from('<H', sbfData, offset + 2)[0]]
+
+
+def buildIndex(sbfFileName, overwrite=False, verbose=False):
+    """
+    buildIndex creates (or loads when present and up to date) the block index of a SBF file
+
+    When the SBF file has grown since the index was made and its last indexed block is unchanged,
+    only the appended data is scanned and added to the index.
+
+    Parameters:
+        sbfFileName: name of SBF file
+        overwrite: rescan the SBF file even if a valid index file exists
+
+    Returns:
+        blocks: array (dtype colFmtSBFBlock) with offset, number, revision, length, TOW and WNc of each block
+    """
+    if not os.path.isfile(sbfFileName):
+        sys.stderr.write('  SBF file %s does not exist. Program exits.\n' % sbfFileName)
+        sys.exit(E_FILE_NOT_EXIST)
+
+    idxFileName = indexFileName(sbfFileName)
+    blocks = None
+    if not overwrite and os.path.isfile(idxFileName):
+        blocks = np.load(idxFileName)
+        if blocks.dtype != sbfDecoder.createDType(mSSN.colFmtSBFBlock, mSSN.colNamesSBFBlock):
+            blocks = None
+        elif indexIsValid(sbfFileName, blocks):
+            logger.log(ssnLogging.verboseLevel(verbose), '    Using block index %s (%d blocks)', idxFileName, len(blocks))
+            return blocks
+
+    with open(sbfFileName, 'rb') as fSBF:
+        sbfData = mapSBF(fSBF)
+
+        start = 0
+        if blocks is not None and len(blocks) > 0 and blockIsIntact(sbfData, int(blocks['BLOCK_OFFSET'][-1]), int(blocks['BLOCK_LENGTH'][-1])):
+            # the file has grown, only scan the appended data
+            start = indexedEnd(blocks)
+            logger.log(ssnLogging.verboseLevel(verbose), '    Extending block index %s from byte %d', idxFileName, start)
+        else:
+            blocks = None
+            logger.log(ssnLogging.verboseLevel(verbose), '    Creating block index %s', idxFileName)
+
+        newBlocks, _ = sbfDecoder.scanBlocks(sbfData, start, verbose=verbose)
+        if isinstance(sbfData, mmap.mmap):
+            sbfData.close()
+
+    blocks = newBlocks if blocks is None else np.concatenate((blocks, newBlocks))
+    np.save(idxFileName, blocks)
+
+    return blocks
+
+
+def selectBlocks(blocks, blockNumber, startTOW=None, endTOW=None, WNc=None):
+    """
+    selectBlocks returns the blocks of a given type that lie in a TOW window
+
+    Parameters:
+        blocks: the block index
+        blockNumber: SBF block number (eg 4027 for MeasEpoch)
+        startTOW, endTOW: TOW window in seconds (None for no limit)
+        WNc: week number of the window (None for any week)
+
+    Returns:
+        the selected part of the block index
+    """
+    mask = (blocks['BLOCK_NUMBER'] == blockNumber) & (blocks['BLOCK_TOW'] != sbfDecoder.DNU_TOW)
+    if startTOW is not None:
+        mask &= blocks['BLOCK_TOW'] >= int(round(startTOW * 1000))
+    if endTOW is not None:
+        mask &= blocks['BLOCK_TOW'] <= int(round(endTOW * 1000))
+    if WNc is not None:
+        mask &= blocks['BLOCK_WNC'] == WNc
+
+    return blocks[mask]
+
+
+def readSBFWindow(sbfFileName, optSBF2STF, towWindow=None, overwrite=False, verbose=False):
+    """
+    readSBFWindow decodes the blocks of the requested types within a TOW window using the block index
+
+    Only the pages of the memory-mapped SBF file containing the selected blocks are read.
+
+    Parameters:
+        sbfFileName: name of SBF file
+        optSBF2STF: list of block types to decode (using the sbf2stf names, eg 'MeasEpoch_2')
+        towWindow: (startTOW, endTOW) in seconds, None to decode all blocks
+        overwrite: rebuild the block index
+
+    Returns:
+        list of structured arrays, in the order of optSBF2STF
+    """
+    startTOW, endTOW = (None, None) if towWindow is None else towWindow
+    logger.log(ssnLogging.verboseLevel(verbose), 'Decoding %s in-process (TOW window %s - %s)', sbfFileName, startTOW, endTOW)
+
+    blocks = buildIndex(sbfFileName, overwrite, verbose)
+
+    decoded = []
+    with open(sbfFileName, 'rb') as fSBF:
+        sbfData = mapSBF(fSBF)
+        sbfBuffer = np.frombuffer(sbfData, dtype=np.uint8)
+        for option in optSBF2STF:
+            if option not in sbfDecoder.sbfBlocks:
+                sys.stderr.write('  SBF block %s can not be decoded. Program exits.\n' % option)
+                sys.exit(sbfDecoder.E_UNKNOWN_OPTION)
+
+            blocksOption = selectBlocks(blocks, sbfDecoder.sbfBlocks[option]['number'], startTOW, endTOW)
+            decoded += sbfDecoder.decodeBlocks(sbfBuffer, blocksOption, [option], verbose)
+
+        # the numpy view on the map must be released before the map can be closed
+        del sbfBuffer
+        if isinstance(sbfData, mmap.mmap):
+            sbfData.close()
+
+    return decoded
+
+
+def blockEpochs(blocks):
+    """
+    blockEpochs returns the time of the blocks as milliseconds since the start of GPS week 0
+    """
+    return blocks['BLOCK_WNC'].astype(np.int64) * MS_IN_WEEK + blocks['BLOCK_TOW'].astype(np.int64)
+
+
+def sharedEpoch(blocks, optSBF2STF):
+    """
+    sharedEpoch returns the last epoch (ms since the start of GPS week 0) present for every requested block type,
+    None when a block type has no blocks yet
+    """
+    lastEpochs = []
+    for option in optSBF2STF:
+        blocksOption = selectBlocks(blocks, sbfDecoder.sbfBlocks[option]['number'])
+        if len(blocksOption) == 0:
+            return None
+        lastEpochs.append(int(blockEpochs(blocksOption).max()))
+
+    return min(lastEpochs)
+
+
+def selectTOW(data, towWindow):
+    """
+    selectTOW returns the rows of a decoded array within a TOW window (its first column ending on _TOW)
+    """
+    if towWindow is None:
+        return data
+
+    TOWs = data[[name for name in data.dtype.names if name.endswith('_TOW')][0]]
+
+    return data[(TOWs >= towWindow[0]) & (TOWs <= towWindow[1])]
+
+
+def readIncrementalState(sbfFileName):
+    """
+    readIncrementalState reads for each block type the number of decoded rows and the byte offset up to which the SBF file was decoded
+    """
+    stateFileName = sbfFileName + INCREMENTAL_EXTENSION
+    if not os.path.isfile(stateFileName):
+        return {}
+
+    with open(stateFileName, 'r') as fState:
+        return json.load(fState)
+
+
+def writeIncrementalState(sbfFileName, state):
+    """
+    writeIncrementalState saves the state of the incremental decoding, replacing the previous one at once
+    """
+    stateFileName = sbfFileName + INCREMENTAL_EXTENSION
+    with open(stateFileName + '.tmp', 'w') as fState:
+        json.dump(state, fState, indent=2, sort_keys=True)
+
+    if os.path.isfile(stateFileName):
+        os.remove(stateFileName)
+    os.rename(stateFileName + '.tmp', stateFileName)
+
+
+def readSBFIncremental(sbfFileName, optSBF2STF, towWindow=None, overwrite=False, verbose=False):
+    """
+    readSBFIncremental decodes the blocks appended to a SBF file since the previous call and returns all decoded data
+
+    All block types are decoded up to the last epoch present for every one of them (see sharedEpoch): when the
+    SBF file is still being written, the blocks of its last epoch may be complete for one block type and not
+    yet for another, decoding them would give arrays that do not match row for row.
+
+    The decoded rows of each block type are appended to the binary file <sbf>_<option>.dat, the number
+    of rows and the epoch (WNc, TOW) up to which the blocks are decoded, from which the next call resumes,
+    are kept in <sbf>.inc.json. The returned arrays are copy-on-write memory maps of the binary files.
+
+    Parameters:
+        sbfFileName: name of SBF file
+        optSBF2STF: list of block types to decode (using the sbf2stf names, eg 'MeasEpoch_2')
+        towWindow: (startTOW, endTOW) in seconds, None to return all rows
+        overwrite: rebuild the block index and decode the whole file again
+
+    Returns:
+        list of structured arrays, in the order of optSBF2STF
+    """
+    logger.log(ssnLogging.verboseLevel(verbose), 'Decoding %s incrementally', sbfFileName)
+
+    for option in optSBF2STF:
+        if option not in sbfDecoder.sbfBlocks:
+            sys.stderr.write('  SBF block %s can not be decoded. Program exits.\n' % option)
+            sys.exit(sbfDecoder.E_UNKNOWN_OPTION)
+
+    blocks = buildIndex(sbfFileName, overwrite, verbose)
+    state = {} if overwrite else readIncrementalState(sbfFileName)
+
+    # epoch up to which all block types are decoded in this call
+    endEpoch = sharedEpoch(blocks, optSBF2STF)
+    if endEpoch is not None:
+        logger.log(ssnLogging.verboseLevel(verbose), '    Decoding up to WNc %d TOW %.3f', endEpoch // MS_IN_WEEK, (endEpoch % MS_IN_WEEK) / 1000.)
+
+    decoded = []
+    with open(sbfFileName, 'rb') as fSBF:
+        sbfData = mapSBF(fSBF)
+        sbfBuffer = np.frombuffer(sbfData, dtype=np.uint8)
+        for option in optSBF2STF:
+            # decoding no blocks gives the layout of the rows
+            dtype = sbfDecoder.sbfBlocks[option]['decode'](sbfBuffer, blocks[:0]).dtype
+            dataFileName = sbfFileName + '_' + option + DATA_EXTENSION
+
+            # start again when the SBF file was replaced (last decoded block changed) or the data file does not fit
+            entry = state.get(option, {})
+            nrRows = entry.get('rows', 0)
+            if not os.path.isfile(dataFileName) or entry.get('itemsize') != dtype.itemsize or os.path.getsize(dataFileName) < nrRows * dtype.itemsize \
+                    or 'TOW' not in entry or ('lastBlock' in entry and blockSignature(sbfData, *entry['lastBlock'][:2]) != entry['lastBlock']):
+                entry, nrRows = {}, 0
+
+            # decode the blocks after the epoch reached by the previous call up to the shared epoch
+            blocksOption = selectBlocks(blocks, sbfDecoder.sbfBlocks[option]['number'])
+            epochs = blockEpochs(blocksOption)
+            if 'TOW' in entry:
+                startEpoch = entry['WNc'] * MS_IN_WEEK + int(round(entry['TOW'] * 1000))
+                blocksOption, epochs = blocksOption[epochs > startEpoch], epochs[epochs > startEpoch]
+            blocksOption = blocksOption[epochs <= endEpoch] if endEpoch is not None else blocksOption[:0]
+            newData = sbfDecoder.decodeBlocks(sbfBuffer, blocksOption, [option])[0]
+            logger.log(ssnLogging.verboseLevel(verbose), '    %s: %d rows decoded before, %d rows appended', option, nrRows, len(newData))
+
+            # a previous call may have been interrupted after writing the data file, drop what is not counted
+            with open(dataFileName, 'r+b' if os.path.isfile(dataFileName) else 'wb') as fData:
+                fData.truncate(nrRows * dtype.itemsize)
+                fData.seek(0, os.SEEK_END)
+                newData.tofile(fData)
+            nrRows += len(newData)
+
+            state[option] = {'rows': nrRows, 'itemsize': dtype.itemsize}
+            if len(blocks) > 0:
+                state[option]['lastBlock'] = blockSignature(sbfData, int(blocks['BLOCK_OFFSET'][-1]), int(blocks['BLOCK_LENGTH'][-1]))
+            # the next call resumes after the epoch decoded up to
+            if endEpoch is not None:
+                state[option]['WNc'] = endEpoch // MS_IN_WEEK
+                state[option]['TOW'] = (endEpoch % MS_IN_WEEK) / 1000.
+            elif 'TOW' in entry:
+                state[option]['WNc'], state[option]['TOW'] = entry['WNc'], entry['TOW']
+
+            if nrRows == 0:
+                data = np.empty(0, dtype=dtype)
+            else:
+                data = np.memmap(dataFileName, dtype=dtype, mode='c', shape=(nrRows,))
+            decoded.append(selectTOW(data, towWindow))
+
+        del sbfBuffer
+        if isinstance(sbfData, mmap.mmap):
+            sbfData.close()
+
+    writeIncrementalState(sbfFileName, state)
+
+    return decoded
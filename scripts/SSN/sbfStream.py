@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+"""
+Decoding of a live Septentrio Binary Format (SBF) byte stream
+
+The SBF data is read from a TCP connection (eg the receiver's IP port) or from a file that is still
+being written by a logger. The bytes are collected in a buffer, the complete blocks are decoded by
+sbfDecoder and removed from the buffer, so only an incomplete block (at most the maximum SBF block
+length) is kept between reads, whatever the duration of the session.
+
+replayServer serves a recorded SBF file on a local TCP port at the pace of its epochs, as stand-in
+for a receiver.
+"""
+
+import sys
+import os
+import time
+import socket
+import threading
+import numpy as np
+
+from SSN import sbfDecoder
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# number of bytes to read at once from the socket or file
+READ_SIZE = 65536
+
+# maximum length of a SBF block (the length field is 16 bits)
+MAX_BLOCK_LENGTH = 65535
+
+# time in seconds between checks for new data in a growing file
+POLL_INTERVAL = 0.2
+
+
+def parseSource(source):
+    """
+    parseSource tells whether the source is a TCP address (host:port) or a file name
+
+    Returns:
+        (host, port) for a TCP address, None for a file
+    """
+    if os.path.exists(source) or ':' not in source:
+        return None
+
+    host, port = source.rsplit(':', 1)
+    if not port.isdigit():
+        return None
+
+    return host or 'localhost', int(port)
+
+
+def readSocket(host, port, verbose=False):
+    """
+    readSocket yields the data received on a TCP connection until it is closed by the other side
+    """
+    logger.log(ssnLogging.verboseLevel(verbose), '    Connecting to %s:%d', host, port)
+
+    connection = socket.create_connection((host, port))
+    try:
+        while True:
+            data = connection.recv(READ_SIZE)
+            if not data:
+                break
+            yield data
+    finally:
+        connection.close()
+
+
+def readGrowingFile(fileName, follow=True, idleTimeout=None, verbose=False):
+    """
+    readGrowingFile yields the data of a file and, when following, the data appended to it afterwards
+
+    Parameters:
+        fileName: name of the (growing) SBF file
+        follow: keep waiting for new data at the end of the file
+        idleTimeout: stop following when no data is appended during this number of seconds (None for never)
+    """
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading %s%s', fileName, ' (following)' if follow else '')
+
+    with open(fileName, 'rb') as fSBF:
+        lastData = time.time()
+        while True:
+            data = fSBF.read(READ_SIZE)
+            if data:
+                lastData = time.time()
+                yield data
+            elif not follow or (idleTimeout is not None and time.time() - lastData > idleTimeout):
+                break
+            else:
+                time.sleep(POLL_INTERVAL)
+
+
+def readSource(source, follow=True, idleTimeout=None, verbose=False):
+    """
+    readSource yields the SBF data from a TCP address (host:port) or a (growing) file
+    """
+    address = parseSource(source)
+    if address is None:
+        return readGrowingFile(source, follow, idleTimeout, verbose)
+
+    return readSocket(address[0], address[1], verbose)
+
+
+class SBFStreamDecoder(object):
+    """
+    SBFStreamDecoder decodes the complete SBF blocks of a byte stream fed in pieces of any size
+
+    Parameters:
+        optSBF2STF: list of block types to decode (using the sbf2stf names, eg 'MeasEpoch_2')
+
+    Attributes:
+        nrBytes: number of bytes fed
+        nrBlocks: number of complete blocks found
+    """
+    def __init__(self, optSBF2STF, verbose=False):
+        for option in optSBF2STF:
+            if option not in sbfDecoder.sbfBlocks:
+                sys.stderr.write('  SBF block %s can not be decoded. Program exits.\n' % option)
+                sys.exit(sbfDecoder.E_UNKNOWN_OPTION)
+
+        self.optSBF2STF = optSBF2STF
+        self.verbose = verbose
+        self.nrBytes = 0
+        self.nrBlocks = 0
+        self._buffer = b''
+
+    def feed(self, data):
+        """
+        feed adds data to the stream and decodes the blocks that are complete
+
+        Returns:
+            list of structured arrays, in the order of optSBF2STF (empty arrays when no blocks were completed)
+        """
+        self.nrBytes += len(data)
+        buffer = self._buffer + data
+
+        blocks, end = sbfDecoder.scanBlocks(buffer)
+        self.nrBlocks += len(blocks)
+        decoded = sbfDecoder.decodeBlocks(np.frombuffer(buffer, dtype=np.uint8), blocks, self.optSBF2STF)
+
+        # keep only what can still be the start of a block
+        self._buffer = buffer[max(end, len(buffer) - MAX_BLOCK_LENGTH):]
+
+        return decoded
+
+
+def replayServer(sbfFileName, port=0, speed=1., verbose=False):
+    """
+    replayServer serves a SBF file on a local TCP port, sending the blocks at the pace of their TOW
+
+    Parameters:
+        sbfFileName: the recorded SBF file
+        port: TCP port to listen on (0 to let the system choose)
+        speed: replay speed factor (0 sends everything at once)
+
+    Returns:
+        port: the TCP port on which the server waits for its single client
+        thread: the thread serving the file
+    """
+    with open(sbfFileName, 'rb') as fSBF:
+        sbfData = fSBF.read()
+    blocks, _ = sbfDecoder.scanBlocks(sbfData)
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('localhost', port))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def serve():
+        connection, address = server.accept()
+        server.close()
+        logger.log(ssnLogging.verboseLevel(verbose), '    Replaying %s (%d blocks) to %s:%d', sbfFileName, len(blocks), address[0], address[1])
+
+        previousTOW = None
+        try:
+            for block in blocks:
+                TOW = int(block['BLOCK_TOW'])
+                if speed > 0 and previousTOW is not None and TOW != sbfDecoder.DNU_TOW and TOW > previousTOW:
+                    time.sleep((TOW - previousTOW) / 1000. / speed)
+                if TOW != sbfDecoder.DNU_TOW:
+                    previousTOW = TOW
+                offset = int(block['BLOCK_OFFSET'])
+                connection.sendall(sbfData[offset:offset + int(block['BLOCK_LENGTH'])])
+        except socket.error:
+            pass
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=serve)
+    thread.daemon = True
+    thread.start()
+
+    return port, thread
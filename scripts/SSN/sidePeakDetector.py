@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+"""
+Batched side peak detection on the code measurements of all satellites at once
+
+A receiver tracking a BOC modulated signal on a side peak of the correlation function has a code
+measurement biased by a multiple of the distance between the peaks. The code measurements of a pair
+of signals of the same SV (by default E1A and E6A) are differenced at their common epochs (joined on
+TOW in the grouped MeasEpoch data for all SVs at once), and a jump of this delta PR larger than
+DPR_LIMIT between consecutive common epochs is reported as a side peak indicator. Each jump is tested
+whether it is near an integer multiple of the side peak spacing of either signal (9.7 m on E1A,
+14.65 m on E6A). The events are returned as a single structured array (see colFmtSidePeakEvent).
+"""
+
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import slipDetector
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# pairs of signal types whose code measurements are differenced (16: E1A, 18: E6A)
+SIDEPEAK_PAIRS = [(16, 18)]
+
+# distance (m) between the main and side peaks of the correlation function per signal type
+SIDEPEAK_SPACING = {16: 9.7, 18: 14.65}
+
+# jump in delta PR (m) between consecutive common epochs indicating a possible side peak
+DPR_LIMIT = 4.0
+
+# margin (fraction of the spacing) on the integer multiple of the side peak spacing
+JUMP_MARGIN = 0.05
+
+
+def deltaPseudoRanges(measGroups, signalType1, signalType2):
+    """
+    deltaPseudoRanges differences the code measurements of a pair of signal types at the common epochs of all SVs
+
+    Returns:
+        rows1, rows2: rows of measGroups.data of both signals at the common epochs, sorted on SVID and TOW
+        dPR: difference between the code measurements of signalType1 and signalType2 (m)
+    """
+    data = measGroups.data
+    rows1, rows2 = slipDetector.joinPair(measGroups, signalType1, signalType2)
+
+    return rows1, rows2, data['MEAS_CODE'][rows1] - data['MEAS_CODE'][rows2]
+
+
+def nearMultiple(jumps, spacing, margin=JUMP_MARGIN):
+    """
+    nearMultiple tells which jumps are within margin of an integer multiple of the side peak spacing (all False when spacing is None)
+    """
+    if spacing is None:
+        return np.zeros(len(jumps), dtype=bool)
+
+    ratio = np.fabs(jumps) / spacing
+    return np.fabs(ratio - np.rint(ratio)) < margin
+
+
+def detectSidePeaks(measGroups, pairs=None, spacings=None, verbose=False):
+    """
+    detectSidePeaks detects the side peak indicators on all SVs and pairs of signal types in one pass
+
+    Parameters:
+        measGroups: SVSignalGroups of the MeasEpoch data
+        pairs: pairs of signal types to difference (default SIDEPEAK_PAIRS)
+        spacings: side peak spacing (m) per signal type (default SIDEPEAK_SPACING)
+
+    Returns:
+        events: array (dtype colFmtSidePeakEvent) sorted on TOW and SVID, with the time, SVID, the signal types of the pair,
+            the delta PR at the jump, the jump w.r.t. the previous common epoch and whether the jump is near a multiple
+            of the side peak spacing of the first (SIDEPEAK_NEAR1) or second signal (SIDEPEAK_NEAR2)
+    """
+    data = measGroups.data
+    if pairs is None:
+        pairs = SIDEPEAK_PAIRS
+    if spacings is None:
+        spacings = SIDEPEAK_SPACING
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Looking for side peaks on %d observations', len(data))
+
+    eventParts = []
+    for signalType1, signalType2 in pairs:
+        rows1, rows2, dPR = deltaPseudoRanges(measGroups, signalType1, signalType2)
+        if len(rows1) == 0:
+            continue
+
+        # jumps in delta PR between consecutive common epochs of the same SV
+        newSV = np.ones(len(rows1), dtype=bool)
+        newSV[1:] = data['MEAS_SVID'][rows1[1:]] != data['MEAS_SVID'][rows1[:-1]]
+        jumps = slipDetector.arcJumps(dPR, data['MEAS_TOW'][rows1], newSV)[0]
+        with np.errstate(invalid='ignore'):
+            sidePeaks = np.flatnonzero(np.fabs(jumps) > DPR_LIMIT)
+
+        near1 = nearMultiple(jumps[sidePeaks], spacings.get(signalType1))
+        near2 = nearMultiple(jumps[sidePeaks], spacings.get(signalType2))
+        eventParts.append((rows1[sidePeaks], rows2[sidePeaks], dPR[sidePeaks], jumps[sidePeaks], near1, near2))
+
+        logger.log(ssnLogging.verboseLevel(verbose), '      %s / %s: %d common epochs, %d side peak indicators (%d near %s, %d near %s)',
+                   mSSN.GNSSSignals[signalType1]['name'], mSSN.GNSSSignals[signalType2]['name'], len(rows1), len(sidePeaks),
+                   np.count_nonzero(near1), mSSN.GNSSSignals[signalType1]['name'], np.count_nonzero(near2), mSSN.GNSSSignals[signalType2]['name'])
+
+    events = np.empty(sum(len(part[0]) for part in eventParts), dtype=np.dtype({'names': list(mSSN.colNamesSidePeakEvent), 'formats': mSSN.colFmtSidePeakEvent.split(',')}))
+    start = 0
+    for rows1, rows2, dPR, jumps, near1, near2 in eventParts:
+        part = events[start:start + len(rows1)]
+        part['SIDEPEAK_WNC'] = data['MEAS_WNC'][rows1]
+        part['SIDEPEAK_TOW'] = data['MEAS_TOW'][rows1]
+        part['SIDEPEAK_SVID'] = data['MEAS_SVID'][rows1]
+        part['SIDEPEAK_SIGNALTYPE1'] = data['MEAS_SIGNALTYPE'][rows1]
+        part['SIDEPEAK_SIGNALTYPE2'] = data['MEAS_SIGNALTYPE'][rows2]
+        part['SIDEPEAK_DPR'] = dPR
+        part['SIDEPEAK_JUMP'] = jumps
+        part['SIDEPEAK_NEAR1'] = near1
+        part['SIDEPEAK_NEAR2'] = near2
+        start += len(rows1)
+
+    events = events[np.lexsort((events['SIDEPEAK_SIGNALTYPE2'], events['SIDEPEAK_SIGNALTYPE1'], events['SIDEPEAK_SVID'], events['SIDEPEAK_TOW'], events['SIDEPEAK_WNC']))]
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Found %d side peak indicators on %d SVs', len(events), len(np.unique(events['SIDEPEAK_SVID'])))
+
+    return events
+
+
+def writeEvents(events, fileName):
+    """
+    writeEvents writes the side peak events to a csv file with a header line
+    """
+    with open(fileName, 'w') as fEvents:
+        fEvents.write(','.join(mSSN.colNamesSidePeakEvent) + '\n')
+        for event in events.tolist():
+            fEvents.write('%d,%.3f,%d,%d,%d,%.3f,%.3f,%d,%d\n' % event)
+
+
+if __name__ == "__main__":
+    import time
+    from SSN import svGroups
+
+    # a day of 1 Hz E1A / E6A observations of 30 SVs with side peak jumps of 1 x 9.7 m and 2 x 14.65 m
+    nrSVs, nrEpochs = 30, 86400
+    TOWs = np.tile(np.arange(nrEpochs, dtype=np.float64), 2 * nrSVs)
+    SVIDs = np.repeat(np.arange(71, 71 + nrSVs), 2 * nrEpochs)
+    signalTypes = np.tile(np.repeat([16, 18], nrEpochs), nrSVs)
+    code = 2.e7 + np.random.randn(len(TOWs)) * 0.3
+    code[(signalTypes == 16) & (TOWs >= 20000) & (TOWs < 20100)] += 9.7
+    code[(signalTypes == 18) & (TOWs >= 50000) & (TOWs < 50100)] += 29.3
+
+    dataMeas = np.zeros(len(TOWs), dtype=np.dtype({'names': list(mSSN.colNamesMeasEpoch), 'formats': mSSN.colFmtMeasEpoch.split(',')}))
+    dataMeas['MEAS_WNC'] = 1873
+    dataMeas['MEAS_TOW'] = TOWs
+    dataMeas['MEAS_SVID'] = SVIDs
+    dataMeas['MEAS_SIGNALTYPE'] = signalTypes
+    dataMeas['MEAS_CODE'] = code
+
+    start = time.time()
+    events = detectSidePeaks(svGroups.SVSignalGroups(dataMeas, 'MEAS'), verbose=True)
+    print('%d events (%d near 9.7 m, %d near 14.65 m) for %d observations in %.3f s' % (len(events), np.count_nonzero(events['SIDEPEAK_NEAR1']),
+                                                                                       np.count_nonzero(events['SIDEPEAK_NEAR2']), len(dataMeas), time.time() - start))
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+
+"""
+Vectorized loss of lock and cycle slip detection on the MeasEpoch data of all satellites at once
+
+The detection works on the rows of SVSignalGroups.data, sorted on SVID, signal type and TOW, so
+consecutive rows of the same group are consecutive epochs of a signal. Four kinds of events are found:
+    - SLIP_LOCKTIME: the lock time of a signal decreases, the receiver lost lock in between
+    - SLIP_HALFCYCLE: the half cycle ambiguity of a signal becomes set
+    - SLIP_GF: a jump in the geometry-free (L1 - L2 in m) carrier phase combination of a pair
+      of signals of the same SV, which is larger than the ionospheric drift allows
+    - SLIP_MW: a step in the Melbourne-Wubbena combination (wide-lane cycles) of a pair of
+      signals, the difference between its mean over the epochs after and before
+The pairs are joined on TOW for all SVs at once. The combinations are only compared within an arc
+(no lock time reset on either signal and no data gap longer than MAX_GAP). The events are returned
+as a single structured array (see colFmtSlipEvent).
+"""
+
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import svGroups
+from SSN import sbfDecoder
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# kinds of events
+SLIP_LOCKTIME = 1
+SLIP_HALFCYCLE = 2
+SLIP_GF = 3
+SLIP_MW = 4
+SLIP_NAMES = {SLIP_LOCKTIME: 'locktime', SLIP_HALFCYCLE: 'half cycle', SLIP_GF: 'geometry-free', SLIP_MW: 'Melbourne-Wubbena'}
+
+# signal type used in SLIP_SIGNALTYPE2 for the events on a single signal
+NO_SIGNALTYPE = 255
+
+# pairs of signal types (in that order) used for the geometry-free and Melbourne-Wubbena combinations
+SIGNAL_PAIRS = [(0, 3), (0, 2), (0, 4), (8, 11), (8, 10), (16, 18), (17, 20), (17, 21), (24, 25), (28, 29)]
+
+# largest gap (s) between two epochs of an arc
+MAX_GAP = 30.
+
+# jump in the geometry-free combination (m) detected as slip, besides the ionospheric drift (m/s) over the gap
+GF_THRESHOLD = 0.035
+GF_DRIFT = 0.01
+
+# the Melbourne-Wubbena test compares the mean over (at most) MW_WINDOW epochs of the arc before and from an epoch on,
+# with at least MW_MIN_EPOCHS on each side. A difference larger than MW_THRESHOLD wide-lane cycles and
+# MW_SIGMAS times its standard deviation is a slip
+MW_WINDOW = 20
+MW_MIN_EPOCHS = 5
+MW_THRESHOLD = 0.5
+MW_SIGMAS = 4.
+
+
+def lockTimeResets(measGroups):
+    """
+    lockTimeResets marks the rows of the grouped MeasEpoch data where the lock time decreased w.r.t. the previous epoch
+
+    Returns:
+        boolean array over measGroups.data
+    """
+    data = measGroups.data
+    resets = np.zeros(len(data), dtype=bool)
+    if len(data) > 1:
+        resets[1:] = sameGroup(measGroups) & (data['MEAS_LOCKTIME'][1:] < data['MEAS_LOCKTIME'][:-1])
+    return resets
+
+
+def sameGroup(measGroups):
+    """
+    sameGroup returns for rows 1 .. N-1 of the grouped data whether they belong to the group of the previous row
+    """
+    data = measGroups.data
+    return (data['MEAS_SVID'][1:] == data['MEAS_SVID'][:-1]) & (data['MEAS_SIGNALTYPE'][1:] == data['MEAS_SIGNALTYPE'][:-1])
+
+
+def halfCycleStarts(measGroups):
+    """
+    halfCycleStarts marks the rows where the half cycle ambiguity becomes set (or is set at the first epoch of a group)
+
+    Returns:
+        boolean array over measGroups.data
+    """
+    halfCycle = measGroups.data['MEAS_HALFCYCLEAMBIGUITY'] != 0
+    starts = halfCycle.copy()
+    if len(halfCycle) > 1:
+        starts[1:] &= ~(halfCycle[:-1] & sameGroup(measGroups))
+    return starts
+
+
+def joinPair(measGroups, signalType1, signalType2):
+    """
+    joinPair finds for all SVs the epochs where both signal types of a pair are observed
+
+    Returns:
+        rows1, rows2: rows of measGroups.data of both signals at the common epochs, sorted on SVID and TOW
+    """
+    data = measGroups.data
+    rows1 = np.flatnonzero(data['MEAS_SIGNALTYPE'] == signalType1)
+    rows2 = np.flatnonzero(data['MEAS_SIGNALTYPE'] == signalType2)
+    if len(rows1) == 0 or len(rows2) == 0:
+        return rows1[:0], rows2[:0]
+
+    # the rows of a signal type are sorted on SVID and TOW, so their combined key is sorted as well
+    def joinKey(rows):
+        return (data['MEAS_SVID'][rows].astype(np.int64) << svGroups.TOW_BITS) | np.round(data['MEAS_TOW'][rows] * 1000).astype(np.int64)
+
+    keys1, keys2 = joinKey(rows1), joinKey(rows2)
+    positions = np.minimum(np.searchsorted(keys2, keys1), len(keys2) - 1)
+    common = keys2[positions] == keys1
+
+    return rows1[common], rows2[positions[common]]
+
+
+def arcStarts(data, rows1, rows2, resets):
+    """
+    arcStarts marks the common epochs of a pair that start a new arc: a new SV, a data gap or a lock time reset on either signal
+    """
+    starts = np.ones(len(rows1), dtype=bool)
+    if len(rows1) > 1:
+        starts[1:] = ((data['MEAS_SVID'][rows1[1:]] != data['MEAS_SVID'][rows1[:-1]]) |
+                      (np.diff(data['MEAS_TOW'][rows1]) > MAX_GAP))
+    starts |= resets[rows1] | resets[rows2]
+    return starts
+
+
+def carrierCombinations(data, rows1, rows2):
+    """
+    carrierCombinations computes the geometry-free and Melbourne-Wubbena combinations at the common epochs of a pair
+
+    Returns:
+        GF: geometry-free carrier phase combination L1 - L2 (m)
+        MW: Melbourne-Wubbena combination (wide-lane cycles)
+    """
+    f1 = sbfDecoder.carrierFrequency(data['MEAS_SIGNALTYPE'][rows1].astype(np.int64), data['MEAS_FREQNR'][rows1])
+    f2 = sbfDecoder.carrierFrequency(data['MEAS_SIGNALTYPE'][rows2].astype(np.int64), data['MEAS_FREQNR'][rows2])
+    L1, L2 = data['MEAS_CARRIER'][rows1], data['MEAS_CARRIER'][rows2]  # cycles
+    P1, P2 = data['MEAS_CODE'][rows1], data['MEAS_CODE'][rows2]  # m
+
+    c = sbfDecoder.SPEED_OF_LIGHT
+    GF = c * (L1 / f1 - L2 / f2)
+    MW = (L1 - L2) - (f1 - f2) / (f1 + f2) * (f1 * P1 + f2 * P2) / c
+
+    return GF, MW
+
+
+def arcJumps(values, TOWs, starts):
+    """
+    arcJumps returns the difference with the previous epoch of the same arc (NaN at the start of an arc) and the time elapsed
+    """
+    jumps = np.empty(len(values))
+    jumps.fill(np.nan)
+    dt = np.zeros(len(values))
+    if len(values) > 1:
+        jumps[1:] = np.diff(values)
+        dt[1:] = np.diff(TOWs)
+    jumps[starts] = np.nan
+
+    return jumps, dt
+
+
+def arcWindowSums(values, starts, window):
+    """
+    arcWindowSums returns per epoch the number, sum and sum of squares of the valid values among the (at most)
+    window preceding epochs of the same arc and among the epoch itself and the (at most) window - 1 following ones
+
+    Returns:
+        (nrBefore, sumBefore, squaresBefore), (nrAfter, sumAfter, squaresAfter)
+    """
+    nrValues = len(values)
+    index = np.arange(nrValues)
+    arcStart = np.maximum.accumulate(np.where(starts, index, 0))
+    ends = np.append(starts[1:], True)
+    arcEnd = np.minimum.accumulate(np.where(ends, index + 1, nrValues)[::-1])[::-1]
+
+    # values relative to the first valid one of the arc keep the cumulative sums accurate
+    valid = np.isfinite(values)
+    firstValid = np.minimum.accumulate(np.where(valid, index, nrValues - 1)[::-1])[::-1]
+    relative = np.where(valid, values - values[firstValid[arcStart]], 0.)
+    cumulative = [np.concatenate(([0.], np.cumsum(column))) for column in (valid, relative, relative**2)]
+
+    first = np.maximum(arcStart, index - window)
+    last = np.minimum(arcEnd, index + window)
+    before = tuple(column[index] - column[first] for column in cumulative)
+    after = tuple(column[last] - column[index] for column in cumulative)
+
+    return before, after
+
+
+def stepDifferences(values, starts, window=MW_WINDOW, minEpochs=MW_MIN_EPOCHS):
+    """
+    stepDifferences tests each epoch of the arcs for a step: the difference between the mean of the values from that epoch
+    on and the mean of the preceding values (each over at most window epochs of the same arc)
+
+    Returns:
+        steps: the differences of the means, NaN when fewer than minEpochs are available on either side
+        sigmas: the standard deviation of the differences, estimated from the spread of the preceding values
+    """
+    (nrBefore, sumBefore, squaresBefore), (nrAfter, sumAfter, squaresAfter) = arcWindowSums(values, starts, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        meanBefore = sumBefore / nrBefore
+        steps = sumAfter / nrAfter - meanBefore
+        variance = np.maximum(squaresBefore / nrBefore - meanBefore**2, 0.) * nrBefore / (nrBefore - 1)
+        sigmas = np.sqrt(variance * (1. / nrBefore + 1. / nrAfter))
+    steps[(nrBefore < minEpochs) | (nrAfter < minEpochs)] = np.nan
+
+    return steps, sigmas
+
+
+def strongest(flags, values):
+    """
+    strongest keeps of each run of consecutive flagged epochs the one with the largest absolute value
+    """
+    indices = np.flatnonzero(flags)
+    if len(indices) == 0:
+        return flags
+    runStarts = np.concatenate(([0], np.flatnonzero(np.diff(indices) > 1) + 1))
+    magnitudes = np.abs(values[indices])
+    isLargest = magnitudes == np.repeat(np.maximum.reduceat(magnitudes, runStarts), np.diff(np.append(runStarts, len(indices))))
+
+    runIds = np.repeat(np.arange(len(runStarts)), np.diff(np.append(runStarts, len(indices))))
+    largest = indices[isLargest][np.unique(runIds[isLargest], return_index=True)[1]]
+
+    kept = np.zeros(len(flags), dtype=bool)
+    kept[largest] = True
+    return kept
+
+
+def detectSlips(measGroups, pairs=None, resets=None, verbose=False):
+    """
+    detectSlips detects the loss of locks and cycle slips on all SVs and signal types in one pass
+
+    Parameters:
+        measGroups: SVSignalGroups of the MeasEpoch data
+        pairs: pairs of signal types used for the carrier phase combinations (default SIGNAL_PAIRS)
+        resets: lock time resets of the caller (see lockTimeResets), computed when None
+
+    Returns:
+        events: array (dtype colFmtSlipEvent) sorted on TOW, SVID and kind, with the time, SVID, signal type(s),
+            kind (SLIP_*), the lock time at the event and a value: the lock time before the reset (SLIP_LOCKTIME),
+            1 (SLIP_HALFCYCLE) or the jump in m (SLIP_GF) or the step in wide-lane cycles (SLIP_MW)
+    """
+    data = measGroups.data
+    if pairs is None:
+        pairs = SIGNAL_PAIRS
+
+    logger.log(ssnLogging.verboseLevel(verbose), '    Detecting loss of lock and cycle slips on %d observations', len(data))
+
+    if resets is None:
+        resets = lockTimeResets(measGroups)
+    halfCycles = halfCycleStarts(measGroups)
+
+    # per kind of event: rows (of the first signal), rows of the second signal, kind and value
+    eventParts = []
+    rows = np.flatnonzero(resets)
+    eventParts.append((rows, None, SLIP_LOCKTIME, data['MEAS_LOCKTIME'][rows - 1].astype(np.float64)))
+    rows = np.flatnonzero(halfCycles)
+    eventParts.append((rows, None, SLIP_HALFCYCLE, np.ones(len(rows))))
+
+    for signalType1, signalType2 in pairs:
+        rows1, rows2 = joinPair(measGroups, signalType1, signalType2)
+        if len(rows1) == 0:
+            continue
+
+        starts = arcStarts(data, rows1, rows2, resets)
+        GF, MW = carrierCombinations(data, rows1, rows2)
+
+        jumpsGF, dt = arcJumps(GF, data['MEAS_TOW'][rows1], starts)
+        with np.errstate(invalid='ignore'):
+            slipsGF = np.abs(jumpsGF) > GF_THRESHOLD + GF_DRIFT * dt
+        eventParts.append((rows1[slipsGF], rows2[slipsGF], SLIP_GF, jumpsGF[slipsGF]))
+
+        stepsMW, sigmasMW = stepDifferences(MW, starts)
+        with np.errstate(invalid='ignore'):
+            slipsMW = strongest(np.abs(stepsMW) > np.maximum(MW_THRESHOLD, MW_SIGMAS * sigmasMW), stepsMW)
+        eventParts.append((rows1[slipsMW], rows2[slipsMW], SLIP_MW, stepsMW[slipsMW]))
+
+        logger.log(ssnLogging.verboseLevel(verbose), '      %s / %s: %d common epochs, %d GF and %d MW slips', mSSN.GNSSSignals[signalType1]['name'], mSSN.GNSSSignals[signalType2]['name'], len(rows1), np.count_nonzero(slipsGF), np.count_nonzero(slipsMW))
+
+    events = np.empty(sum(len(part[0]) for part in eventParts), dtype=np.dtype({'names': list(mSSN.colNamesSlipEvent), 'formats': mSSN.colFmtSlipEvent.split(',')}))
+    start = 0
+    for rows, rows2, kind, values in eventParts:
+        part = events[start:start + len(rows)]
+        part['SLIP_WNC'] = data['MEAS_WNC'][rows]
+        part['SLIP_TOW'] = data['MEAS_TOW'][rows]
+        part['SLIP_SVID'] = data['MEAS_SVID'][rows]
+        part['SLIP_SIGNALTYPE'] = data['MEAS_SIGNALTYPE'][rows]
+        part['SLIP_SIGNALTYPE2'] = NO_SIGNALTYPE if rows2 is None else data['MEAS_SIGNALTYPE'][rows2]
+        part['SLIP_KIND'] = kind
+        part['SLIP_LOCKTIME'] = data['MEAS_LOCKTIME'][rows]
+        part['SLIP_VALUE'] = values
+        start += len(rows)
+
+    events = events[np.lexsort((events['SLIP_SIGNALTYPE'], events['SLIP_KIND'], events['SLIP_SVID'], events['SLIP_TOW'], events['SLIP_WNC']))]
+
+    if logger.isEnabledFor(ssnLogging.verboseLevel(verbose)):
+        logger.log(ssnLogging.verboseLevel(verbose), '    Found %s', ', '.join('%d %s' % (np.count_nonzero(events['SLIP_KIND'] == kind), SLIP_NAMES[kind]) for kind in sorted(SLIP_NAMES)))
+
+    return events
+
+
+def groupIndices(measGroups, rowMask, SVID, signalType):
+    """
+    groupIndices returns the indices within the rows of (SVID, signalType) of the rows marked in rowMask
+    """
+    rows = measGroups.groupSlice((SVID, signalType))
+    return np.flatnonzero(rowMask[rows])
+
+
+def writeEvents(events, fileName):
+    """
+    writeEvents writes the events to a csv file with a header line
+    """
+    with open(fileName, 'w') as fEvents:
+        fEvents.write(','.join(mSSN.colNamesSlipEvent) + '\n')
+        for event in events.tolist():
+            fEvents.write('%d,%.3f,%d,%d,%d,%d,%d,%.3f\n' % event)
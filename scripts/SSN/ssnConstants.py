@@ -60,6 +60,26 @@ colFmtPosGeod = 'u2,f8,u1,u1,u1,u1,f8,f8,f8,f8,f8,f8,f8,f8,u2,u2,u2,f4,f4,u1,u1,
 colNamesChannelStatus = ('CHST_WNC', 'CHST_TOW', 'CHST_RxChannel', 'CHST_SVID', 'CHST_FreqNr', 'CHST_HealthStatus', 'CHST_Azimuth', 'CHST_Elevation', 'CHST_RiseSet', 'CHST_Antenna', 'CHST_TrackingStatus', 'CHST_PVTStatus', 'CHST_PVTInfo')
 colFmtChannelStatus = 'u2,f8,u1,u1,u1,u2,u2,i1,u1,u1,u2,u2,u2'
 
+# names and format for the list of SBF blocks found while scanning a SBF file
+colNamesSBFBlock = ('BLOCK_OFFSET', 'BLOCK_NUMBER', 'BLOCK_REVISION', 'BLOCK_LENGTH', 'BLOCK_TOW', 'BLOCK_WNC')
+colFmtSBFBlock = 'u8,u2,u1,u2,u4,u2'
+
+# names and format for the jamming events detected on the CN0 (START and STOP are indices of the epochs)
+colNamesJamEvent = ('JAM_SVID', 'JAM_SIGNALTYPE', 'JAM_START', 'JAM_STOP', 'JAM_STARTTOW', 'JAM_STOPTOW', 'JAM_DEPTH')
+colFmtJamEvent = 'u1,u1,i4,i4,f8,f8,f4'
+
+# names and format for the jamming start (JAMMED = 1) and stop (JAMMED = 0) events of the streaming detection
+colNamesJamStreamEvent = ('JAMSTREAM_WNC', 'JAMSTREAM_TOW', 'JAMSTREAM_SVID', 'JAMSTREAM_SIGNALTYPE', 'JAMSTREAM_JAMMED', 'JAMSTREAM_CN0', 'JAMSTREAM_BASELINE')
+colFmtJamStreamEvent = 'u2,f8,u1,u1,u1,f4,f4'
+
+# names and format for the loss of lock and cycle slip events (SIGNALTYPE2 is the second signal of a combination, KIND see slipDetector)
+colNamesSlipEvent = ('SLIP_WNC', 'SLIP_TOW', 'SLIP_SVID', 'SLIP_SIGNALTYPE', 'SLIP_SIGNALTYPE2', 'SLIP_KIND', 'SLIP_LOCKTIME', 'SLIP_VALUE')
+colFmtSlipEvent = 'u2,f8,u1,u1,u1,u1,u4,f8'
+
+# names and format for the side peak events (NEAR1/NEAR2: jump near a multiple of the side peak spacing of SIGNALTYPE1/SIGNALTYPE2)
+colNamesSidePeakEvent = ('SIDEPEAK_WNC', 'SIDEPEAK_TOW', 'SIDEPEAK_SVID', 'SIDEPEAK_SIGNALTYPE1', 'SIDEPEAK_SIGNALTYPE2', 'SIDEPEAK_DPR', 'SIDEPEAK_JUMP', 'SIDEPEAK_NEAR1', 'SIDEPEAK_NEAR2')
+colFmtSidePeakEvent = 'u2,f8,u1,u1,u1,f8,f8,u1,u1'
+
 
 def svPRN(prnSSN):
     """
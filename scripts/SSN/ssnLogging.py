@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+Logging of the SSN, Plot modules and the sbf2*.py scripts
+
+Each module gets its logger with getLogger(__name__), all loggers are children of the 'GNSSpy'
+logger and are named after the module only (eg GNSSpy.sbf2stf, GNSSpy.plotCN0, GNSSpy.sbf2CN0),
+so the level of a module can be set whatever the way it is imported.
+
+The messages are formatted lazily: the arguments are passed to the logger and not %-formatted
+by the caller, eg
+    logger.debug('CN0 = %s (#%d)', CN0, len(CN0))
+so the repr of an array is only built when the message is emitted. Array dumps are logged at
+DEBUG level, which is only enabled when asked for explicitly on the command line (--log).
+
+The progress messages of functions taking a verbose argument are logged at verboseLevel(verbose):
+INFO when verbose is set, else DEBUG, eg
+    logger.log(ssnLogging.verboseLevel(verbose), '    Reading %s', fileName)
+so -v shows them (unless -q), and --log module=debug shows those of a module without -v.
+
+Levels set by configure:
+    - quiet (production): WARNING, only warnings and errors are shown
+    - default: INFO, the short progress and summary lines
+    - --log LEVEL or --log module=LEVEL,...: the level of all modules or of the given modules,
+      this also applies in quiet mode
+"""
+
+import sys
+import logging
+
+# name of the parent logger of all modules
+LOGGER_ROOT = 'GNSSpy'
+
+# level names accepted on the command line
+LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+# avoid 'No handlers could be found' when the modules are used without calling configure
+logging.getLogger(LOGGER_ROOT).addHandler(logging.NullHandler())
+
+
+def getLogger(name):
+    """
+    getLogger returns the logger of a module, name is normally __name__ (eg SSN.sbf2stf or __main__)
+    """
+    if name == '__main__':
+        name = sys.argv[0]
+    name = name.replace('\\', '/').split('/')[-1]
+    if name.endswith('.py'):
+        name = name[:-3]
+
+    return logging.getLogger('%s.%s' % (LOGGER_ROOT, name.split('.')[-1]))
+
+
+def verboseLevel(verbose):
+    """
+    verboseLevel returns the level of the progress messages of a function called with verbose (INFO, else DEBUG)
+    """
+    return logging.INFO if verbose else logging.DEBUG
+
+
+def parseLevels(levelSpec):
+    """
+    parseLevels translates a level specification 'LEVEL' or 'module=LEVEL,module=LEVEL' (eg 'info,sbf2stf=debug')
+
+    Returns:
+        dict with per module name (None for all modules) its level
+    """
+    levels = {}
+    for item in levelSpec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '=' in item:
+            module, levelName = [part.strip() for part in item.split('=', 1)]
+        else:
+            module, levelName = None, item
+        if levelName.lower() not in LEVELS:
+            raise ValueError('unknown log level %s (use %s)' % (levelName, ', '.join(sorted(LEVELS))))
+        levels[module] = LEVELS[levelName.lower()]
+
+    return levels
+
+
+def addOptions(parser):
+    """
+    addOptions adds the -q/--quiet and --log options to an argparse parser
+    """
+    parser.add_argument('-q', '--quiet', help='only display warnings and errors (default False)', action='store_true', required=False)
+    parser.add_argument('--log', help='log level for all modules or per module, eg debug or sbf2stf=debug,plotCN0=info', required=False, default=None)
+
+
+def configure(quiet=False, levelSpec=None, stream=None):
+    """
+    configure sets the handler and the levels of the loggers, called once by the scripts
+
+    Parameters:
+        quiet: only warnings and errors are displayed
+        levelSpec: level specification (see parseLevels)
+        stream: stream to write to (default sys.stdout)
+    """
+    levels = parseLevels(levelSpec) if levelSpec else {}
+
+    root = logging.getLogger(LOGGER_ROOT)
+    for handler in list(root.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            root.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    root.addHandler(handler)
+    root.propagate = False
+
+    root.setLevel(levels.pop(None, logging.WARNING if quiet else logging.INFO))
+    for module, level in levels.items():
+        getLogger(module).setLevel(level)
+
+
+def configureFromArgs(args):
+    """
+    configureFromArgs configures the logging from the options added by addOptions
+    """
+    try:
+        configure(args.quiet, args.log)
+    except ValueError as e:
+        sys.stderr.write('%s. Exiting.\n' % e)
+        sys.exit(2)
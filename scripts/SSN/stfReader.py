@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+Fast reader for the csv files created by sbf2stf
+
+The file is read in chunks of complete lines. Each chunk is cleaned with byte replacements
+(the Windows NaN/INF tokens like '1.#INF' and '-1.#IND' and empty fields become 'nan') and
+all numbers are converted at once by numpy, after which the columns are copied into the
+structured array defined by the formats in ssnConstants.
+"""
+
+import sys
+import time
+import numpy as np
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# exit codes
+E_SUCCESS = 0
+E_FILE_NOT_EXIST = 1
+
+# number of bytes to read per chunk
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# tokens written by Windows versions of sbf2stf for not-a-number or infinite values
+NAN_TOKENS = (b'1.#INF', b'1.#IND', b'1.#QNAN')
+
+
+def parseChunk(lines, nrColumns):
+    """
+    parseChunk converts a list of csv lines into a 2D float array
+
+    Parameters:
+        lines: list of lines (bytes) of the csv file
+        nrColumns: number of columns on each line
+
+    Returns:
+        values: array of shape (len(lines), nrColumns), None when the lines do not all have nrColumns fields
+    """
+    text = b''.join(lines).replace(b'\r', b'').rstrip(b'\n')
+
+    # every line must have nrColumns - 1 separators, a short line followed by a long one would shift the columns
+    chars = np.frombuffer(text, dtype=np.uint8)
+    lineStarts = np.concatenate(([0], np.flatnonzero(chars == ord('\n')) + 1))
+    if np.any(np.add.reduceat((chars == ord(',')).view(np.uint8), lineStarts, dtype=np.int64) != nrColumns - 1):
+        return None
+
+    for token in NAN_TOKENS:
+        text = text.replace(token, b'nan')
+
+    # every field must contain a number, so fill in the empty fields
+    text = b',' + text.replace(b'\n', b',') + b','
+    text = text.replace(b',,', b',nan,').replace(b',,', b',nan,')
+
+    values = np.fromstring(text[1:-1], dtype=np.float64, sep=',')
+    if len(values) != len(lines) * nrColumns:
+        return None
+
+    return values.reshape(len(lines), nrColumns)
+
+
+def readSTFFile(stfFileName, colFmt, colNames, skipHeader=2, chunkSize=CHUNK_SIZE, verbose=False):
+    """
+    readSTFFile reads a sbf2stf converted csv file into a numpy structured array
+
+    Fields that are empty or contain '1.#INF' like tokens are NaN for float columns and -1
+    (cast to the column type) for integer columns, as np.genfromtxt does.
+
+    Parameters:
+        stfFileName: name of the file created by sbf2stf
+        colFmt, colNames: format and names of the columns (see ssnConstants)
+        skipHeader: number of header lines
+        chunkSize: number of bytes to read and convert at once
+
+    Returns:
+        data: array with the content of the file
+    """
+    dtype = np.dtype({'names': list(colNames), 'formats': colFmt.split(',')})
+    nrColumns = len(dtype.names)
+
+    chunks = []
+    with open(stfFileName, 'rb') as fSTF:
+        for _ in range(skipHeader):
+            fSTF.readline()
+
+        while True:
+            lines = fSTF.readlines(chunkSize)
+            if not lines:
+                break
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+
+            values = parseChunk(lines, nrColumns)
+            if values is None:
+                # fall back on the slow but tolerant reader
+                logger.log(ssnLogging.verboseLevel(verbose), '    Irregular lines in %s, using np.genfromtxt', stfFileName)
+                return np.genfromtxt(stfFileName, delimiter=",", skip_header=skipHeader, dtype=colFmt, names=colNames)
+
+            chunk = np.empty(len(values), dtype=dtype)
+            for i, name in enumerate(dtype.names):
+                if dtype[name].kind == 'f':
+                    chunk[name] = values[:, i]
+                else:
+                    chunk[name] = np.where(np.isnan(values[:, i]), -1, values[:, i]).astype(np.int64)
+            chunks.append(chunk)
+
+    if not chunks:
+        return np.empty(0, dtype=dtype)
+
+    return np.concatenate(chunks)
+
+
+if __name__ == "__main__":
+    # benchmark against np.genfromtxt: stfReader.py <stf file> <format name in ssnConstants, eg MeasEpoch>
+    from SSN import ssnConstants as mSSN
+
+    stfFileName = sys.argv[1]
+    colFmt = getattr(mSSN, 'colFmt' + sys.argv[2])
+    colNames = getattr(mSSN, 'colNames' + sys.argv[2])
+
+    start = time.time()
+    dataGen = np.genfromtxt(stfFileName, delimiter=",", skip_header=2, dtype=colFmt, names=colNames)
+    timeGen = time.time() - start
+
+    start = time.time()
+    dataFast = readSTFFile(stfFileName, colFmt, colNames)
+    timeFast = time.time() - start
+
+    print('rows = %d' % len(dataFast))
+    print('np.genfromtxt: %8.3f s (%10.0f rows/s)' % (timeGen, len(dataGen) / timeGen))
+    print('readSTFFile:   %8.3f s (%10.0f rows/s)' % (timeFast, len(dataFast) / timeFast))
+    print('speed up = %.1f' % (timeGen / timeFast))
+
+    for name in dataFast.dtype.names:
+        if dataFast.dtype[name].kind == 'f':
+            # no equal_nan before numpy 1.10
+            nanGen = np.isnan(dataGen[name])
+            equal = np.array_equal(nanGen, np.isnan(dataFast[name])) and np.allclose(dataGen[name][~nanGen], dataFast[name][~nanGen])
+        else:
+            equal = np.array_equal(dataGen[name], dataFast[name])
+        if not equal:
+            print('column %s differs' % name)
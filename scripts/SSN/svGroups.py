@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+"""
+Grouping of MeasEpoch (and alike) arrays per satellite and signal type
+
+The rows are sorted once on (SVID, SIGNALTYPE, TOW), after which the rows of a satellite,
+or of a satellite and signal type, are a contiguous block of the sorted array. The start and
+stop of each block are kept in dictionaries, so selecting the data of a SV and signal type
+is a dictionary lookup returning a slice (view) of the sorted array, instead of an np.where
+over the whole array for each SV and each signal type.
+
+The groups also give a dense [SV, signalType, epoch] cube of a column (eg CN0) in one step.
+"""
+
+import numpy as np
+
+from SSN import ssnConstants as mSSN
+from SSN import ssnLogging
+
+
+logger = ssnLogging.getLogger(__name__)
+
+# number of bits used for the TOW (in ms) in the sort key
+TOW_BITS = 30
+
+
+class SVSignalGroups(object):
+    """
+    SVSignalGroups groups the rows of an array with SVID, SIGNALTYPE and TOW columns
+
+    Parameters:
+        data: structured array (eg from readMeasEpoch or sbfDecoder)
+        prefix: prefix of the column names ('MEAS' for MEAS_SVID, MEAS_SIGNALTYPE and MEAS_TOW)
+            when the array has no SIGNALTYPE column (eg SatVisibility) it is only grouped per SV
+
+    Attributes:
+        data: the rows sorted on SVID, SIGNALTYPE and TOW
+        order: indices that sort the original array
+        SVIDs: ordered list of observed SVIDs
+        allSignalTypes: ordered list of the signal types observed for any SV
+    """
+    def __init__(self, data, prefix='MEAS', verbose=False):
+        logger.log(ssnLogging.verboseLevel(verbose), '    Grouping %s data per SVID and SignalType', prefix)
+
+        SVIDs = data[prefix + '_SVID'].astype(np.int64)
+        if prefix + '_SIGNALTYPE' in data.dtype.names:
+            signalTypes = data[prefix + '_SIGNALTYPE'].astype(np.int64)
+        else:
+            signalTypes = np.zeros(len(data), dtype=np.int64)
+        TOWs = np.round(data[prefix + '_TOW'] * 1000).astype(np.int64)
+
+        # a single sort on the combined key gives the rows per SVID, then signal type and then TOW
+        groupKeys = SVIDs * 256 + signalTypes
+        self.order = np.argsort((groupKeys << TOW_BITS) | TOWs, kind='mergesort')
+        self.prefix = prefix
+        self.data = data[self.order]
+
+        # find the boundaries between the groups
+        groupKeys = groupKeys[self.order]
+        boundaries = np.flatnonzero(np.diff(groupKeys)) + 1
+        starts = np.concatenate(([0], boundaries)).astype(np.int64)
+        stops = np.concatenate((boundaries, [len(groupKeys)])).astype(np.int64)
+        if len(groupKeys) == 0:
+            starts = stops = np.zeros(0, dtype=np.int64)
+
+        self._groups = {}
+        self._satellites = {}
+        self._signalTypes = {}
+        for key, start, stop in zip(groupKeys[starts].tolist(), starts.tolist(), stops.tolist()):
+            SVID, signalType = divmod(key, 256)
+            self._groups[(SVID, signalType)] = (start, stop)
+            self._satellites[SVID] = (self._satellites.get(SVID, (start, stop))[0], stop)
+            self._signalTypes.setdefault(SVID, []).append(signalType)
+
+        self.SVIDs = sorted(self._satellites)
+        self.allSignalTypes = sorted(set(signalType for SVID, signalType in self._groups))
+
+    def signalTypes(self, SVID):
+        """
+        returns the ordered list of signal types observed for a SV
+        """
+        return self._signalTypes.get(SVID, [])
+
+    def satellite(self, SVID):
+        """
+        returns the rows of a SV, sorted on signal type and TOW (a view on data)
+        """
+        start, stop = self._satellites.get(SVID, (0, 0))
+        return self.data[start:stop]
+
+    def __getitem__(self, SVIDSignalType):
+        """
+        returns the rows of a (SVID, signalType) pair sorted on TOW (a view on data)
+        """
+        start, stop = self._groups.get(tuple(SVIDSignalType), (0, 0))
+        return self.data[start:stop]
+
+    def groupSlice(self, SVIDSignalType):
+        """
+        returns the slice selecting the rows of a (SVID, signalType) pair in data (or in an aligned array)
+        """
+        return slice(*self._groups.get(tuple(SVIDSignalType), (0, 0)))
+
+    def __contains__(self, SVIDSignalType):
+        return tuple(SVIDSignalType) in self._groups
+
+    def align(self, otherData):
+        """
+        align reorders an array with the same rows as data (eg MeasExtra for MeasEpoch) in the grouped order
+        """
+        return otherData[self.order]
+
+    def cubeIndex(self, SVID, signalType):
+        """
+        returns the indices of a (SVID, signalType) pair in the first two dimensions of the cube
+        """
+        return self.SVIDs.index(SVID), self.allSignalTypes.index(signalType)
+
+    def cube(self, column, spanTOW, verbose=False):
+        """
+        cube creates a 3D array [SV, signalType, epoch] with the values of column, NaN when not observed
+
+        All observations are placed in the cube with a single scatter, the SVs and signal types
+        follow the order of SVIDs and allSignalTypes.
+
+        Parameters:
+            column: name of the column to place in the cube (eg 'MEAS_CN0')
+            spanTOW: sorted TOWs of the epochs (eg the full observation time span)
+
+        Returns:
+            valuesCube: float32 array of shape (len(SVIDs), len(allSignalTypes), len(spanTOW))
+        """
+        valuesCube = np.empty((len(self.SVIDs), len(self.allSignalTypes), len(spanTOW)), dtype=np.float32)
+        valuesCube.fill(np.nan)
+
+        logger.log(ssnLogging.verboseLevel(verbose), '    Creating %s cube of %d SVs x %d signal types x %d epochs (%.1f MB)', column, valuesCube.shape[0], valuesCube.shape[1], valuesCube.shape[2], valuesCube.nbytes / 1e6)
+
+        if len(self.data) > 0:
+            iSV = np.searchsorted(self.SVIDs, self.data[self.prefix + '_SVID'])
+            if self.prefix + '_SIGNALTYPE' in self.data.dtype.names:
+                iSignalType = np.searchsorted(self.allSignalTypes, self.data[self.prefix + '_SIGNALTYPE'])
+            else:
+                iSignalType = np.zeros(len(self.data), dtype=np.int64)
+            iEpoch = np.searchsorted(spanTOW, self.data[self.prefix + '_TOW'])
+
+            # observations outside the time span are not placed in the cube
+            inSpan = iEpoch < len(spanTOW)
+            valuesCube[iSV[inSpan], iSignalType[inSpan], iEpoch[inSpan]] = self.data[column][inSpan]
+
+        return valuesCube
+
+    def printGroups(self):
+        """
+        printGroups logs the observed SVs with their signal types and number of observations
+        """
+        for SVID in self.SVIDs:
+            gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
+            logger.info('    %s%d (%d): %s', gnssSystShort, gnssPRN, SVID,
+                        ' '.join('%s (%d)' % (mSSN.GNSSSignals[signalType]['name'], self._groups[(SVID, signalType)][1] - self._groups[(SVID, signalType)][0])
+                                 for signalType in self._signalTypes[SVID]))
@@ -54,9 +54,13 @@ gt1 + dt.timedelta(days=2) : 2011-01-03T00:00:00
 gt1 - dt.timedelta(days=2) : 2010-12-30T00:00:00
 """
 
+import calendar
 import datetime as dt
 from datetime import timedelta
 
+from GNSS import leaptable
+
+
 class gnsstime(dt.datetime):
     """
     gnsstime(year, month, day[, hour[, minute[, second[, microsecond]]]])
@@ -64,33 +68,6 @@ class gnsstime(dt.datetime):
     # datetime at the reference of GPST, MJD
     dt_gpst0 = dt.datetime(1980, 1, 6)
     dt_mjd0 = dt.datetime(1858, 11, 17)
-    leaps = []
-
-    # leap seconds for GPST
-    class leapsec:
-        __slots__ = ['date', 'sec']
-
-        def __init__(self, yyyy, mm, dd, sec=0):
-            self.date = dt.datetime(yyyy, mm, dd)
-            self.sec = sec
-            return
-
-    leaps.append(leapsec(2012, 7, 1, sec=-16))
-    leaps.append(leapsec(2009, 1, 1, sec=-15))
-    leaps.append(leapsec(2006, 1, 1, sec=-14))
-    leaps.append(leapsec(1999, 1, 1, sec=-13))
-    leaps.append(leapsec(1997, 7, 1, sec=-12))
-    leaps.append(leapsec(1996, 1, 1, sec=-11))
-    leaps.append(leapsec(1994, 7, 1, sec=-10))
-    leaps.append(leapsec(1993, 7, 1, sec=-9))
-    leaps.append(leapsec(1992, 7, 1, sec=-8))
-    leaps.append(leapsec(1991, 1, 1, sec=-7))
-    leaps.append(leapsec(1990, 1, 1, sec=-6))
-    leaps.append(leapsec(1988, 1, 1, sec=-5))
-    leaps.append(leapsec(1985, 7, 1, sec=-4))
-    leaps.append(leapsec(1983, 7, 1, sec=-3))
-    leaps.append(leapsec(1982, 7, 1, sec=-2))
-    leaps.append(leapsec(1981, 7, 1, sec=-1))
 
     @staticmethod
     def ymd2date(ymd):
@@ -193,13 +170,8 @@ class gnsstime(dt.datetime):
         """
         leap seconds for GPST.
         """
-        # search leap seconds
-        for leap in self.leaps:
-            if self >= leap.date:
-                return leap.sec
-
-        # return 0 sec before 1981/7/1
-        return 0
+        # look up the leap seconds in the shared table (0 sec before 1981/7/1)
+        return -int(leaptable.leapSecondsFromUTC(calendar.timegm(self.timetuple())))
 
     @property
     def gpst(self):
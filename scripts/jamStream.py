@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import sys
+import os
+import argparse
+
+from SSN import sbfStream
+from SSN import jamDetector
+from GNSS import gpstime
+from SSN import ssnConstants as mSSN
+from SSN import ssnLogging
+
+# exit codes
+E_SUCCESS = 0
+E_FILE_NOT_EXIST = 1
+E_NOT_IN_PATH = 2
+E_UNKNOWN_OPTION = 3
+E_TIME_PASSED = 4
+E_WRONG_OPTION = 5
+E_SIGNALTYPE_MISMATCH = 6
+E_DIR_NOT_EXIST = 7
+E_FAILURE = 99
+
+logger = ssnLogging.getLogger(__name__)
+
+
+def treatCmdOpts(argv):
+    """
+    Treats the command line options
+
+    Parameters:
+      argv
+
+    Sets the global variables according to the CLI args
+    """
+    helpTxt = os.path.basename(__file__) + ' detects jamming in real-time on a live SBF stream'
+
+    # create the parser for command line arguments
+    parser = argparse.ArgumentParser(description=helpTxt)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-s', '--source', help='SBF stream: host:port of the receiver or name of a (growing) SBF file')
+    source.add_argument('-r', '--replay', help='replay a SBF file over a local TCP connection as stand-in for the receiver')
+    parser.add_argument('--speed', help='replay speed factor, 0 for as fast as possible (default 1)', type=float, required=False, default=1.)
+    parser.add_argument('-f', '--follow', help='keep reading data appended to the SBF file (default False)', action='store_true', required=False)
+    parser.add_argument('-i', '--idle', help='stop following the SBF file after this number of seconds without new data (default never)', type=float, required=False, default=None)
+    parser.add_argument('-g', '--gap', help='number of seconds after which a signal no longer received is forgotten (default 60)', type=float, required=False, default=60.)
+    parser.add_argument('-e', '--events', help='append the jamming events to this csv file', required=False, default=None)
+    parser.add_argument('-v', '--verbose', help='increase output verbosity (default False)', action='store_true', required=False)
+    ssnLogging.addOptions(parser)
+    args = parser.parse_args()
+    ssnLogging.configureFromArgs(args)
+
+    return args.source, args.replay, args.speed, args.follow, args.idle, args.gap, args.events, args.verbose
+
+
+def reportEvents(events, fEvents=None):
+    """
+    reportEvents displays the jamming events and appends them to the events file
+    """
+    for event in events:
+        gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(event['JAMSTREAM_SVID'])
+        UTC = gpstime.UTCFromWT(int(event['JAMSTREAM_WNC']), float(event['JAMSTREAM_TOW']))
+        print('Jamming %s at %s on %s%d signaltype %s, C/No value = %.2f (baseline %.2f)' % ('started' if event['JAMSTREAM_JAMMED'] else 'stopped', UTC, gnssSystShort, gnssPRN, mSSN.GNSSSignals[event['JAMSTREAM_SIGNALTYPE']]['name'], event['JAMSTREAM_CN0'], event['JAMSTREAM_BASELINE']))
+        if fEvents is not None:
+            fEvents.write('%d,%.3f,%d,%d,%d,%.2f,%.2f\n' % tuple(event.tolist()))
+    sys.stdout.flush()
+    if fEvents is not None:
+        fEvents.flush()
+
+
+if __name__ == "__main__":
+    # treat command line options
+    source, replay, speed, follow, idleTimeout, maxGap, eventsFileName, verbose = treatCmdOpts(sys.argv)
+
+    if replay is not None:
+        if not os.path.isfile(replay):
+            sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % replay)
+            sys.exit(E_FILE_NOT_EXIST)
+        port, replayThread = sbfStream.replayServer(replay, speed=speed, verbose=verbose)
+        source = 'localhost:%d' % port
+    elif sbfStream.parseSource(source) is None and not os.path.isfile(source):
+        sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % source)
+        sys.exit(E_FILE_NOT_EXIST)
+
+    fEvents = None
+    if eventsFileName is not None:
+        writeHeader = not os.path.isfile(eventsFileName)
+        fEvents = open(eventsFileName, 'a')
+        if writeHeader:
+            fEvents.write(','.join(mSSN.colNamesJamStreamEvent) + '\n')
+
+    decoder = sbfStream.SBFStreamDecoder(['MeasEpoch_2', 'SatVisibility_1'], verbose)
+    detector = jamDetector.StreamJamDetector(maxGap=maxGap, verbose=verbose)
+
+    # each MeasEpoch block is handled as soon as it is complete, so events are reported in the epoch they occur
+    try:
+        for data in sbfStream.readSource(source, follow, idleTimeout, verbose):
+            dataMeas, dataVisibility = decoder.feed(data)
+            detector.addVisibility(dataVisibility)
+            reportEvents(detector.addMeasurements(dataMeas), fEvents)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if fEvents is not None:
+            fEvents.close()
+
+    logger.log(ssnLogging.verboseLevel(verbose), 'Read %d bytes containing %d SBF blocks', decoder.nrBytes, decoder.nrBlocks)
+
+    sys.exit(E_SUCCESS)
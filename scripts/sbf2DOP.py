@@ -7,6 +7,8 @@ import argparse
 from matplotlib.pyplot import show
 
 from SSN import sbf2stf
+from SSN import sbfDecoder
+from SSN import ssnLogging
 from GNSS import gpstime
 from Plot import plotDOP
 
@@ -24,6 +26,8 @@ E_SIGNALTYPE_MISMATCH = 6
 E_DIR_NOT_EXIST = 7
 E_FAILURE = 99
 
+logger = ssnLogging.getLogger(__name__)
+
 # # get startup path
 # ospath = sys.path.append(os.path.join(os.path.dirname(sys.argv[0]), "subfolder"))
 # print sys.argv[0], ospath
@@ -46,8 +50,11 @@ def treatCmdOpts(argv):
     parser.add_argument('-d', '--dir', help='Directory of SBF file (defaults to .)', required=False, default='.')
     parser.add_argument('-m', '--maxdop', help='Maximum DOP value to display (default 10)', type=int, required=False, default=20)
     parser.add_argument('-o','--overwrite', help='overwrite intermediate files (default False)', action='store_true', required=False)
+    parser.add_argument('-n', '--native', help='decode the SBF file in-process instead of using sbf2stf (default False)', action='store_true', required=False)
     parser.add_argument('-v', '--verbose', help='displays interactive graphs and increase output verbosity (default False)', action='store_true', required=False)
+    ssnLogging.addOptions(parser)
     args = parser.parse_args()
+    ssnLogging.configureFromArgs(args)
 
     # # show values
     # print('SBFFile: %s' % args.file)
@@ -55,12 +62,12 @@ def treatCmdOpts(argv):
     # print('verbose: %s' % args.verbose)
     # print('overwrite: %s' % args.overwrite)
 
-    return args.file, args.dir, args.overwrite, args.verbose, args.maxdop
+    return args.file, args.dir, args.overwrite, args.native, args.verbose, args.maxdop
 
 
 if __name__ == "__main__":
     # treat command line options
-    nameSBF, dirSBF, overwrite, verbose, maxdop = treatCmdOpts(sys.argv)
+    nameSBF, dirSBF, overwrite, native, verbose, maxdop = treatCmdOpts(sys.argv)
 
     # change to the directory dirSBF if it exists
     workDir = os.getcwd()
@@ -84,33 +91,38 @@ if __name__ == "__main__":
         sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % nameSBF)
         sys.exit(E_FILE_NOT_EXIST)
 
-    # # execute the conversion sbf2stf needed
     SBF2STFOPTS = ['DOP_2']     # options for conversion, ORDER IMPORTANT!!
-    sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
-
-    for option in SBF2STFOPTS:
-        # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
-        if option == 'DOP_2':
-            # read the MeasEpoch data into a numpy array
-            dataDOP = sbf2stf.readDOPEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
-        else:
-            print('  wrong option %s given.' % option)
-            sys.exit(E_WRONG_OPTION)
+    if native:
+        # decode the SBF blocks in-process into numpy arrays
+        dataDOP = sbfDecoder.readSBF(nameSBF, SBF2STFOPTS, verbose)[0]
+    else:
+        # # execute the conversion sbf2stf needed
+        sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
+
+        for option in SBF2STFOPTS:
+            # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
+            if option == 'DOP_2':
+                # read the MeasEpoch data into a numpy array
+                dataDOP = sbf2stf.readDOPEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
+            else:
+                logger.error('  wrong option %s given.', option)
+                sys.exit(E_WRONG_OPTION)
 
     # determine current weeknumber and subsequent date from SBF data
     WkNr = int(dataDOP['DOP_WNC'][0])
     dateString = gpstime.UTCFromWT(WkNr, float(dataDOP['DOP_TOW'][0])).strftime("%d/%m/%Y")
     if verbose:
-        print('WkNr = %d - dateString = %s' % (WkNr, dateString))
+        logger.info('WkNr = %d - dateString = %s', WkNr, dateString)
 
     # create subset with only valid DOP values by checking wheteher NrSVs is strict positive
     indexValid = sbf2stf.findNrSVs(dataDOP['DOP_NrSV'], verbose)
     # indexValid = sbf2stf.findValidDOP(dataDOP['DOP_PDOP'], verbose)
     dataDOPValid = dataDOP[indexValid]
-    print('dataDOPValid = %s' % dataDOPValid)
-    print('dataDOPValid[0] = %s' % dataDOPValid[0])
-    print('dataDOPValid[-] = %s' % dataDOPValid[-1])
+    logger.debug('dataDOPValid = %s', dataDOPValid)
+    logger.debug('dataDOPValid[0] = %s', dataDOPValid[0])
+    logger.debug('dataDOPValid[-] = %s', dataDOPValid[-1])
 
 
-    # create the xDOP/NrSVs plot
-    plotDOP.plotNrSVsXDOP(dataDOPValid, maxdop)
\ No newline at end of file
+    # create the xDOP/NrSVs plot in the working directory
+    pngName = '%s-xDOP.png' % gpstime.UTCFromWT(WkNr, float(dataDOP['DOP_TOW'][0])).strftime("%Y-%m-%d")
+    plotDOP.plotNrSVsXDOP(dataDOPValid, maxdop, pngName, verbose)
\ No newline at end of file
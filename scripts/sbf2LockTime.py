@@ -4,11 +4,15 @@ import sys
 import os
 import numpy as np
 import argparse
-import matplotlib.pyplot as plt
 
 from SSN import sbf2stf
+from SSN import sbfDecoder
+from SSN import ssnLogging
+from SSN import svGroups
 from SSN import ssnConstants as mSSN
+from SSN import slipDetector
 from Plot import plotLockTime
+from Plot import figureRenderer
 
 _author__ = 'amuls'
 
@@ -24,6 +28,8 @@ E_SIGNALTYPE_MISMATCH = 6
 E_DIR_NOT_EXIST = 7
 E_FAILURE = 99
 
+logger = ssnLogging.getLogger(__name__)
+
 # # get startup path
 # ospath = sys.path.append(os.path.join(os.path.dirname(sys.argv[0]), "subfolder"))
 # print(sys.argv[0], ospath)
@@ -41,16 +47,20 @@ def treatCmdOpts(argv):
     parser.add_argument('-f', '--file', help='Name of SBF file', required=True)
     parser.add_argument('-d', '--dir', help='Directory of SBF file (defaults to .)', required=False, default='.')
     parser.add_argument('-o', '--overwrite', help='overwrite intermediate files (default False)', action='store_true', required=False)
+    parser.add_argument('-n', '--native', help='decode the SBF file in-process instead of using sbf2stf (default False)', action='store_true', required=False)
+    parser.add_argument('-e', '--events', help='write the loss of lock and cycle slip events to this csv file', required=False, default=None)
     parser.add_argument('-v', '--verbose', help='displays interactive graphs and increase output verbosity (default False)', action='store_true', required=False)
+    ssnLogging.addOptions(parser)
     args = parser.parse_args()
+    ssnLogging.configureFromArgs(args)
 
     # show values
-    print('SBFFile: %s' % args.file)
-    print('dir = %s' % args.dir)
-    print('verbose: %s' % args.verbose)
-    print('overwrite: %s' % args.overwrite)
+    logger.info('SBFFile: %s', args.file)
+    logger.info('dir = %s', args.dir)
+    logger.info('verbose: %s', args.verbose)
+    logger.info('overwrite: %s', args.overwrite)
 
-    return args.file, args.dir, args.overwrite, args.verbose
+    return args.file, args.dir, args.overwrite, args.native, args.events, args.verbose
 
 
 # main starts here
@@ -58,7 +68,7 @@ if __name__ == "__main__":
     np.set_printoptions(formatter={'float': '{: 0.3f}'.format})
 
     # treat the command line options
-    nameSBF, dirSBF, overwrite, verbose = treatCmdOpts(sys.argv)
+    nameSBF, dirSBF, overwrite, native, nameEvents, verbose = treatCmdOpts(sys.argv)
 
     # change to the directory dirSBF if it exists
     workDir = os.getcwd()
@@ -81,22 +91,26 @@ if __name__ == "__main__":
         sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % nameSBF)
         sys.exit(E_FILE_NOT_EXIST)
 
-    # execute the conversion sbf2stf needed
     SBF2STFOPTS = ['MeasEpoch_2', 'MeasExtra_1']     # options for conversion, ORDER IMPORTANT!!
-    sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
-
-    # print('SBF2STFOPTS = %s' % SBF2STFOPTS)
-    for option in SBF2STFOPTS:
-        # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
-        if option == 'MeasEpoch_2':
-            # read the MeasEpoch data into a numpy array
-            dataMeas = sbf2stf.readMeasEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
-        elif option == 'MeasExtra_1':
-            # read the MeasExtra data into numpy array
-            dataExtra = sbf2stf.readMeasExtra(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
-        else:
-            print('  wrong option %s given.' % option)
-            sys.exit(E_WRONG_OPTION)
+    if native:
+        # decode the SBF blocks in-process into numpy arrays
+        dataMeas, dataExtra = sbfDecoder.readSBF(nameSBF, SBF2STFOPTS, verbose)
+    else:
+        # execute the conversion sbf2stf needed
+        sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
+
+        # print('SBF2STFOPTS = %s' % SBF2STFOPTS)
+        for option in SBF2STFOPTS:
+            # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
+            if option == 'MeasEpoch_2':
+                # read the MeasEpoch data into a numpy array
+                dataMeas = sbf2stf.readMeasEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
+            elif option == 'MeasExtra_1':
+                # read the MeasExtra data into numpy array
+                dataExtra = sbf2stf.readMeasExtra(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
+            else:
+                logger.error('  wrong option %s given.', option)
+                sys.exit(E_WRONG_OPTION)
 
     # check whether the same signaltypes are on corresponsing lines after sorting
     if not sbf2stf.verifySignalTypeOrder(dataMeas['MEAS_SIGNALTYPE'], dataExtra['EXTRA_SIGNALTYPE'], dataMeas['MEAS_TOW'], verbose):
@@ -106,98 +120,42 @@ if __name__ == "__main__":
     dataMeas['MEAS_CODE'] = sbf2stf.removeSmoothing(dataMeas['MEAS_CODE'], dataExtra['EXTRA_SMOOTHINGCORR'], dataExtra['EXTRA_MPCORR'])
     # print('dataMeas['MEAS_CODE'] = %s\n' % dataMeas['MEAS_CODE'])
 
+    # group the measurements per SVID and signalType
+    measGroups = svGroups.SVSignalGroups(dataMeas, 'MEAS', verbose)
+
     # find list of SVIDs observed
     SVIDs = sbf2stf.observedSatellites(dataMeas['MEAS_SVID'], verbose)
 
-    for SVID in SVIDs:
-        print('=' * 50)
-        gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
-        print('SVID = %d - %s - %s%d' % (SVID, gnssSyst, gnssSystShort, gnssPRN))
-
-        indexSVID = sbf2stf.indicesSatellite(SVID, dataMeas['MEAS_SVID'], verbose)
-        dataMeasSVID = dataMeas[indexSVID]
-        print("indexSVID = %s" % indexSVID)
-
-        # store temporaray results ONLY for inspection
-        nameDataMeasSVID = str(SVID) + '.csv'
-        print('nameDataMeasSVID = %s' % nameDataMeasSVID)
-        print('dataMeasSVID = %s' % dataMeasSVID)
-        np.savetxt(nameDataMeasSVID, dataMeasSVID, fmt='%i,%.1f,%i,%i,%i,%i,%i,%.2f,%.2f,%.2f,%.2f,%i,%i,%i')
+    # detect the loss of locks and cycle slips of all SVs and signal types in one pass
+    resets = slipDetector.lockTimeResets(measGroups)
+    events = slipDetector.detectSlips(measGroups, resets=resets, verbose=verbose)
+    if nameEvents is not None:
+        slipDetector.writeEvents(events, nameEvents)
+        logger.log(ssnLogging.verboseLevel(verbose), '    Events written to %s', nameEvents)
 
-        signalTypesSVID = sbf2stf.observedSignalTypes(dataMeasSVID['MEAS_SIGNALTYPE'], verbose)
-        print('signalTypesSVID = %s' % signalTypesSVID)
-
-        # print("len dataMeas['MEAS_CODE'] %d" % len(dataMeas['MEAS_CODE']))
-        # print("len dataMeasSVID['MEAS_CODE'] %d" % len(dataMeasSVID['MEAS_CODE']))
-        # print dataMeasSVID['MEAS_SVID']
+    jobs = []
+    for SVID in SVIDs:
+        signalTypesSVID = measGroups.signalTypes(SVID)
 
-        indexSignalType = []
         dataMeasSVIDSignalType = []
         lliIndicators = []
-        lliTOWs = []
-        firstTOW = []
-
-        for index, signalType in enumerate(signalTypesSVID):
-            print('-' * 25)
-            print("signalType = %s  index=%d - name = %s\n" % (signalType, index, mSSN.GNSSSignals[signalType]['name']))
-
-            indexSignalType.extend(np.array(sbf2stf.indicesSignalType(signalType, dataMeasSVID['MEAS_SIGNALTYPE'], verbose)))
+        for signalType in signalTypesSVID:
+            # set the data for 1 SV and 1 ST
+            dataMeasSVIDSignalType.append(measGroups[SVID, signalType])
 
-            print('type indexSignalType = %s' % type(indexSignalType))
-            print('type indexSignalType[index] = %s' % type(indexSignalType[index]))
-            print('indexSignalType = %s' % indexSignalType)
-            print("indexSignalType[index] = %s (len = %d)" % (indexSignalType[index], len(indexSignalType[index])))
-            print("indexSignalType[index][2] = %s\n" % indexSignalType[index][2])
+            # last epoch before each loss of lock for SVID and SignalType
+            lliIndicators.append(slipDetector.groupIndices(measGroups, resets, SVID, signalType) - 1)
 
-            # set the data for 1 SV and 1 ST
-            dataMeasSVIDSignalType.append(dataMeasSVID[indexSignalType[index]])
-
-            print("dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'] = %s (len = %d)" % (dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'], len(dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'])))
-            print("dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'][2] = %s\n" % dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'][2])
-            print("dataMeasSVIDSignalType[index][2] = %s\n" % dataMeasSVIDSignalType[index][2])
-            print("dataMeasSVIDSignalType[index] = %s\n" % dataMeasSVIDSignalType[index])
-
-            # # store temporaray results ONLY for inspection
-            nameDataMeasSVIDSignalType = '%s-%s%d-%s.csv' % (gnssSyst, gnssSystShort, gnssPRN, mSSN.GNSSSignals[signalType]['name'])
-            np.savetxt(nameDataMeasSVIDSignalType, dataMeasSVIDSignalType[index], fmt='%i,%.1f,%i,%i,%i,%i,%i,%.2f,%.2f,%.2f,%.2f,%i,%i,%i')
-
-            # find loss of lock for SVID and SignalType
-            lliIndicators.extend(np.array(sbf2stf.findLossOfLock(dataMeasSVIDSignalType[index]['MEAS_LOCKTIME'], verbose)))
-
-            print('type lliIndicators = %s' % type(lliIndicators))
-            print('type lliIndicators[index] = %s' % type(lliIndicators[index]))
-            print("lliIndicators[index] = %s (%d)" % (lliIndicators[index], len(lliIndicators[index])))
-            lliTOWs.append(dataMeasSVIDSignalType[index][lliIndicators[index]]['MEAS_TOW'])
-            print('lliTOWs[%d] = %s (%d)' % (index, lliTOWs[index], len(lliTOWs[index])))
-
-            # keep track of first observation TOW for this signaltype and SVID
-            firstTOW.append(dataMeasSVIDSignalType[index]['MEAS_TOW'][0])
-            print('firstTOW[%d] = %s' % (index, firstTOW[index]))
-
-        #  combine the TOWs arrays corresponding to
-        # (a) start of obs file on both frequencies
-        # (b) LLI of both frequencies
-        # (c) sort it
-        # to find out how long the Loss of Lock lasts, only if both signaltypes are present!!
-        if np.size(signalTypesSVID) == 2:
-            lliTOWComb = np.unique(np.sort(np.concatenate(([firstTOW[0], firstTOW[1]], lliTOWs[0], lliTOWs[1]), axis=0)))
-            print('lliTOWComb = %s (%d)' % (lliTOWComb, np.size(lliTOWComb)))
-            print('type(lliTOWComb) = %s' % type(lliTOWComb))
-
-            # gather the info about the Loss of Locks for this SVID
-            indexTOWComb = []
-            dataAtLLI = []
-            for index, signalType in enumerate(signalTypesSVID):
-                indexTOWComb.append(np.searchsorted(dataMeasSVIDSignalType[index]['MEAS_TOW'], lliTOWComb))
-                print('indexTOWComb[%d] = %s (%d)' % (index, indexTOWComb[index], np.size(indexTOWComb[index])))
-                dataAtLLI.append(dataMeasSVIDSignalType[index][indexTOWComb[index]])
-                print('dataAtLLI[%d] = %s (%d)' % (index, dataAtLLI[index], np.size(dataAtLLI[index])))
+        if logger.isEnabledFor(ssnLogging.verboseLevel(verbose)):
+            gnssSyst, gnssSystShort, gnssPRN = mSSN.svPRN(SVID)
+            eventsSVID = events[events['SLIP_SVID'] == SVID]
+            logger.log(ssnLogging.verboseLevel(verbose), '    SVID = %d - %s%d: %s', SVID, gnssSystShort, gnssPRN,
+                       ', '.join('%d %s' % (np.count_nonzero(eventsSVID['SLIP_KIND'] == kind), slipDetector.SLIP_NAMES[kind]) for kind in sorted(slipDetector.SLIP_NAMES)))
 
         # plot the locktimes for this SVID for all SignalTypes
-        plotLockTime.plotLockTime(SVID, signalTypesSVID, dataMeasSVIDSignalType, lliIndicators, lliTOWs, verbose)
-        print('-' * 25)
+        jobs.append(plotLockTime.lockTimeFigure(SVID, signalTypesSVID, dataMeasSVIDSignalType, lliIndicators))
 
-        if verbose:
-            plt.show()
+    # render the locktime plots of all SVs in parallel
+    figureRenderer.renderFigures(jobs, display=verbose, verbose=verbose)
 
-    sys.exit(99)
+    sys.exit(E_SUCCESS)
@@ -3,8 +3,10 @@
 import sys
 import getopt
 import os
-from pyproj import Proj
+import numpy as np
 from SSN import sbf2stf
+from SSN import ssnLogging
+from GNSS import wgs84
 from Plot import plotPos
 
 # exit codes
@@ -17,14 +19,18 @@ E_WRONG_OPTION = 5
 E_SIGNALTYPE_MISMATCH = 6
 E_FAILURE = 99
 
+logger = ssnLogging.getLogger(__name__)
+
 # global used vars
 nameSBF = ''
 overwrite = False
 verbose = True
+quiet = False
+logLevels = None
 
 # get startup path
 ospath = sys.path.append(os.path.join(os.path.dirname(sys.argv[0]), "subfolder"))
-print sys.argv[0], ospath
+# print sys.argv[0], ospath
 
 
 # print usage of script
@@ -32,10 +38,12 @@ def usage():
     """
     prints the usage of the script
     """
-    sys.stderr.write('plotPos.py -f|--file=SBF-data-file -o|--overwrite -v|--verbose -h|--help\n')
+    sys.stderr.write('plotPos.py -f|--file=SBF-data-file -o|--overwrite -v|--verbose -q|--quiet --log=LEVELS -h|--help\n')
     sys.stderr.write('where: -f|--file : specify filename of SBF data to convert\n')
     sys.stderr.write('       -o|--overwrite : overwrite converted files (default not)\n')
     sys.stderr.write('       -v|--verbose : enable verbosity\n')
+    sys.stderr.write('       -q|--quiet : only display warnings and errors\n')
+    sys.stderr.write('       --log : log level for all modules or per module, eg debug or sbf2stf=debug\n')
     sys.stderr.write('       -h|--help : print this help message\n')
 
 
@@ -53,10 +61,12 @@ def treatCmdOpts(argv):
     global nameSBF
     global overwrite
     global verbose
+    global quiet
+    global logLevels
 
     try:
-        opts, args = getopt.getopt(argv, "hof:",
-                                   ["file=", "overwrite", "help"])
+        opts, args = getopt.getopt(argv, "hoqf:",
+                                   ["file=", "overwrite", "quiet", "log=", "help"])
     except getopt.GetoptError:
         usage()
         sys.exit(E_UNKNOWN_OPTION)
@@ -71,11 +81,16 @@ def treatCmdOpts(argv):
             overwrite = True
         elif opt in ("-v", "--verbose"):
             verbose = True
+        elif opt in ("-q", "--quiet"):
+            quiet = True
+        elif opt == "--log":
+            logLevels = arg
 
 
 if __name__ == "__main__":
     # print sys.argv
     treatCmdOpts(sys.argv[1:])                       # treat cmdline parameters
+    ssnLogging.configure(quiet, logLevels)
 
     # check whether the SBF datafile exists
     if not os.path.isfile(nameSBF):
@@ -87,7 +102,7 @@ if __name__ == "__main__":
     sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
     # nameDataMeasSVID = 'testpos' + '.csv'
     # np.savetxt(nameDataMeasSVID, sbf2stfConverted)
-    print "sbf2stfConverted = %s" % sbf2stfConverted
+    logger.debug("sbf2stfConverted = %s", sbf2stfConverted)
     # print 'SBF2STFOPTS = %s' % SBF2STFOPTS
     for option in SBF2STFOPTS:
         # print 'option = %s - %d' % (option, SBF2STFOPTS.index(option))
@@ -95,30 +110,33 @@ if __name__ == "__main__":
             # read the MeasEpoch data into a numpy array
             dataPOS = sbf2stf.readGEODPosEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
 
-            print 'dataPOS = %s (%d)' % (dataPOS, len(dataPOS))
-            print "dataPOS['GEOD_TOW'] = %s (%d)\n" % (dataPOS['GEOD_TOW'], len(dataPOS['GEOD_TOW']))
+            logger.debug('dataPOS = %s (%d)', dataPOS, len(dataPOS))
+            logger.debug("dataPOS['GEOD_TOW'] = %s (%d)", dataPOS['GEOD_TOW'], len(dataPOS['GEOD_TOW']))
 
         elif option == 'DOP_2':
             # read the MeasExtra data into numpy array
             dataDOP = sbf2stf.readDOPEpoch(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
 
-            print 'dataDOP = %s (%d)' % (dataDOP, len(dataDOP))
-            print "dataDOP['DOP_TOW'] = %s (%d)\n" % (dataDOP['DOP_TOW'], len(dataDOP['DOP_TOW']))
+            logger.debug('dataDOP = %s (%d)', dataDOP, len(dataDOP))
+            logger.debug("dataDOP['DOP_TOW'] = %s (%d)", dataDOP['DOP_TOW'], len(dataDOP['DOP_TOW']))
 
         else:
-            print '  wrong option %s given.' % option
+            logger.error('  wrong option %s given.', option)
             sys.exit(E_WRONG_OPTION)
 
     index = sbf2stf.findNanValues(dataPOS['GEOD_Latitude'])
-    print "index: ", index[0][:]
+    logger.debug("index: %s", index[0])
     if len(index) < 0:
-        print "NO POSITION CALCULATED"
+        logger.warning("NO POSITION CALCULATED")
     else:
         dataGEODPOSValid = dataPOS[index]
         dataDOPValid = dataDOP[index]
-        myProj = Proj("+proj=utm +north +ellps=WGS84 +datum=WGS84 +units=m +no_defs")
-        print "TYPE", type(dataGEODPOSValid)
-        east, north = myProj(rad2deg(dataGEODPOSValid['GEOD_Longitude']), rad2deg(dataGEODPOSValid['GEOD_Latitude']))
+        logger.debug("TYPE %s", type(dataGEODPOSValid))
+        # project all positions in the UTM zone of the median position, so the track is continuous
+        lla = np.column_stack((np.rad2deg(dataGEODPOSValid['GEOD_Latitude']), np.rad2deg(dataGEODPOSValid['GEOD_Longitude']), dataGEODPOSValid['GEOD_Height']))
+        zoneNumbers, zoneLetters = wgs84.WGS84().utmZoneArray(np.median(lla[:, 0]), np.median(lla[:, 1]))
+        utm, zones, scales = wgs84.WGS84().lla2utmArray(lla, zoneNumber=zoneNumbers[0])
+        east, north = utm[:, 0], utm[:, 1]
         # print "MEAN LONG", np.mean(dataGEODPOSValid['GEOD_Longitude'])
         # print "MEAN LAT", np.mean(dataGEODPOSValid['GEOD_Latitude'])
         # print "MEAN HEIGHT", np.mean(dataGEODPOSValid['GEOD_Height'])
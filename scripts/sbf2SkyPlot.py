@@ -7,6 +7,8 @@ import argparse
 from matplotlib.pyplot import show
 
 from SSN import sbf2stf
+from SSN import sbfDecoder
+from SSN import ssnLogging
 from GNSS import gpstime
 from Plot import plotElevAzim
 
@@ -24,6 +26,8 @@ E_SIGNALTYPE_MISMATCH = 6
 E_DIR_NOT_EXIST = 7
 E_FAILURE = 99
 
+logger = ssnLogging.getLogger(__name__)
+
 # # get startup path
 # ospath = sys.path.append(os.path.join(os.path.dirname(sys.argv[0]), "subfolder"))
 # print sys.argv[0], ospath
@@ -45,8 +49,11 @@ def treatCmdOpts(argv):
     parser.add_argument('-f','--file', help='Name of SBF file',required=True)
     parser.add_argument('-d', '--dir', help='Directory of SBF file (defaults to .)', required=False, default='.')
     parser.add_argument('-o','--overwrite', help='overwrite intermediate files (default False)', action='store_true', required=False)
+    parser.add_argument('-n', '--native', help='decode the SBF file in-process instead of using sbf2stf (default False)', action='store_true', required=False)
     parser.add_argument('-v', '--verbose', help='displays interactive graphs and increase output verbosity (default False)', action='store_true', required=False)
+    ssnLogging.addOptions(parser)
     args = parser.parse_args()
+    ssnLogging.configureFromArgs(args)
 
     # # show values
     # print('SBFFile: %s' % args.file)
@@ -54,12 +61,12 @@ def treatCmdOpts(argv):
     # print('verbose: %s' % args.verbose)
     # print('overwrite: %s' % args.overwrite)
 
-    return args.file, args.dir, args.overwrite, args.verbose
+    return args.file, args.dir, args.overwrite, args.native, args.verbose
 
 
 if __name__ == "__main__":
     # treat command line options
-    nameSBF, dirSBF, overwrite, verbose = treatCmdOpts(sys.argv)
+    nameSBF, dirSBF, overwrite, native, verbose = treatCmdOpts(sys.argv)
 
     # change to the directory dirSBF if it exists
     workDir = os.getcwd()
@@ -81,27 +88,31 @@ if __name__ == "__main__":
         sys.stderr.write('SBF datafile %s does not exists. Exiting.\n' % nameSBF)
         sys.exit(E_FILE_NOT_EXIST)
 
-    # execute the conversion sbf2stf needed
     SBF2STFOPTS = ['ChannelStatus_1']     # options for conversion, ORDER IMPORTANT!!
-    sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
+    if native:
+        # decode the SBF blocks in-process into numpy arrays
+        dataChanSt = sbfDecoder.readSBF(nameSBF, SBF2STFOPTS, verbose)[0]
+    else:
+        # execute the conversion sbf2stf needed
+        sbf2stfConverted = sbf2stf.runSBF2STF(nameSBF, SBF2STFOPTS, overwrite, verbose)
 
-    for option in SBF2STFOPTS:
-        # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
-        if option == 'ChannelStatus_1':
-            # read the MeasEpoch data into a numpy array
-            dataChanSt = sbf2stf.readChannelStatus(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
-        else:
-            print('  wrong option %s given.' % option)
-            sys.exit(E_WRONG_OPTION)
+        for option in SBF2STFOPTS:
+            # print('option = %s - %d' % (option, SBF2STFOPTS.index(option)))
+            if option == 'ChannelStatus_1':
+                # read the MeasEpoch data into a numpy array
+                dataChanSt = sbf2stf.readChannelStatus(sbf2stfConverted[SBF2STFOPTS.index(option)], verbose)
+            else:
+                logger.error('  wrong option %s given.', option)
+                sys.exit(E_WRONG_OPTION)
 
-    print('dataChanSt = %s' % dataChanSt)
-    print('dataChanSt[0] = %s' % dataChanSt[0])
+    logger.debug('dataChanSt = %s', dataChanSt)
+    logger.debug('dataChanSt[0] = %s', dataChanSt[0])
 
     # determine current weeknumber and subsequent date from SBF data
     WkNr = int(dataChanSt['CHST_WNC'][0])
     dateString = gpstime.UTCFromWT(WkNr, float(dataChanSt['CHST_TOW'][0])).strftime("%d/%m/%Y")
     if verbose:
-        print('WkNr = %d - dateString = %s' % (WkNr, dateString))
+        logger.info('WkNr = %d - dateString = %s', WkNr, dateString)
 
     # create subset with only valid elevation angles
     indexValid = sbf2stf.findValidElevation(dataChanSt['CHST_Elevation'], verbose)
@@ -117,7 +128,7 @@ if __name__ == "__main__":
     prnHourElev = []
     prnHourAzim = []
     for i, PRN in enumerate(SVIDs):
-        print('PRN = %d' % PRN)
+        logger.debug('PRN = %d', PRN)
         indexPRN = sbf2stf.indicesSatellite(PRN, dataChanStValid['CHST_SVID'], verbose)
         prnElev.append(dataChanStValid[indexPRN]['CHST_Elevation'])
         prnAzim.append(dataChanStValid[indexPRN]['CHST_Azimuth'])
@@ -138,14 +149,12 @@ if __name__ == "__main__":
 
     fig = plotElevAzim.skyview(SVIDs, prnAzim, prnElev, dateString, prnHour, prnHourAzim, prnHourElev)
     pTime = gpstime.UTCFromWT(WkNr, float(dataChanSt['CHST_TOW'][0]))
-    print('pTime Y = %s' % pTime.strftime('%Y'))
-    print('pTime m = %s' % pTime.strftime('%m'))
-    print('pTime d = %s' % pTime.strftime('%d'))
+    logger.debug('pTime = %s', pTime)
 
     dateString = gpstime.UTCFromWT(WkNr, float(dataChanSt['CHST_TOW'][0])).strftime("%Y-%m-%d")
-    print('dateString = %s' % dateString)
+    logger.debug('dateString = %s', dateString)
     fig.savefig('%s-skyview.png' % dateString, dpi=90)
-    print('dpi = %d' % fig.dpi)
+    logger.debug('dpi = %d', fig.dpi)
 
     # show the plot
     show()
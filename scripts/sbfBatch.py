@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import re
+import json
+import time
+import argparse
+from multiprocessing.pool import ThreadPool
+from multiprocessing import cpu_count
+
+from SSN import sbf2stf
+
+
+# exit codes
+E_SUCCESS = 0
+E_FILE_NOT_EXIST = 1
+E_NOT_IN_PATH = 2
+E_UNKNOWN_OPTION = 3
+E_TIME_PASSED = 4
+E_WRONG_OPTION = 5
+E_SIGNALTYPE_MISMATCH = 6
+E_DIR_NOT_EXIST = 7
+E_FAILURE = 99
+
+# analyses that can be run on each SBF file and the script performing it
+ANALYSES = {'CN0': 'sbf2CN0.py',
+            'LockTime': 'sbf2LockTime.py',
+            'DOP': 'sbf2DOP.py',
+            'SkyPlot': 'sbf2SkyPlot.py',
+            'jamming': 'jamDet.py',
+            }
+
+# SBF file names: Septentrio naming (eg ASTX337O.15_) or .sbf extension
+SBF_PATTERN = r'^(.{4}\d{3}.\.\d{2}_|.*\.sbf)$'
+
+# name of the manifest file in the campaign root directory
+MANIFEST_NAME = 'sbfBatch.json'
+
+
+def treatCmdOpts(argv):
+    """
+    Treats the command line options
+
+    Parameters:
+      argv          the options (without argv[0]
+
+    Sets the global variables according to the CLI args
+    """
+    helpTxt = os.path.basename(__file__) + ' runs the analyses on all SBF files found in a campaign directory tree'
+
+    # create the parser for command line arguments
+    parser = argparse.ArgumentParser(description=helpTxt)
+    parser.add_argument('-r', '--root', help='campaign root directory (eg Data/BERTRIX)', required=True)
+    parser.add_argument('-a', '--analyses', help='analyses to run (default all)', nargs='+', choices=sorted(ANALYSES.keys()), required=False, default=sorted(ANALYSES.keys()))
+    parser.add_argument('-p', '--processes', help='number of files processed at the same time (default number of CPUs)', type=int, required=False, default=cpu_count())
+    parser.add_argument('-t', '--timeout', help='maximal time in seconds for one analysis of one file (default no limit)', type=float, required=False, default=None)
+    parser.add_argument('-o', '--overwrite', help='redo analyses already done according to the manifest and overwrite intermediate files (default False)', action='store_true', required=False)
+    parser.add_argument('-n', '--native', help='decode the SBF files in-process instead of using sbf2stf (default False)', action='store_true', required=False)
+    parser.add_argument('-v', '--verbose', help='increase output verbosity (default False)', action='store_true', required=False)
+    args = parser.parse_args()
+
+    return args.root, args.analyses, args.processes, args.timeout, args.overwrite, args.native, args.verbose
+
+
+def findSBFFiles(rootDir, verbose=False):
+    """
+    findSBFFiles searches the campaign directory tree for SBF files
+
+    Parameters:
+        rootDir: root directory of the campaign
+
+    Returns:
+        sbfFiles: sorted list of the SBF file names relative to rootDir
+    """
+    sbfPattern = re.compile(SBF_PATTERN, re.IGNORECASE)
+
+    sbfFiles = []
+    for dirPath, dirNames, fileNames in os.walk(rootDir):
+        dirNames.sort()
+        for fileName in sorted(fileNames):
+            if sbfPattern.match(fileName):
+                sbfFiles.append(os.path.relpath(os.path.join(dirPath, fileName), rootDir))
+
+    if verbose:
+        sys.stdout.write('  Found %d SBF files in %s\n' % (len(sbfFiles), rootDir))
+
+    return sbfFiles
+
+
+def fileSignature(sbfFileName):
+    """
+    fileSignature returns size and modification time of a file, used to detect changed SBF files
+    """
+    stat = os.stat(sbfFileName)
+
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def readManifest(manifestName):
+    """
+    readManifest reads the manifest of a previous run (empty when not present)
+
+    Returns:
+        manifest: dict with for each SBF file the signature and the result of each analysis
+    """
+    if not os.path.isfile(manifestName):
+        return {}
+
+    with open(manifestName, 'r') as fManifest:
+        return json.load(fManifest)
+
+
+def writeManifest(manifestName, manifest):
+    """
+    writeManifest saves the manifest, the old one is only replaced once the new one is complete
+    """
+    with open(manifestName + '.tmp', 'w') as fManifest:
+        json.dump(manifest, fManifest, indent=2, sort_keys=True)
+
+    if os.path.isfile(manifestName):
+        os.remove(manifestName)
+    os.rename(manifestName + '.tmp', manifestName)
+
+
+def analysesToDo(manifest, rootDir, sbfFile, analyses, overwrite):
+    """
+    analysesToDo returns the analyses not yet done successfully on the (unchanged) SBF file
+    """
+    if overwrite or sbfFile not in manifest:
+        return list(analyses)
+
+    entry = manifest[sbfFile]
+    if entry['signature'] != fileSignature(os.path.join(rootDir, sbfFile)):
+        return list(analyses)
+
+    return [analysis for analysis in analyses if entry['analyses'].get(analysis, {}).get('status') != 'done']
+
+
+def resultDir(rootDir, sbfFile, analysis):
+    """
+    resultDir returns the directory in which the results of an analysis of a SBF file are written
+    """
+    return os.path.join(rootDir, sbfFile + '_results', analysis)
+
+
+def processFile(processArgs):
+    """
+    processFile runs the analyses on one SBF file, one after the other since they share the converted files
+
+    Parameters:
+        processArgs: tuple (rootDir, sbfFile, analyses, timeout, overwrite, native)
+
+    Returns:
+        sbfFile and dict with for each analysis its status, return code and duration
+    """
+    rootDir, sbfFile, analyses, timeout, overwrite, native = processArgs
+
+    scriptDir = os.path.dirname(os.path.abspath(__file__))
+    sbfFileName = os.path.abspath(os.path.join(rootDir, sbfFile))
+
+    results = {}
+    for analysis in analyses:
+        outDir = resultDir(os.path.abspath(rootDir), sbfFile, analysis)
+        if not os.path.isdir(outDir):
+            os.makedirs(outDir)
+
+        # the scripts change to the directory given, so the plots are written in outDir
+        cmdOpts = [os.path.join(scriptDir, ANALYSES[analysis]), '-f', sbfFileName, '-d', outDir]
+        if overwrite:
+            cmdOpts += ['-o']
+        if native:
+            cmdOpts += ['-n']
+
+        start = time.time()
+        returnCode, output, errors, timedOut = sbf2stf.executeCmd(sys.executable, cmdOpts, timeout)
+        with open(os.path.join(outDir, analysis + '.log'), 'wb') as fLog:
+            fLog.write(output)
+            fLog.write(errors)
+
+        if timedOut:
+            status = 'timeout'
+        elif returnCode != E_SUCCESS:
+            status = 'failed'
+        else:
+            status = 'done'
+        results[analysis] = {'status': status, 'returncode': returnCode, 'duration': round(time.time() - start, 1)}
+
+    return sbfFile, results
+
+
+if __name__ == "__main__":
+    # treat command line options
+    rootDir, analyses, nrProcesses, timeout, overwrite, native, verbose = treatCmdOpts(sys.argv)
+
+    if not os.path.isdir(rootDir):
+        sys.stderr.write('Campaign directory %s does not exists. Exiting.\n' % rootDir)
+        sys.exit(E_DIR_NOT_EXIST)
+
+    # the scripts may not open interactive windows
+    os.environ['MPLBACKEND'] = 'Agg'
+
+    manifestName = os.path.join(rootDir, MANIFEST_NAME)
+    manifest = readManifest(manifestName)
+
+    # determine the work left to do
+    jobs = []
+    for sbfFile in findSBFFiles(rootDir, verbose):
+        toDo = analysesToDo(manifest, rootDir, sbfFile, analyses, overwrite)
+        if toDo:
+            jobs.append((rootDir, sbfFile, toDo, timeout, overwrite, native))
+        elif verbose:
+            sys.stdout.write('  Skipping %s, all analyses done\n' % sbfFile)
+
+    if verbose:
+        sys.stdout.write('Processing %d SBF files using %d processes\n' % (len(jobs), nrProcesses))
+
+    # the analyses run in subprocesses, so threads are sufficient to keep them busy
+    pool = ThreadPool(max(nrProcesses, 1))
+    nrFailures = 0
+    for sbfFile, results in pool.imap_unordered(processFile, jobs):
+        entry = manifest.get(sbfFile, {'analyses': {}})
+        signature = fileSignature(os.path.join(rootDir, sbfFile))
+        if overwrite or entry.get('signature') != signature:
+            # the results of the analyses not rerun belong to the previous version of the file
+            entry['analyses'] = {}
+        entry['signature'] = signature
+        entry['analyses'].update(results)
+        manifest[sbfFile] = entry
+
+        # save after each file so an interrupted run can be resumed
+        writeManifest(manifestName, manifest)
+
+        for analysis in sorted(results):
+            if results[analysis]['status'] != 'done':
+                nrFailures += 1
+            if verbose or results[analysis]['status'] != 'done':
+                sys.stdout.write('  %s %s: %s (%.1f s)\n' % (sbfFile, analysis, results[analysis]['status'], results[analysis]['duration']))
+    pool.close()
+    pool.join()
+
+    if nrFailures > 0:
+        sys.stderr.write('%d analyses failed, see the log files in the _results directories\n' % nrFailures)
+        sys.exit(E_FAILURE)
+
+    sys.exit(E_SUCCESS)